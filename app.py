@@ -2,9 +2,11 @@
 import os
 import json
 import subprocess
+import threading
+import uuid
 from datetime import datetime
 from pathlib import Path
-from flask import Flask, render_template_string, request, jsonify, send_file
+from flask import Flask, Response, render_template_string, request, jsonify, send_file
 from werkzeug.utils import secure_filename
 
 app = Flask(__name__)
@@ -15,6 +17,12 @@ app.config['UPLOAD_FOLDER'] = BASE_DIR / 'uploads'
 app.config['RESULTS_FOLDER'] = BASE_DIR / 'results'
 HISTORY_FILE = BASE_DIR / 'history.json'
 
+# Traitements en cours ou récents: id → {'evenements': [...], 'fini': bool}
+JOBS = {}
+JOBS_MAX = 20              # Traitements terminés gardés en mémoire (les traitements en cours le sont toujours)
+SSE_ATTENTE = 15           # Secondes sans événement avant un commentaire keep-alive
+jobs_condition = threading.Condition()
+
 # Créer les dossiers
 app.config['UPLOAD_FOLDER'].mkdir(exist_ok=True)
 app.config['RESULTS_FOLDER'].mkdir(exist_ok=True)
@@ -35,6 +43,7 @@ HTML_TEMPLATE = '''
         .history-item { padding: 10px; margin: 5px 0; background: #f5f5f5; border-radius: 4px; }
         .status { margin: 20px 0; }
         .error { color: red; }
+        .progress { font-family: monospace; font-size: 0.9em; color: #555; }
     </style>
 </head>
 <body>
@@ -47,6 +56,8 @@ HTML_TEMPLATE = '''
     </div>
     
     <div class="status" id="status"></div>
+    <div class="progress" id="progress"></div>
+    <div class="progress error" id="alerte"></div>
     <div class="results" id="results"></div>
     
     <div style="margin-top:40px">
@@ -55,6 +66,22 @@ HTML_TEMPLATE = '''
     </div>
 
     <script>
+        // Textes venus du serveur (erreurs, noms de fichiers): toujours en
+        // textContent, jamais interprétés comme du HTML
+        function erreur(texte) {
+            const span = document.createElement('span');
+            span.className = 'error';
+            span.textContent = texte;
+            return span;
+        }
+        
+        function lien(href, texte) {
+            const a = document.createElement('a');
+            a.href = href;
+            a.textContent = texte;
+            return a;
+        }
+        
         async function uploadPDF() {
             const fileInput = document.getElementById('pdfFile');
             const file = fileInput.files[0];
@@ -63,7 +90,9 @@ HTML_TEMPLATE = '''
             const status = document.getElementById('status');
             const button = document.querySelector('.btn');
             
-            status.innerHTML = '⏳ Traitement en cours...';
+            status.textContent = '⏳ Envoi...';
+            document.getElementById('progress').textContent = '';
+            document.getElementById('results').style.display = 'none';
             button.disabled = true;
             
             const formData = new FormData();
@@ -77,20 +106,84 @@ HTML_TEMPLATE = '''
                 const data = await response.json();
                 
                 if (data.success) {
-                    status.innerHTML = '✅ Terminé!';
-                    document.getElementById('results').innerHTML = 
-                        '<h3>Résultats</h3>' +
-                        '<a href="/download/' + data.json + '">📄 JSON</a>' +
-                        '<a href="/download/' + data.excel + '">📊 Excel</a>';
-                    document.getElementById('results').style.display = 'block';
-                    loadHistory();
+                    suivreTraitement(data.job);
                 } else {
-                    status.innerHTML = '<span class="error">❌ ' + data.error + '</span>';
+                    status.replaceChildren(erreur('❌ ' + data.error));
+                    button.disabled = false;
                 }
             } catch (error) {
-                status.innerHTML = '<span class="error">❌ Erreur: ' + error + '</span>';
+                status.replaceChildren(erreur('❌ Erreur: ' + error));
+                button.disabled = false;
             }
-            button.disabled = false;
+        }
+        
+        function suivreTraitement(job) {
+            // Événements de detect0 relayés par /progression (Server-Sent Events)
+            const status = document.getElementById('status');
+            const progress = document.getElementById('progress');
+            const alerte = document.getElementById('alerte');
+            const button = document.querySelector('.btn');
+            const source = new EventSource('/progression/' + job);
+            let nbPages = 0, terminees = 0, debut = null, dernier = Date.now();
+            const erreurs = [];
+            
+            // Signale un lot bloqué: temps depuis le dernier événement
+            const minuteur = setInterval(() => {
+                const secondes = Math.round((Date.now() - dernier) / 1000);
+                alerte.textContent = secondes >= 30 ? '⚠ Aucune activité depuis ' + secondes + ' s' : '';
+            }, 5000);
+            
+            function terminer() {
+                source.close();
+                clearInterval(minuteur);
+                alerte.textContent = '';
+                button.disabled = false;
+            }
+            
+            source.onmessage = (message) => {
+                const ev = JSON.parse(message.data);
+                dernier = Date.now();
+                alerte.textContent = '';
+                
+                if (ev.evenement === 'debut') {
+                    nbPages = ev.pages;
+                    debut = ev.temps;
+                    status.textContent = '⏳ Détection: 0/' + nbPages + ' pages';
+                } else if (ev.evenement === 'page_debut') {
+                    progress.textContent = 'Page ' + ev.page + ' en cours...';
+                } else if (ev.evenement === 'page_fin') {
+                    terminees += 1;
+                    if (ev.erreur) erreurs.push('page ' + ev.page + ': ' + ev.erreur);
+                    const debit = debut ? terminees / (ev.temps - debut) : 0;
+                    const etapes = Object.entries(ev.etapes || {}).slice(0, 4)
+                        .map(([nom, duree]) => nom + ' ' + duree.toFixed(2) + 's').join(', ');
+                    status.textContent = '⏳ Détection: ' + terminees + '/' + nbPages + ' pages — ' +
+                        debit.toFixed(2) + ' pages/s';
+                    progress.textContent = 'Page ' + ev.page + ' : ' + ev.duree.toFixed(2) + ' s (' + etapes + ')';
+                    erreurs.forEach(e => progress.append(document.createElement('br'), erreur('⚠ ' + e)));
+                } else if (ev.evenement === 'etape') {
+                    status.textContent = '⏳ ' + ev.nom + '...';
+                } else if (ev.evenement === 'termine') {
+                    status.textContent = '✅ Terminé!';
+                    const titre = document.createElement('h3');
+                    titre.textContent = 'Résultats';
+                    const results = document.getElementById('results');
+                    results.replaceChildren(titre,
+                        lien('/download/' + encodeURIComponent(ev.json), '📄 JSON'),
+                        lien('/download/' + encodeURIComponent(ev.excel), '📊 Excel'));
+                    results.style.display = 'block';
+                    loadHistory();
+                    terminer();
+                } else if (ev.evenement === 'erreur') {
+                    status.replaceChildren(erreur('❌ ' + ev.message));
+                    terminer();
+                }
+            };
+            
+            source.onerror = () => {
+                // Connexion perdue après la fin: EventSource tenterait de se reconnecter
+                if (source.readyState === EventSource.CLOSED) terminer();
+            };
         }
         
         async function loadHistory() {
@@ -98,12 +191,16 @@ HTML_TEMPLATE = '''
             const history = await response.json();
             const list = document.getElementById('historyList');
             
-            list.innerHTML = history.slice(-5).reverse().map(item => 
-                '<div class="history-item">' +
-                '<strong>' + item.filename + '</strong> - ' + new Date(item.date).toLocaleString('fr-FR') +
-                '<br><a href="/download/' + item.json + '">JSON</a> | ' +
-                '<a href="/download/' + item.excel + '">Excel</a></div>'
-            ).join('');
+            list.replaceChildren(...history.slice(-5).reverse().map(item => {
+                const div = document.createElement('div');
+                div.className = 'history-item';
+                const nom = document.createElement('strong');
+                nom.textContent = item.filename;
+                div.append(nom, ' - ' + new Date(item.date).toLocaleString('fr-FR'), document.createElement('br'),
+                           lien('/download/' + encodeURIComponent(item.json), 'JSON'), ' | ',
+                           lien('/download/' + encodeURIComponent(item.excel), 'Excel'));
+                return div;
+            }));
         }
         loadHistory();
     </script>
@@ -129,14 +226,42 @@ def upload():
     if not file:
         return jsonify({'error': 'Pas de fichier'}), 400
     
+    # Identifiant unique: deux dépôts du même fichier dans la même seconde
+    # ne partagent ni leur suivi ni leurs fichiers
+    job = uuid.uuid4().hex
+    
     # Sauver PDF
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    timestamp = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{job[:8]}"
     filename = secure_filename(file.filename)
-    base_name = Path(filename).stem
     
     pdf_path = app.config['UPLOAD_FOLDER'] / f"{timestamp}_{filename}"
     file.save(pdf_path)
     
+    # Traitement en arrière-plan, suivi par /progression/<job>
+    with jobs_condition:
+        JOBS[job] = {'evenements': [], 'fini': False}
+        # Oublier les plus anciens traitements terminés, jamais ceux en cours
+        finis = [ancien for ancien, etat in JOBS.items() if etat['fini']]
+        for ancien in finis[:max(0, len(JOBS) - JOBS_MAX)]:
+            del JOBS[ancien]
+    threading.Thread(target=traiter, args=(job, timestamp, filename, pdf_path), daemon=True).start()
+    
+    return jsonify({'success': True, 'job': job})
+
+
+def publier(job, evenement):
+    """Ajoute un événement au traitement et réveille les flux SSE"""
+    with jobs_condition:
+        JOBS[job]['evenements'].append(evenement)
+        if evenement.get('evenement') in ('termine', 'erreur'):
+            JOBS[job]['fini'] = True
+        jobs_condition.notify_all()
+
+
+def traiter(job, timestamp, filename, pdf_path):
+    """Pipeline complet d'un PDF (thread): detect0 → fusion → Excel"""
+    base_name = Path(filename).stem
+    
     # Fichiers de sortie
     result_base = app.config['RESULTS_FOLDER'] / f"{timestamp}_{base_name}"
     json_result = f"{result_base}_resultats.json"
@@ -144,11 +269,25 @@ def upload():
     excel_result = f"{result_base}.xlsx"
     
     try:
-        # Pipeline
-        subprocess.run(['python3', 'detect0.py', 'template.json' , str(pdf_path),json_result], 
-                      check=True, cwd=BASE_DIR, capture_output=True)
+        # detect0: journal lisible dans le .log, événements JSON sur stderr
+        with open(f"{result_base}.log", 'w') as journal:
+            process = subprocess.Popen(
+                ['python3', 'detect0.py', 'template.json', str(pdf_path), json_result, '--progression'],
+                cwd=BASE_DIR, stdout=journal, stderr=subprocess.PIPE, text=True)
+            erreurs = []
+            for ligne in process.stderr:
+                try:
+                    publier(job, json.loads(ligne))
+                except ValueError:
+                    erreurs.append(ligne)  # traceback, avertissements OpenCV...
+            if process.wait() != 0:
+                raise subprocess.CalledProcessError(process.returncode, process.args,
+                                                    stderr=''.join(erreurs[-5:]))
+        
+        publier(job, {'evenement': 'etape', 'nom': 'Fusion'})
         subprocess.run(['python3', 'fusionner_resultats.py', 'template.json', json_result, json_fusion], 
                       check=True, cwd=BASE_DIR, capture_output=True)
+        publier(job, {'evenement': 'etape', 'nom': 'Excel'})
         subprocess.run(['python3', 'json2excel.py', json_fusion, excel_result], 
                       check=True, cwd=BASE_DIR, capture_output=True)
         
@@ -163,14 +302,43 @@ def upload():
         })
         save_history(history)
         
-        return jsonify({
-            'success': True,
+        publier(job, {
+            'evenement': 'termine',
             'json': Path(json_fusion).name,
-            'excel': Path(excel_result).name.replace('.xlsx', '.bin')  # URL avec .bin        })
+            'excel': Path(excel_result).name.replace('.xlsx', '.bin')  # URL avec .bin
         })
     
     except subprocess.CalledProcessError as e:
-        return jsonify({'error': str(e)}), 500
+        publier(job, {'evenement': 'erreur', 'message': f"{e} {e.stderr or ''}".strip()})
+    except Exception as e:
+        publier(job, {'evenement': 'erreur', 'message': str(e)})
+
+
+@app.route('/progression/<job>')
+def progression(job):
+    """Événements du traitement en Server-Sent Events (depuis le début, jusqu'à la fin)"""
+    etat = JOBS.get(job)  # gardé même si le traitement sort de JOBS
+    if etat is None:
+        return "Non trouvé", 404
+    
+    def flux():
+        envoyes = 0
+        while True:
+            with jobs_condition:
+                if len(etat['evenements']) == envoyes and not etat['fini']:
+                    jobs_condition.wait(SSE_ATTENTE)
+                nouveaux = etat['evenements'][envoyes:]
+                fini = etat['fini']
+            if not nouveaux:
+                yield ": attente\n\n"
+            for evenement in nouveaux:
+                yield f"data: {json.dumps(evenement, ensure_ascii=False)}\n\n"
+            envoyes += len(nouveaux)
+            if fini:
+                return
+    
+    return Response(flux(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/download/<path:filename>')
 def download(filename):
@@ -192,4 +360,4 @@ def history():
     return jsonify(load_history())
 
 if __name__ == '__main__':
-    app.run(port=8080, host='0.0.0.0')
+    app.run(port=8080, host='0.0.0.0', threaded=True)
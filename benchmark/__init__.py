@@ -0,0 +1,16 @@
+"""
+Corpus de référence et mesure du pipeline
+=========================================
+Génère des questionnaires remplis synthétiques dont les réponses sont
+connues, puis mesure detect0 dessus: débit, latence de chaque étape,
+pic de mémoire et exactitude. Chaque optimisation se mesure ainsi sur le
+même corpus, sans données réelles.
+
+Usage (depuis la racine du dépôt):
+    python -m benchmark generer template.json corpus/ --pages 50 [--graine 0] [--dpi 300] [--pdf]
+    python -m benchmark mesurer corpus/ [--recalage] [--pdf --workers 4] [--json rapport.json]
+    python -m benchmark mesurer corpus/ --reference rapport.json
+    python -m benchmark deduplication [--tailles 100 1000 10000]
+"""
+from benchmark.generateur import generer_corpus, generer_page
+from benchmark.mesure import afficher_rapport, mesurer_corpus
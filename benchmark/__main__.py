@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+python -m benchmark generer template.json corpus/ --pages 50
+python -m benchmark mesurer corpus/ [--recalage] [--pdf --workers N] [--json rapport.json]
+python -m benchmark deduplication [--tailles 100 1000 10000]
+python -m benchmark nettoyage corpus/*.jpg [--moteurs]
+"""
+import argparse
+import json
+import os
+import sys
+
+import cv2
+
+import detect0
+from benchmark import deduplication, generateur, mesure, nettoyage
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmark',
+                                     description="Corpus de référence et mesure du pipeline")
+    commandes = parser.add_subparsers(dest='commande', required=True)
+
+    generer = commandes.add_parser('generer', help="Génère un corpus de questionnaires remplis synthétiques")
+    generer.add_argument('template_json', help="Template (template.json)")
+    generer.add_argument('dossier', help="Dossier du corpus")
+    generer.add_argument('--pages', type=int, default=20, help="Nombre de pages (défaut 20)")
+    generer.add_argument('--graine', type=int, default=0, help="Graine (même graine, même corpus; défaut 0)")
+    generer.add_argument('--dpi', type=int, default=detect0.DPI_REFERENCE,
+                         help=f"Résolution des pages (défaut {detect0.DPI_REFERENCE})")
+    generer.add_argument('--pdf', action='store_true', help="Écrit aussi corpus.pdf (pages JPEG, comme un copieur)")
+    generer.add_argument('--sans-artefacts', action='store_true',
+                         help="Pages sans décalage, inclinaison, lignes verticales ni bruit")
+
+    mesurer = commandes.add_parser('mesurer', help="Mesure débit, latences, mémoire et exactitude sur un corpus")
+    mesurer.add_argument('dossier', help="Dossier du corpus (benchmark generer)")
+    mesurer.add_argument('--recalage', action='store_true', help="Mode recalage (voir detect0 --recalage)")
+    mesurer.add_argument('--pdf', action='store_true',
+                         help="Analyse corpus.pdf avec detect0.analyser_pdf (rastérisation comprise, poppler requis)")
+    mesurer.add_argument('--workers', type=int, default=1, help="Pages analysées en parallèle (--pdf, défaut 1)")
+    mesurer.add_argument('--backend', choices=['processus', 'threads'], default=detect0.BACKEND,
+                         help=f"Type de workers (--pdf, défaut {detect0.BACKEND})")
+    mesurer.add_argument('--json', metavar='RAPPORT', help="Écrit le rapport en JSON")
+    mesurer.add_argument('--reference', metavar='RAPPORT',
+                         help="Rapport JSON précédent: affiche l'écart de débit et d'exactitude")
+
+    dedup = commandes.add_parser('deduplication',
+                                 help="Compare la déduplication des cases (grille) à la version quadratique")
+    dedup.add_argument('--tailles', type=int, nargs='+', default=[100, 1000, 10000],
+                       help="Nombres de candidats (défaut 100 1000 10000)")
+    dedup.add_argument('--repetitions', type=int, default=3, help="Meilleur temps de N essais (défaut 3)")
+
+    nett = commandes.add_parser('nettoyage',
+                                help="Compare le nettoyage partagé (base + agressif) aux nettoyages séparés")
+    nett.add_argument('images', nargs='+', help="Pages (PNG, JPEG)")
+    nett.add_argument('--repetitions', type=int, default=3, help="Meilleur temps de N essais (défaut 3)")
+    nett.add_argument('--moteurs', action='store_true',
+                      help="Compare plutôt les moteurs de suppression des lignes verticales (HOUGH_MOTEUR)")
+    args = parser.parse_args()
+
+    if args.commande == 'generer':
+        artefacts = {nom: 0 for nom in generateur.ARTEFACTS} if args.sans_artefacts else None
+        chemin = generateur.generer_corpus(args.template_json, args.dossier, args.pages, args.graine,
+                                           args.dpi, artefacts, args.pdf)
+        print(f"\n✓ {args.pages} page(s) à {args.dpi} DPI → {chemin}\n")
+        return
+
+    if args.commande == 'deduplication':
+        deduplication.afficher_deduplication(
+            deduplication.comparer_deduplication(args.tailles, args.repetitions))
+        return
+
+    if args.commande == 'nettoyage':
+        images = ((os.path.basename(chemin), cv2.imread(chemin)) for chemin in args.images)
+        if args.moteurs:
+            nettoyage.afficher_moteurs(images)
+        else:
+            nettoyage.afficher_nettoyage(nettoyage.comparer_nettoyage(images, args.repetitions))
+        return
+
+    rapport = mesure.mesurer_corpus(args.dossier, 'recalage' if args.recalage else None,
+                                    args.pdf, args.workers, args.backend)
+    reference = None
+    if args.reference:
+        with open(args.reference, 'r', encoding='utf-8') as f:
+            reference = json.load(f)
+    mesure.afficher_rapport(rapport, reference)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(rapport, f, ensure_ascii=False, indent=2)
+        print(f"\n✓ Rapport → {args.json}")
+    print()
+    manques = mesure.reperes_manques(rapport)
+    if manques:
+        print(f"✗ {manques} détection(s) de repères manquée(s)\n")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
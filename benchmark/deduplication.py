@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Mesure de la déduplication des cases
+====================================
+Compare detection_cases.dedupliquer_cases (grille de centres) à la
+version quadratique historique sur des candidats synthétiques.
+"""
+import time
+
+import numpy as np
+
+import detection_cases
+
+
+def dedupliquer_cases_quadratique(cases, distance_min=None):
+    """
+    Version de référence de detection_cases.dedupliquer_cases
+    (comparaison à toutes les cases gardées)
+    """
+    if not cases:
+        return []
+    if distance_min is None:
+        distance_min = detection_cases.DEDUP_DISTANCE_MIN
+    
+    # Trier par aire décroissante (garder les plus grandes)
+    cases_triees = sorted(cases, key=lambda c: c['aire'], reverse=True)
+    
+    cases_uniques = []
+    
+    for case in cases_triees:
+        est_doublon = False
+        
+        for case_unique in cases_uniques:
+            # Distance entre centres
+            cx1 = case['x'] + case['w'] / 2
+            cy1 = case['y'] + case['h'] / 2
+            cx2 = case_unique['x'] + case_unique['w'] / 2
+            cy2 = case_unique['y'] + case_unique['h'] / 2
+            
+            distance = ((cx1 - cx2)**2 + (cy1 - cy2)**2)**0.5
+            
+            if distance < distance_min:
+                est_doublon = True
+                break
+        
+        if not est_doublon:
+            cases_uniques.append(case)
+    
+    return cases_uniques
+
+
+def generer_candidats(n, graine=0, largeur=4960, hauteur=7016):
+    """
+    Candidats synthétiques: environ un tiers de cases isolées, chacune avec
+    des doublons décalés de quelques pixels (contours intérieur/extérieur, bruit)
+    """
+    rng = np.random.default_rng(graine)
+    cases = []
+    while len(cases) < n:
+        x = int(rng.integers(0, largeur - 60))
+        y = int(rng.integers(0, hauteur - 60))
+        w = int(rng.integers(35, 55))
+        h = int(rng.integers(35, 55))
+        for _ in range(int(rng.integers(1, 5))):
+            d = rng.integers(-6, 7, 4)
+            cw, ch = max(1, w + int(d[2])), max(1, h + int(d[3]))
+            cases.append({
+                'x': x + int(d[0]), 'y': y + int(d[1]), 'w': cw, 'h': ch,
+                'aire': int(rng.integers(cw * ch - 200, cw * ch + 1)),
+                'ratio': round(cw / ch, 2)
+            })
+    return cases[:n]
+
+
+def comparer_deduplication(tailles=(100, 1000, 10000), repetitions=3):
+    """
+    Temps des deux déduplications sur les mêmes candidats
+
+    Returns:
+        Liste de dicts {n, uniques, identique, t_grille, t_quadratique}
+        (temps en secondes, meilleur de `repetitions`)
+    """
+    resultats = []
+    for n in tailles:
+        cases = generer_candidats(n, graine=n)
+        
+        temps = {}
+        sorties = {}
+        for nom, fonction in (('grille', detection_cases.dedupliquer_cases),
+                              ('quadratique', dedupliquer_cases_quadratique)):
+            meilleur = None
+            for _ in range(repetitions):
+                t0 = time.perf_counter()
+                sorties[nom] = fonction(cases)
+                dt = time.perf_counter() - t0
+                meilleur = dt if meilleur is None else min(meilleur, dt)
+            temps[nom] = meilleur
+        
+        resultats.append({
+            'n': n,
+            'uniques': len(sorties['grille']),
+            'identique': sorties['grille'] == sorties['quadratique'],
+            't_grille': temps['grille'],
+            't_quadratique': temps['quadratique']
+        })
+    return resultats
+
+
+def afficher_deduplication(resultats):
+    """Tableau des temps de comparer_deduplication"""
+    print(f"{'n':>7} {'uniques':>8} {'grille':>10} {'quadratique':>12}  identique")
+    for r in resultats:
+        print(f"{r['n']:>7} {r['uniques']:>8} {r['t_grille']*1000:>8.2f}ms {r['t_quadratique']*1000:>10.2f}ms  "
+              f"{'✓' if r['identique'] else '✗'}")
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Générateur de questionnaires remplis synthétiques
+=================================================
+Chaque page est dessinée d'après une page du template (coordonnées à
+DPI_REFERENCE): ligne d'échelle graduée, rectangle gris, cases et
+libellés, puis remplie au hasard (coches, croix, cases noircies, note
+entourée au crayon sur l'échelle) et abîmée comme par un copieur
+(décalage, inclinaison, lignes verticales, bruit).
+
+Les réponses dessinées sont la vérité terrain du corpus (verite.json).
+Une même graine donne toujours le même corpus.
+"""
+import json
+import os
+import random
+
+import cv2
+import numpy as np
+from PIL import Image
+
+import detect0
+
+LARGEUR_PAGE = 4960        # A4 à DPI_REFERENCE (pixels)
+HAUTEUR_PAGE = 7016
+# Fond grisé du rectangle: trame de points imprimés (comme une impression
+# en niveaux de gris), pas un aplat. Un aplat sombre passe en noir à la
+# binarisation et son bord haut devient la plus longue ligne de la page
+TRAME_DENSITE = 0.12       # Part des points encrés de la trame
+TRAME_POINT = 2            # Côté d'un point de trame (pixels)
+TRAME_NIVEAU = 90          # Niveau de gris des points (le seuil des cases est à 180)
+TRAME_GRAINE = 0           # Même trame sur toutes les pages (formulaire imprimé)
+MARGE_RECTANGLE = 150      # Marge du rectangle gris autour des cases de la moitié basse (pixels)
+BORD_RECTANGLE = 250       # Marge gauche et droite du rectangle gris (pixels)
+ENCRE = (20, 70)           # Niveaux de gris de l'encre (min, max)
+CRAYON = (90, 140)         # Niveaux de gris du crayon sur l'échelle (min, max)
+QUALITE_JPEG = 90          # Pages du corpus en JPEG, comme les copieurs
+
+# Réponses
+PROBA_COCHEE = 0.35        # Probabilité qu'une case soit cochée
+MARQUES = ('coche', 'croix', 'noircie')
+PROBA_ECHELLE = 0.8        # Probabilité qu'une note soit entourée sur l'échelle
+
+# Défauts de scan (valeurs max, tirées au hasard pour chaque page)
+ARTEFACTS = {
+    'decalage': 40,           # Décalage en X et en Y (pixels)
+    'inclinaison': 0.3,       # Rotation (degrés)
+    'lignes_verticales': 2,   # Lignes verticales parasites (nombre)
+    'bruit': 4,               # Écart-type du bruit gaussien (niveaux de gris)
+}
+
+
+# ============================================================
+# DESSIN
+# ============================================================
+
+def texte(image, chaine, x, y, taille=1.2, epaisseur=3, niveau=0):
+    """Texte imprimé (ASCII seulement: FONT_HERSHEY ne connaît pas les accents)"""
+    chaine = chaine.encode('ascii', 'replace').decode('ascii')
+    cv2.putText(image, chaine, (int(x), int(y)), cv2.FONT_HERSHEY_SIMPLEX, taille, niveau, epaisseur, cv2.LINE_AA)
+
+
+def rectangle_gris(template_page):
+    """Rectangle gris de la page: (x_gauche, y_haut, x_droite, y_bas), bornes exclues à droite et en bas"""
+    cases = [case for question in template_page['contenu'].values() for case in question['cases']]
+    basses = [case for case in cases if case['y'] > HAUTEUR_PAGE // 2]
+    if basses:
+        haut = min(case['y'] for case in basses) - MARGE_RECTANGLE
+        bas = max(case['y'] + case['h'] for case in basses) + MARGE_RECTANGLE
+    else:
+        haut, bas = int(HAUTEUR_PAGE * 0.55), int(HAUTEUR_PAGE * 0.7)
+    return BORD_RECTANGLE, haut, LARGEUR_PAGE - BORD_RECTANGLE, bas
+
+
+def reperes_page(template_page):
+    """
+    Les 6 repères (detect0.POINTS_REPERES) tels que dessinés sur la page
+    vierge, ou None si la page n'a pas d'échelle
+    """
+    echelle = template_page.get('echelle')
+    if not echelle:
+        return None
+    x_gauche, y_haut, x_droite, y_bas = rectangle_gris(template_page)
+    y_echelle = echelle['gauche']['y']
+    return {
+        'echelle_gauche': (echelle['gauche']['x'], y_echelle),
+        'echelle_droite': (echelle['droite']['x'], y_echelle),
+        'rect_haut_gauche': (x_gauche, y_haut),
+        'rect_haut_droite': (x_droite, y_haut),
+        'rect_bas_gauche': (x_gauche, y_bas),
+        'rect_bas_droite': (x_droite, y_bas),
+    }
+
+
+def dessiner_page_vierge(template_page):
+    """
+    Page imprimée vierge: échelle graduée de 0 à 5, rectangle gris tramé
+    autour des cases de la moitié basse, cases blanches, titres et libellés
+    """
+    image = np.full((HAUTEUR_PAGE, LARGEUR_PAGE), 255, dtype=np.uint8)
+    
+    # Rectangle gris (repères du recalage): points de trame répartis au hasard
+    x_gauche, haut, x_droite, bas = rectangle_gris(template_page)
+    rng_trame = np.random.default_rng(TRAME_GRAINE)
+    forme = (-(-(bas - haut) // TRAME_POINT), -(-(x_droite - x_gauche) // TRAME_POINT))
+    points = rng_trame.random(forme) < TRAME_DENSITE
+    trame = np.repeat(np.repeat(points, TRAME_POINT, axis=0), TRAME_POINT, axis=1)[:bas - haut, :x_droite - x_gauche]
+    image[haut:bas, x_gauche:x_droite][trame] = TRAME_NIVEAU
+    
+    # Échelle: ligne, graduations et chiffres (< LARGEUR_MAX_CHIFFRE)
+    echelle = template_page.get('echelle')
+    y_echelle = None
+    if echelle:
+        x_gauche, x_droite = echelle['gauche']['x'], echelle['droite']['x']
+        y_echelle = echelle['gauche']['y']
+        cv2.line(image, (x_gauche, y_echelle), (x_droite, y_echelle), 0, 6)
+        for score in range(6):
+            x = x_gauche + score * (x_droite - x_gauche) / 5
+            cv2.line(image, (int(x), y_echelle - 20), (int(x), y_echelle + 15), 0, 4)
+            texte(image, str(score), x - 18, y_echelle + 95, 1.6, 4)
+    
+    # Questions: titre au-dessus de la rangée, case et libellé à droite
+    for q_id, question in template_page['contenu'].items():
+        if not question['cases']:
+            continue
+        y_titre = min(case['y'] for case in question['cases']) - 70
+        # Pas de texte dans la bande où coter_echelle cherche le crayon
+        if y_echelle is None or not y_echelle - 150 < y_titre < y_echelle + 300:
+            texte(image, question.get('titre') or q_id, 300, y_titre)
+        for idx, case in enumerate(question['cases']):
+            x, y, w, h = case['x'], case['y'], case['w'], case['h']
+            cv2.rectangle(image, (x, y), (x + w, y + h), 255, -1)
+            cv2.rectangle(image, (x, y), (x + w, y + h), 0, 3)
+            texte(image, case.get('titre') or f"Option {idx + 1}", x + w + 25, y + h - 8)
+    return image
+
+
+def dessiner_marque(image, case, marque, rng):
+    """Coche, croix ou case noircie à la main dans une case"""
+    x, y, w, h = case['x'], case['y'], case['w'], case['h']
+    niveau = rng.randint(*ENCRE)
+    epaisseur = rng.randint(5, 8)
+    
+    def point(fx, fy):
+        return (int(x + w * (fx + rng.uniform(-0.08, 0.08))), int(y + h * (fy + rng.uniform(-0.08, 0.08))))
+    
+    if marque == 'noircie':
+        cv2.rectangle(image, (x + 4, y + 4), (x + w - 4, y + h - 4), niveau, -1)
+    elif marque == 'croix':
+        cv2.line(image, point(0.1, 0.1), point(0.9, 0.9), niveau, epaisseur, cv2.LINE_AA)
+        cv2.line(image, point(0.9, 0.1), point(0.1, 0.9), niveau, epaisseur, cv2.LINE_AA)
+    else:
+        points = np.array([point(0.15, 0.5), point(0.45, 0.85), point(1.1, -0.25)], dtype=np.int32)
+        cv2.polylines(image, [points], False, niveau, epaisseur, cv2.LINE_AA)
+
+
+def entourer_note(image, echelle, score, rng):
+    """Note entourée au crayon sous l'échelle (blob plus large qu'un chiffre)"""
+    x_gauche, x_droite = echelle['gauche']['x'], echelle['droite']['x']
+    x = x_gauche + score * (x_droite - x_gauche) / 5 + rng.randint(-10, 10)
+    centre = (int(x), echelle['gauche']['y'] + 78 + rng.randint(-8, 8))
+    axes = (rng.randint(55, 75), rng.randint(45, 60))
+    cv2.ellipse(image, centre, axes, rng.uniform(-20, 20), rng.randint(0, 40), 360 + rng.randint(0, 40),
+                rng.randint(*CRAYON), 4, cv2.LINE_AA)
+
+
+def matrice_abimer(dx, dy, angle):
+    """Transformation affine (2x3) de la page: rotation autour du centre puis décalage"""
+    M = cv2.getRotationMatrix2D((LARGEUR_PAGE / 2, HAUTEUR_PAGE / 2), angle, 1.0)
+    M[:, 2] += (dx, dy)
+    return M
+
+
+def abimer(image, rng, artefacts):
+    """
+    Défauts de copieur: décalage et inclinaison, lignes verticales, bruit
+    
+    Returns:
+        tuple (image, dict des défauts tirés)
+    """
+    dx = rng.randint(-artefacts['decalage'], artefacts['decalage'])
+    dy = rng.randint(-artefacts['decalage'], artefacts['decalage'])
+    angle = rng.uniform(-artefacts['inclinaison'], artefacts['inclinaison'])
+    M = matrice_abimer(dx, dy, angle)
+    image = cv2.warpAffine(image, M, (LARGEUR_PAGE, HAUTEUR_PAGE), flags=cv2.INTER_LINEAR,
+                           borderValue=255)
+    
+    lignes = []
+    for _ in range(rng.randint(0, artefacts['lignes_verticales'])):
+        x = rng.randint(100, LARGEUR_PAGE - 100)
+        # 1 ou 2 pixels de large (cv2.line en épaisseur 2 en trace 3)
+        image[:, x:x + rng.randint(1, 2)] = rng.randint(60, 140)
+        lignes.append(x)
+    
+    if artefacts['bruit']:
+        bruit = np.empty(image.shape, dtype=np.int16)
+        cv2.setRNGSeed(rng.randint(0, 2**31 - 1))
+        cv2.randn(bruit, 0, artefacts['bruit'])
+        image = cv2.add(image, bruit, dtype=cv2.CV_8U)
+    
+    return image, {'dx': dx, 'dy': dy, 'angle': round(angle, 4), 'lignes_verticales': lignes}
+
+
+# ============================================================
+# PAGES ET CORPUS
+# ============================================================
+
+def generer_page(template_page, graine, artefacts=None, vierge=False):
+    """
+    Questionnaire rempli synthétique (DPI_REFERENCE, niveaux de gris)
+    
+    Args:
+        template_page: Page du template (coordonnées à DPI_REFERENCE)
+        graine: Graine des réponses et des défauts
+        artefacts: Défauts de scan (défaut ARTEFACTS)
+        vierge: Page imprimée seule, sans réponses ni défauts (calibrage)
+    
+    Returns:
+        tuple (image, vérité {'questions': {q_id: [cochée par case]},
+        'score_echelle': [notes entourées], 'artefacts', 'reperes': les 6
+        repères dessinés après décalage et inclinaison, None sans échelle})
+    """
+    rng = random.Random(graine)
+    image = dessiner_page_vierge(template_page)
+    reperes = reperes_page(template_page)
+    verite = {'questions': {}, 'score_echelle': [], 'artefacts': {}, 'reperes': reperes}
+    if vierge:
+        return image, verite
+    
+    for q_id, question in template_page['contenu'].items():
+        cochees = []
+        for case in question['cases']:
+            cochee = rng.random() < PROBA_COCHEE
+            if cochee:
+                dessiner_marque(image, case, rng.choice(MARQUES), rng)
+            cochees.append(cochee)
+        verite['questions'][q_id] = cochees
+    
+    echelle = template_page.get('echelle')
+    if echelle and rng.random() < PROBA_ECHELLE:
+        score = rng.randint(0, 5)
+        entourer_note(image, echelle, score, rng)
+        verite['score_echelle'] = [score]
+    
+    image, verite['artefacts'] = abimer(image, rng, ARTEFACTS if artefacts is None else artefacts)
+    if reperes:
+        M = matrice_abimer(verite['artefacts']['dx'], verite['artefacts']['dy'], verite['artefacts']['angle'])
+        verite['reperes'] = {nom: [round(float(M[0] @ (x, y, 1)), 1), round(float(M[1] @ (x, y, 1)), 1)]
+                             for nom, (x, y) in reperes.items()}
+    return image, verite
+
+
+def redimensionner(image, dpi):
+    """Image à DPI_REFERENCE ramenée à dpi"""
+    if dpi == detect0.DPI_REFERENCE:
+        return image
+    facteur = dpi / detect0.DPI_REFERENCE
+    taille = (round(image.shape[1] * facteur), round(image.shape[0] * facteur))
+    return cv2.resize(image, taille, interpolation=cv2.INTER_AREA)
+
+
+def generer_corpus(template_json, dossier, nb_pages, graine=0, dpi=None, artefacts=None, pdf=False):
+    """
+    Écrit un corpus de référence dans dossier
+    
+    - page_0001.jpg...: pages remplies, à dpi (défaut DPI_REFERENCE), les
+      pages du template en alternance
+    - verite.json: réponses dessinées et repères de chaque page (repères à
+      DPI_REFERENCE), paramètres du corpus
+    - template.json: le template, calibré (repères et signatures, voir
+      detect0.calibrer_template) sur ses pages vierges synthétiques
+    - corpus.pdf (pdf=True): les mêmes pages dans un PDF de scans
+    
+    Returns:
+        Chemin de verite.json
+    """
+    dpi = dpi or detect0.DPI_REFERENCE
+    with open(template_json, 'r', encoding='utf-8') as f:
+        template = json.load(f)
+    os.makedirs(dossier, exist_ok=True)
+    
+    # Calibrage sur les pages vierges, dans le repère du template
+    detect0.configurer_dpi(detect0.dpi_template(template))
+    vierges = [dessiner_page_vierge(page) for page in template['pages']]
+    detect0.calibrer_template(template, vierges)
+    del vierges
+    with open(os.path.join(dossier, 'template.json'), 'w', encoding='utf-8') as f:
+        json.dump(template, f, ensure_ascii=False, indent=2)
+    
+    pages = []
+    for page_num in range(1, nb_pages + 1):
+        indice = (page_num - 1) % len(template['pages'])
+        template_page = template['pages'][indice]
+        image, verite = generer_page(template_page, graine * 1000003 + page_num, artefacts)
+        fichier = f"page_{page_num:04d}.jpg"
+        cv2.imwrite(os.path.join(dossier, fichier), redimensionner(image, dpi),
+                    [cv2.IMWRITE_JPEG_QUALITY, QUALITE_JPEG])
+        pages.append(dict(verite, page=page_num, fichier=fichier,
+                          page_template=template_page.get('page', indice + 1)))
+        print(f"  ✓ {fichier}")
+    
+    if pdf:
+        ecrire_pdf(dossier, pages, dpi)
+    
+    chemin = os.path.join(dossier, 'verite.json')
+    with open(chemin, 'w', encoding='utf-8') as f:
+        json.dump({'template': os.path.basename(template_json), 'graine': graine, 'dpi': dpi,
+                   'artefacts': ARTEFACTS if artefacts is None else artefacts, 'pages': pages},
+                  f, ensure_ascii=False, indent=2)
+    return chemin
+
+
+def ecrire_pdf(dossier, pages, dpi):
+    """corpus.pdf: une image JPEG par page, comme un copieur (Pillow)"""
+    images = (Image.open(os.path.join(dossier, page['fichier'])) for page in pages)
+    premiere = next(images)
+    premiere.save(os.path.join(dossier, 'corpus.pdf'), save_all=True, append_images=images,
+                  resolution=dpi, quality=QUALITE_JPEG)
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Mesure du pipeline sur un corpus de référence
+=============================================
+Rejoue les pages d'un corpus (generateur.generer_corpus) dans detect0 et
+rapporte le débit, la latence de chaque étape (percentiles sur les
+pages), le pic de mémoire et l'exactitude par rapport à la vérité terrain.
+
+Les repères (6 points de detecter_reperes, modes 'complet' et 'pyramide')
+et l'échelle (detecter_echelle_seule, dans la bande du template et sur la
+page entière) sont aussi comparés aux repères dessinés: un repère manqué
+fait échouer la mesure.
+
+Les caches (résultats, pages rastérisées) et les images de debug sont
+désactivés: chaque mesure refait tout le travail.
+"""
+import contextlib
+import io
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+import detect0
+import mesures
+import reperage
+import routage_templates
+
+PERCENTILES = (50, 90, 99)
+TOLERANCE_REPERES = 40     # Écart max d'un repère détecté au repère dessiné (pixels à DPI_REFERENCE)
+
+
+def lire_corpus(dossier):
+    """Contenu de verite.json"""
+    with open(os.path.join(dossier, 'verite.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def comparer(resultat, verite):
+    """
+    Compare le résultat d'une page (analyser_page) à sa vérité terrain
+
+    Returns:
+        dict {'cases': (justes, total), 'echelle': bool, 'template': bool,
+        'erreurs': [description de chaque écart]}
+    """
+    erreurs = []
+    total = fausses = 0
+    for q_id, attendues in verite['questions'].items():
+        reponses = resultat.get('questions', {}).get(q_id, {}).get('reponses', [])
+        lues = {r['index']: r['reponse'] == 'cochée' for r in reponses}
+        for idx, attendue in enumerate(attendues):
+            total += 1
+            if lues.get(idx) != attendue:
+                fausses += 1
+                lue = {True: 'cochée', False: 'vide', None: 'absente'}[lues.get(idx)]
+                erreurs.append(f"{q_id}[{idx}]: attendu {'cochée' if attendue else 'vide'}, lu {lue}")
+
+    echelle = sorted(resultat.get('score_echelle') or []) == verite['score_echelle']
+    if not echelle:
+        erreurs.append(f"échelle: attendu {verite['score_echelle']}, lu {resultat.get('score_echelle')}")
+    template = resultat.get('page_template') == verite['page_template']
+    if not template:
+        erreurs.append(f"template: attendu page {verite['page_template']}, lu {resultat.get('page_template')}")
+    if resultat.get('erreur'):
+        erreurs.append(f"erreur: {resultat['erreur']}")
+    return {'cases': (total - fausses, total), 'echelle': echelle, 'template': template, 'erreurs': erreurs}
+
+
+def ecart_reperes(detectes, attendus, noms):
+    """Plus grand écart (pixels) entre points détectés et attendus, None si rien n'est détecté"""
+    if not detectes:
+        return None
+    return max(float(np.hypot(detectes[nom][0] - attendus[nom][0], detectes[nom][1] - attendus[nom][1]))
+               for nom in noms)
+
+
+def methodes_reperes(template_page):
+    """
+    Détecteurs de repères comparés à la vérité terrain: nom → fonction
+    (image → dict des points trouvés, ou None)
+    """
+    def echelle(image, attendue):
+        if attendue:
+            # Bande seule, sans le repli sur la page entière de detecter_echelle_seule
+            trouvee = detect0.detecter_echelle_bande(image, attendue, detect0.TOLERANCE_ECHELLE)
+        else:
+            trouvee = detect0.detecter_echelle_seule(image, None, 0)
+        if not trouvee:
+            return None
+        return {'echelle_gauche': (trouvee['gauche']['x'], trouvee['gauche']['y']),
+                'echelle_droite': (trouvee['droite']['x'], trouvee['droite']['y'])}
+    
+    return {
+        'reperes_complet': lambda image: reperage.detecter_reperes(image, 'complet'),
+        'reperes_pyramide': lambda image: reperage.detecter_reperes(image, 'pyramide'),
+        'echelle_bande': lambda image: echelle(image, template_page.get('echelle')),
+        'echelle_page': lambda image: echelle(image, None),
+    }
+
+
+def mesurer_reperes(dossier, verite, template_pages):
+    """
+    Compare les repères détectés sur chaque page du corpus (JPEG) aux
+    repères dessinés (verite.json), pour chaque méthode de methodes_reperes
+    
+    Un repère est manqué s'il est à plus de TOLERANCE_REPERES (mis à
+    l'échelle de la résolution du corpus) du repère dessiné.
+    
+    Returns:
+        tuple (dict méthode → {'justes', 'pages', 'ecart_max', 'secondes'},
+        dict page → [description de chaque repère manqué])
+    """
+    facteur = verite['dpi'] / detect0.DPI_REFERENCE
+    tolerance = TOLERANCE_REPERES * facteur
+    releves = {}
+    erreurs = {}
+    for page in verite['pages']:
+        if not page.get('reperes'):
+            continue
+        attendus = {nom: (x * facteur, y * facteur) for nom, (x, y) in page['reperes'].items()}
+        template_page = next((t for i, t in enumerate(template_pages, 1)
+                              if t.get('page', i) == page['page_template']), template_pages[0])
+        image = cv2.imread(os.path.join(dossier, page['fichier']), cv2.IMREAD_GRAYSCALE)
+        
+        for methode, detecter in methodes_reperes(template_page).items():
+            noms = reperage.POINTS_REPERES if methode.startswith('reperes') else ('echelle_gauche', 'echelle_droite')
+            with contextlib.redirect_stdout(io.StringIO()):
+                t0 = time.perf_counter()
+                detectes = detecter(image)
+                secondes = time.perf_counter() - t0
+            ecart = ecart_reperes(detectes, attendus, noms)
+            
+            releve = releves.setdefault(methode, {'justes': 0, 'pages': 0, 'ecart_max': 0.0, 'secondes': 0.0})
+            releve['pages'] += 1
+            releve['secondes'] += secondes
+            if ecart is not None and ecart <= tolerance:
+                releve['justes'] += 1
+                releve['ecart_max'] = max(releve['ecart_max'], ecart)
+            else:
+                decrit = 'non détectés' if ecart is None else f"écart {ecart:.0f} px > {tolerance:.0f} px"
+                erreurs.setdefault(page['page'], []).append(f"repères {methode}: {decrit}")
+        del image
+    return releves, erreurs
+
+
+def latences_etapes(evenements):
+    """
+    Temps de chaque étape par page (appels d'une même page cumulés), puis
+    percentiles sur les pages
+
+    Returns:
+        dict nom → {'pages', 'p50', 'p90', 'p99', 'max'} (secondes), par
+        temps total décroissant
+    """
+    par_page = {}
+    for e in evenements:
+        if e['page'] is None:
+            continue
+        cle = (e['etape'], e['page'])
+        par_page[cle] = par_page.get(cle, 0.0) + e['duree']
+
+    durees = {}
+    for (nom, _), duree in par_page.items():
+        durees.setdefault(nom, []).append(duree)
+
+    latences = {}
+    for nom, valeurs in sorted(durees.items(), key=lambda item: -sum(item[1])):
+        latences[nom] = {'pages': len(valeurs)}
+        for p in PERCENTILES:
+            latences[nom][f"p{p}"] = float(np.percentile(valeurs, p))
+        latences[nom]['max'] = max(valeurs)
+    return latences
+
+
+def mesurer_corpus(dossier, mode=None, pdf=False, workers=1, backend=None):
+    """
+    Analyse toutes les pages du corpus et mesure
+
+    Args:
+        mode: Mode d'analyse (défaut detect0.MODE_ANALYSE)
+        pdf: Analyse corpus.pdf par detect0.analyser_pdf (rastérisation ou
+            extraction comprise, workers possibles) au lieu de lire les JPEG
+        workers, backend: Voir detect0.analyser_pdf (pdf=True)
+
+    Returns:
+        dict du rapport: pages, secondes, pages_par_seconde, etapes
+        (latences_etapes), memoire_mo {processus, enfants}, exactitude
+        {cases, echelles, templates}, reperes (mesurer_reperes, hors du
+        temps mesuré), erreurs {page: [...]}
+    """
+    verite = lire_corpus(dossier)
+    detect0.IMAGES_DEBUG = 'none'
+    detect0.PROGRESSION = False
+    detect0.CACHE_DOSSIER = None
+    detect0.RASTERS_DOSSIER = None
+    detect0.configurer_dpi(verite['dpi'])
+    with open(os.path.join(dossier, 'template.json'), 'r', encoding='utf-8') as f:
+        template_pages = detect0.pages_template(json.load(f))
+    mesures.collecter()
+
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if pdf:
+            resultats = detect0.analyser_pdf(os.path.join(dossier, 'corpus.pdf'), template_pages, mode,
+                                             workers, backend or detect0.BACKEND)
+        else:
+            resultats = []
+            index = routage_templates.construire_index(template_pages)
+            for page in verite['pages']:
+                with mesures.page(page['page']), mesures.etape('lecture'):
+                    image = cv2.imread(os.path.join(dossier, page['fichier']), cv2.IMREAD_GRAYSCALE)
+                resultats.append(detect0.analyser_page_mesuree(image, page['page'], template_pages, index, mode))
+                del image
+    secondes = time.perf_counter() - t0
+
+    cases = [0, 0]
+    echelles = templates = 0
+    erreurs = {}
+    for resultat, attendu in zip(resultats, verite['pages']):
+        comparaison = comparer(resultat, attendu)
+        cases[0] += comparaison['cases'][0]
+        cases[1] += comparaison['cases'][1]
+        echelles += comparaison['echelle']
+        templates += comparaison['template']
+        if comparaison['erreurs']:
+            erreurs[attendu['page']] = comparaison['erreurs']
+
+    processus, enfants = detect0.pic_memoire()
+    reperes, erreurs_reperes = mesurer_reperes(dossier, verite, template_pages)
+    for page, liste in erreurs_reperes.items():
+        erreurs.setdefault(page, []).extend(liste)
+    
+    return {
+        'corpus': os.path.abspath(dossier),
+        'mode': mode or detect0.MODE_ANALYSE,
+        'dpi': verite['dpi'],
+        'pdf': pdf,
+        'workers': workers if pdf else 1,
+        'pages': len(resultats),
+        'secondes': secondes,
+        'pages_par_seconde': len(resultats) / secondes if secondes else None,
+        'etapes': latences_etapes(mesures.collecter()),
+        'memoire_mo': {'processus': processus, 'enfants': enfants},
+        'exactitude': {
+            'cases': cases,
+            'echelles': [echelles, len(resultats)],
+            'templates': [templates, len(resultats)],
+        },
+        'reperes': reperes,
+        'erreurs': erreurs,
+    }
+
+
+def reperes_manques(rapport):
+    """Nombre de (page, méthode) dont les repères sont manqués (voir mesurer_reperes)"""
+    return sum(releve['pages'] - releve['justes'] for releve in rapport.get('reperes', {}).values())
+
+
+def afficher_rapport(rapport, reference=None):
+    """Rapport lisible; avec reference (rapport précédent), les écarts de débit et d'exactitude"""
+    print(f"\n{rapport['pages']} page(s) en {rapport['secondes']:.1f}s → "
+          f"{rapport['pages_par_seconde']:.2f} pages/s ({rapport['mode']}, {rapport['dpi']} DPI, "
+          f"{'PDF, ' + str(rapport['workers']) + ' worker(s)' if rapport['pdf'] else 'JPEG'})")
+
+    print(f"\n{'étape':<20} {'pages':>6}" + ''.join(f" {'p' + str(p):>8}" for p in PERCENTILES) + f" {'max':>8}")
+    for nom, latence in rapport['etapes'].items():
+        print(f"{nom:<20} {latence['pages']:>6}"
+              + ''.join(f" {latence['p' + str(p)] * 1000:>6.0f}ms" for p in PERCENTILES)
+              + f" {latence['max'] * 1000:>6.0f}ms")
+
+    memoire = rapport['memoire_mo']
+    print(f"\nPic mémoire: {memoire['processus']:.0f} Mo (enfants: {memoire['enfants']:.0f} Mo)")
+
+    exactitude = rapport['exactitude']
+    justes, total = exactitude['cases']
+    print(f"Exactitude: cases {justes}/{total} ({100 * justes / total if total else 0:.2f} %), "
+          f"échelles {exactitude['echelles'][0]}/{exactitude['echelles'][1]}, "
+          f"templates {exactitude['templates'][0]}/{exactitude['templates'][1]}")
+    for methode, releve in rapport.get('reperes', {}).items():
+        print(f"Repères {methode:<17} {releve['justes']}/{releve['pages']}, écart max "
+              f"{releve['ecart_max']:.0f} px, {releve['secondes'] * 1000 / max(1, releve['pages']):.0f} ms/page")
+    for page, erreurs in rapport['erreurs'].items():
+        for erreur in erreurs:
+            print(f"  ✗ page {page} {erreur}")
+
+    if reference:
+        justes_ref, total_ref = reference['exactitude']['cases']
+        print(f"\nRéférence: {reference['pages_par_seconde']:.2f} → {rapport['pages_par_seconde']:.2f} pages/s "
+              f"(×{rapport['pages_par_seconde'] / reference['pages_par_seconde']:.2f}), "
+              f"cases justes {justes_ref}/{total_ref} → {justes}/{total}")
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Mesure du nettoyage des pages
+=============================
+Compare reperage.nettoyer_images (étapes communes calculées une fois) aux
+nettoyages base et agressif historiques, calculés séparément, et les
+moteurs de suppression des lignes verticales longues (HOUGH_MOTEUR).
+"""
+import time
+
+import cv2
+import numpy as np
+
+import reperage
+
+
+def binariser_reference(image):
+    """Niveaux de gris, Otsu et inversion (texte en blanc), comme chaque nettoyage historique"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image.copy()
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    if np.mean(binary) > 127:
+        binary = cv2.bitwise_not(binary)
+    return binary
+
+
+def supprimer_lignes_reference(binary, result, largeur_max, longueur_min, verticales):
+    """Ouverture morphologique puis effacement des contours fins et longs (version historique)"""
+    forme = (1, longueur_min) if verticales else (longueur_min, 1)
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, forme)
+    detected = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel)
+    contours, _ = cv2.findContours(detected, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    for cnt in contours:
+        x, y, w, h = cv2.boundingRect(cnt)
+        epaisseur, longueur = (w, h) if verticales else (h, w)
+        if epaisseur <= largeur_max and longueur >= longueur_min:
+            cv2.rectangle(result, (x, y), (x+w, y+h), 0, -1)
+
+
+def nettoyer_image_base_reference(image):
+    """
+    Version de référence de reperage.nettoyer_image_base
+    (pipeline complet, sans étape partagée)
+    """
+    binary = binariser_reference(image)
+    result = binary.copy()
+    supprimer_lignes_reference(binary, result, reperage.FINES_LARGEUR_MAX, reperage.FINES_LONGUEUR_MIN, False)
+    supprimer_lignes_reference(binary, result, reperage.FINES_LARGEUR_MAX, reperage.FINES_LONGUEUR_MIN, True)
+    return cv2.cvtColor(cv2.bitwise_not(result), cv2.COLOR_GRAY2BGR)
+
+
+def nettoyer_agressif_reference(image):
+    """
+    Version de référence de reperage.nettoyer_lignes_verticales_agressif
+    (pipeline complet, sans étape partagée, moteur Hough)
+    """
+    binary = binariser_reference(image)
+    result = binary.copy()
+    supprimer_lignes_reference(binary, result, reperage.FINES_LARGEUR_MAX, reperage.FINES_LONGUEUR_MIN, False)
+    supprimer_lignes_reference(binary, result, reperage.MORPH_LARGEUR_MAX, reperage.MORPH_HAUTEUR_MIN, True)
+
+    if reperage.HOUGH_ENABLE:
+        edges = cv2.Canny(binary, 50, 150)
+        lines = cv2.HoughLinesP(edges, 1, np.pi/180,
+                                threshold=reperage.HOUGH_THRESHOLD,
+                                minLineLength=reperage.HOUGH_MIN_LENGTH,
+                                maxLineGap=reperage.HOUGH_MAX_GAP)
+        for line in (lines if lines is not None else []):
+            x1, y1, x2, y2 = line[0]
+            angle = abs(np.arctan2(y2-y1, x2-x1) * 180 / np.pi) if x2 != x1 else 90
+            if (reperage.HOUGH_ANGLE_MIN <= angle <= reperage.HOUGH_ANGLE_MAX
+                    and abs(y2 - y1) >= reperage.HOUGH_MIN_LENGTH):
+                x_moy = (x1 + x2) // 2
+                cv2.rectangle(result,
+                              (x_moy - reperage.HOUGH_EPAISSEUR_SUP, min(y1, y2)),
+                              (x_moy + reperage.HOUGH_EPAISSEUR_SUP, max(y1, y2)),
+                              0, -1)
+
+    return cv2.cvtColor(cv2.bitwise_not(result), cv2.COLOR_GRAY2BGR)
+
+
+def comparer_nettoyage(images, repetitions=3):
+    """
+    Temps du nettoyage base + agressif: pipeline partagé contre les deux
+    nettoyages historiques séparés, sur les mêmes images
+
+    Returns:
+        Liste de dicts {image, identique, t_partage, t_separe}
+        (temps en secondes, meilleur de `repetitions`)
+    """
+    def separe(image):
+        return nettoyer_image_base_reference(image), nettoyer_agressif_reference(image)
+
+    resultats = []
+    for nom, image in images:
+        temps = {}
+        sorties = {}
+        for methode, fonction in (('partage', reperage.nettoyer_images), ('separe', separe)):
+            meilleur = None
+            for _ in range(repetitions):
+                t0 = time.perf_counter()
+                sorties[methode] = fonction(image)
+                dt = time.perf_counter() - t0
+                meilleur = dt if meilleur is None else min(meilleur, dt)
+            temps[methode] = meilleur
+
+        resultats.append({
+            'image': nom,
+            'identique': all(np.array_equal(a, b) for a, b in zip(sorties['partage'], sorties['separe'])),
+            't_partage': temps['partage'],
+            't_separe': temps['separe']
+        })
+    return resultats
+
+
+def afficher_nettoyage(resultats):
+    """Tableau des temps de comparer_nettoyage"""
+    print(f"{'image':<24} {'partagé':>10} {'séparé':>10}  identique")
+    for r in resultats:
+        print(f"{r['image'][:24]:<24} {r['t_partage']*1000:>8.0f}ms {r['t_separe']*1000:>8.0f}ms  "
+              f"{'✓' if r['identique'] else '✗'}")
+
+
+def comparer_moteurs_nettoyage(image, moteurs=('hough', 'projection')):
+    """
+    Temps du nettoyage agressif et ligne d'échelle obtenue (ligne + bords)
+    pour chaque moteur, comme dans detect0.detecter_echelle_seule
+    
+    Args:
+        image: Image du questionnaire
+        moteurs: Valeurs de reperage.HOUGH_MOTEUR à comparer
+    
+    Returns:
+        dict {moteur: {'temps': s, 'ligne': (x1, y, x2, y), 'bords': (xg, xd)}}
+    """
+    moteur_initial = reperage.HOUGH_MOTEUR
+    resultats = {}
+    try:
+        for moteur in moteurs:
+            reperage.HOUGH_MOTEUR = moteur
+            t0 = time.perf_counter()
+            _, clean = reperage.nettoyer_images(image, base=False, sortie='gris')
+            temps = time.perf_counter() - t0
+            
+            ligne = reperage.trouver_ligne_echelle(clean)
+            bords = reperage.trouver_bords_ligne_echelle(clean, ligne[1]) if ligne else None
+            resultats[moteur] = {'temps': temps, 'ligne': ligne, 'bords': bords}
+    finally:
+        reperage.HOUGH_MOTEUR = moteur_initial
+    
+    return resultats
+
+
+def afficher_moteurs(images):
+    """Temps et ligne d'échelle de chaque moteur (comparer_moteurs_nettoyage), image par image"""
+    for nom, image in images:
+        print(f"  {nom}")
+        for moteur, res in comparer_moteurs_nettoyage(image).items():
+            print(f"      {moteur:<11} {res['temps']:.3f}s ligne={res['ligne']} bords={res['bords']}")
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Cache des résultats d'analyse par page, adressé par contenu
+===========================================================
+La clé d'une page est l'empreinte SHA-256 de ses pixels rastérisés et du
+contexte d'analyse (template, paramètres, version): une page inchangée
+d'un PDF re-déposé est retrouvée quel que soit son numéro ou son fichier.
+
+Une entrée = un fichier JSON dossier/ab/abcdef....json. La date de
+modification sert de date de dernier accès: les entrées les moins
+récemment utilisées sont supprimées au-delà de la taille maximale.
+
+Chaque processus tient une estimation de la taille du dossier: parcouru
+une fois, puis augmenté de chaque écriture. Le dossier n'est reparcouru
+(et nettoyé) que lorsque l'estimation dépasse la taille maximale, ou
+toutes les PARCOURS_PERIODE écritures pour tenir compte de celles des
+autres workers: le cache ne dépasse la taille maximale que de ce qu'ils
+ont écrit depuis. Un nettoyage ramène le cache à CIBLE_NETTOYAGE de la
+taille maximale, pour qu'un cache plein ne soit pas reparcouru à chaque
+écriture.
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+TAILLE_MAX = 100 * 1024 * 1024  # Taille max du cache sur disque (octets)
+PARCOURS_PERIODE = 100          # Écritures entre deux parcours du dossier (au plus)
+CIBLE_NETTOYAGE = 0.9           # Taille visée par un nettoyage (fraction de la taille max)
+
+# (dossier, extension) → [taille estimée en octets, écritures depuis le dernier parcours]
+_tailles = {}
+
+
+def empreinte_page(image, contexte):
+    """
+    Clé de cache d'une page
+    
+    Args:
+        image: Page rastérisée (tableau NumPy)
+        contexte: Chaîne décrivant tout ce dont dépend le résultat
+            (template, paramètres, version de l'analyse)
+    
+    Returns:
+        Empreinte hexadécimale (64 caractères)
+    """
+    h = hashlib.sha256()
+    h.update(contexte.encode('utf-8'))
+    h.update(f"{image.shape}{image.dtype}".encode('utf-8'))
+    h.update(image.data if image.flags['C_CONTIGUOUS'] else image.tobytes())
+    return h.hexdigest()
+
+
+def empreinte_fichier(chemin, taille_bloc=1024 * 1024):
+    """Empreinte SHA-256 hexadécimale du contenu d'un fichier"""
+    h = hashlib.sha256()
+    with open(chemin, 'rb') as f:
+        for bloc in iter(lambda: f.read(taille_bloc), b''):
+            h.update(bloc)
+    return h.hexdigest()
+
+
+def chemin_entree(dossier, cle):
+    """Fichier d'une entrée (sous-dossier = 2 premiers caractères)"""
+    return os.path.join(dossier, cle[:2], cle + '.json')
+
+
+def lire(dossier, cle):
+    """
+    Résultat en cache, ou None
+    
+    Une entrée lue est marquée comme récemment utilisée. Une entrée
+    illisible (écriture interrompue) compte comme absente.
+    """
+    chemin = chemin_entree(dossier, cle)
+    try:
+        with open(chemin, 'r', encoding='utf-8') as f:
+            resultat = json.load(f)
+    except (OSError, ValueError):
+        return None
+    try:
+        os.utime(chemin)
+    except OSError:
+        pass
+    return resultat
+
+
+def ecrire(dossier, cle, resultat, taille_max=None):
+    """
+    Enregistre un résultat (JSON), puis ramène le cache sous taille_max
+    (défaut TAILLE_MAX, voir compter_ecriture)
+    
+    Écriture dans un fichier temporaire puis renommage: un lecteur
+    concurrent (autre worker) ne voit jamais d'entrée partielle.
+    """
+    chemin = chemin_entree(dossier, cle)
+    os.makedirs(os.path.dirname(chemin), exist_ok=True)
+    fd, temporaire = tempfile.mkstemp(dir=os.path.dirname(chemin), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(resultat, f, ensure_ascii=False)
+        taille = os.path.getsize(temporaire)
+        os.replace(temporaire, chemin)
+    except BaseException:
+        os.unlink(temporaire)
+        raise
+    compter_ecriture(dossier, taille, taille_max)
+
+
+def compter_ecriture(dossier, taille, taille_max=None, extension='.json'):
+    """
+    Ajoute une entrée écrite à la taille estimée du dossier, et ne le
+    parcourt qu'au premier appel, quand l'estimation dépasse taille_max ou
+    toutes les PARCOURS_PERIODE écritures (nettoyer jusqu'à CIBLE_NETTOYAGE
+    × taille_max)
+    
+    Args:
+        taille: Octets de l'entrée écrite
+        taille_max: Octets (défaut TAILLE_MAX)
+        extension: Fichiers des entrées (aussi utilisé par cache_rasters)
+    """
+    if taille_max is None:
+        taille_max = TAILLE_MAX
+    etat = _tailles.get((dossier, extension))
+    if etat is not None and etat[1] + 1 < PARCOURS_PERIODE and etat[0] + taille <= taille_max:
+        etat[0] += taille
+        etat[1] += 1
+        return
+    nettoyer(dossier, int(taille_max * CIBLE_NETTOYAGE), extension)
+
+
+def nettoyer(dossier, taille_max=None, extension='.json'):
+    """
+    Supprime les entrées les moins récemment utilisées jusqu'à taille_max,
+    et remet à jour la taille estimée du dossier (compter_ecriture)
+    
+    Args:
+        taille_max: Octets (défaut TAILLE_MAX)
+        extension: Fichiers des entrées (aussi utilisé par cache_rasters)
+    
+    Returns:
+        Nombre d'entrées supprimées
+    """
+    if taille_max is None:
+        taille_max = TAILLE_MAX
+    if not os.path.isdir(dossier):
+        _tailles.pop((dossier, extension), None)
+        return 0
+    
+    entrees = []
+    for sous_dossier in os.scandir(dossier):
+        if not sous_dossier.is_dir():
+            continue
+        for entree in os.scandir(sous_dossier.path):
+            if entree.name.endswith(extension):
+                try:
+                    infos = entree.stat()
+                except OSError:
+                    continue  # supprimée entre-temps par un autre worker
+                entrees.append((infos.st_mtime, infos.st_size, entree.path))
+    
+    total = sum(taille for _, taille, _ in entrees)
+    supprimees = 0
+    for _, taille, chemin in sorted(entrees):
+        if total <= taille_max:
+            break
+        try:
+            os.unlink(chemin)
+        except OSError:
+            continue
+        total -= taille
+        supprimees += 1
+    _tailles[(dossier, extension)] = [total, 0]
+    return supprimees
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Cache des pages rastérisées, projetées en mémoire
+=================================================
+Sur option (detect0 --rasters), chaque page décodée (rendu poppler ou scan
+extrait) est gardée sur disque en .npy uint8, adressée par l'empreinte du
+PDF, le numéro de page, la résolution et le mode de décodage. Une relance (autres paramètres de
+détection, mise au point) ou un autre worker projette la page avec
+np.load(mmap_mode='r'): ni décodage, ni copie, les pages du cache système
+sont partagées entre processus.
+
+Même organisation que cache_pages: dossier/ab/abcdef....npy, date de
+modification = date de dernier accès, les pages les moins récemment
+utilisées sont supprimées au-delà de la taille maximale (taille du dossier
+estimée par cache_pages.compter_ecriture).
+"""
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+import cache_pages
+
+TAILLE_MAX = 2 * 1024 * 1024 * 1024  # Taille max sur disque (octets), ~60 pages à 600 DPI
+EXTENSION = '.npy'
+
+
+def cle_page(empreinte_pdf, page_num, dpi, extraite):
+    """
+    Clé d'une page rastérisée
+    
+    Args:
+        empreinte_pdf: cache_pages.empreinte_fichier du PDF
+        extraite: Image extraite du scan (True) ou rendue par poppler
+    """
+    texte = f"{empreinte_pdf}/{page_num}/{dpi:g}/{'extraction' if extraite else 'rendu'}"
+    return hashlib.sha256(texte.encode('utf-8')).hexdigest()
+
+
+def chemin_entree(dossier, cle):
+    """Fichier d'une entrée (sous-dossier = 2 premiers caractères)"""
+    return os.path.join(dossier, cle[:2], cle + EXTENSION)
+
+
+def lire(dossier, cle):
+    """
+    Page projetée en mémoire (lecture seule), ou None
+    
+    Une entrée lue est marquée comme récemment utilisée. Une entrée
+    illisible compte comme absente.
+    """
+    chemin = chemin_entree(dossier, cle)
+    try:
+        image = np.load(chemin, mmap_mode='r', allow_pickle=False)
+    except (OSError, ValueError):
+        return None
+    if image.dtype != np.uint8:
+        return None
+    try:
+        os.utime(chemin)
+    except OSError:
+        pass
+    return image
+
+
+def ecrire(dossier, cle, image, taille_max=None):
+    """
+    Enregistre une page (.npy), puis ramène le cache sous taille_max
+    (défaut TAILLE_MAX, voir nettoyer)
+    
+    Écriture dans un fichier temporaire puis renommage: un worker concurrent
+    ne projette jamais une page partielle.
+    """
+    chemin = chemin_entree(dossier, cle)
+    os.makedirs(os.path.dirname(chemin), exist_ok=True)
+    fd, temporaire = tempfile.mkstemp(dir=os.path.dirname(chemin), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, np.ascontiguousarray(image, dtype=np.uint8), allow_pickle=False)
+        taille = os.path.getsize(temporaire)
+        os.replace(temporaire, chemin)
+    except BaseException:
+        os.unlink(temporaire)
+        raise
+    cache_pages.compter_ecriture(dossier, taille, TAILLE_MAX if taille_max is None else taille_max, EXTENSION)
+
+
+def nettoyer(dossier, taille_max=None):
+    """Supprime les pages les moins récemment utilisées jusqu'à taille_max (défaut TAILLE_MAX)"""
+    return cache_pages.nettoyer(dossier, TAILLE_MAX if taille_max is None else taille_max, EXTENSION)
@@ -0,0 +1,18 @@
+"""Racine des tests: les modules du projet sont importables depuis tests/"""
+import json
+import os
+
+import pytest
+
+RACINE = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture(scope='session')
+def pages_generees():
+    """Pages synthétiques (benchmark.generateur, 600 DPI) de chaque page du template, avec leur vérité"""
+    from benchmark import generateur
+    
+    with open(os.path.join(RACINE, 'template.json'), 'r', encoding='utf-8') as f:
+        template_pages = json.load(f)['pages']
+    return [generateur.generer_page(template_page, graine)
+            for template_page in template_pages for graine in range(3)]
@@ -1,20 +1,43 @@
 #!/usr/bin/env python3
 """
 Dépouille les questionnaires remplis
-Usage: python depouiller_reponses.py template.json reponses.pdf output.json
+Usage: python depouiller_reponses.py template.json reponses.pdf output.json [--recalage]
+       python depouiller_reponses.py template.json vierge.pdf --reperes-template
 """
 import cv2
 import numpy as np
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+import argparse
+import contextlib
+import hashlib
+import io
 import json
-import sys
 import os
+import queue
+import resource
+import subprocess
+import sys
+import threading
+import time
 
-from detection_cases import detecter_cases_completes, regrouper_par_lignes
+import cache_pages
+import cache_rasters
+import detection_cases
+import extraction_scans
+import mesures
+import reperage
+import routage_templates
+from detection_cases import detecter_cases, detecter_cases_completes, regrouper_par_lignes
 from reperage import (
-    nettoyer_lignes_verticales_agressif,
+    DPI_REFERENCE,
+    POINTS_REPERES,
+    detecter_reperes,
+    nettoyer_images,
     trouver_ligne_echelle,
-    trouver_bords_ligne_echelle
+    trouver_bords_ligne_echelle,
+    seuil_otsu_global,
+    localiser_echelle_bande
 )
 
 # ============================================================
@@ -23,18 +46,103 @@ from reperage import (
 
 TOLERANCE_X = 200  # Tolérance pour matcher X (pixels)
 
+# Rastérisation du PDF (DPI_REFERENCE = résolution des coordonnées du
+# template et des constantes en pixels; changer via configurer_dpi)
+DPI = DPI_REFERENCE
+PAGES_PAR_LOT = 1  # Pages rastérisées à la fois (0 = tout le PDF d'un coup)
+EXTRACTION_SCANS = True  # Pages qui ne sont qu'un scan: image extraite sans rendu (extraction_scans)
+
+# Parallélisme entre pages
+WORKERS = 1               # Pages analysées en parallèle
+BACKEND = 'processus'     # 'processus' ou 'threads' (OpenCV relâche le GIL)
+
+# Association des cases vides détectées aux cases du template:
+#   'affectation' = affectation optimale sur toute la page (distance à x+dX, y+dY)
+#   'lignes'      = N-ième ligne de cases vides = question N, puis matching en X
+MOTEUR_APPARIEMENT = 'affectation'
+TOLERANCE_APPARIEMENT = 150  # Distance max case détectée / case attendue (pixels)
+
+# Recherche de l'échelle guidée par le template
+TOLERANCE_ECHELLE = 400         # Demi-hauteur de la bande autour du Y du template (pixels, None = page entière)
+LONGUEUR_ECHELLE_MIN = 0.8      # Longueur min trouvée dans la bande / longueur du template
+
+# Mode d'analyse des cases:
+#   'detection' = détection de toutes les cases de la page puis matching en X
+#   'recalage'  = recalage affine sur les repères, lecture directe des cases du template
+MODE_ANALYSE = 'detection'
+
+# Détection des cases limitée aux bandes des questions du template
+# (marge ajoutée au-dessus/au-dessous de chaque question, pixels; None = page entière)
+MARGE_BANDES_QUESTIONS = None
+
+# Recalage
+SEUIL_RECALAGE = 10     # Erreur de reprojection max d'un repère (pixels, RANSAC)
+DEFORMATION_MAX = 0.05  # Écart max de la partie linéaire à l'identité (même DPI que le template)
+MARGE_ROI = 40          # Marge autour de la case prédite pour la recherche du contour (pixels)
+
 # Critères de cochage
 SEUIL_REMPLISSAGE = 0.5  # 50% de noir
 MIN_COMPOSANTES = 1       # 2+ objets
 
+# Images de debug dans out/:
+#   'none'  = aucune image (production)
+#   'thumb' = page réduite à ECHELLE_MINIATURE, échelle cotée à taille réelle
+#   'full'  = page à pleine résolution
+IMAGES_DEBUG = 'thumb'
+ECHELLE_MINIATURE = 0.2
+FILE_IMAGES_MAX = 4       # Images en attente d'encodage PNG
+FILE_OCTETS_MAX = 64 * 1024 * 1024  # Octets d'images en attente ou en cours d'encodage (borne la mémoire)
+
+# Événements de progression JSON (une ligne par événement) sur stderr
+PROGRESSION = False
+
+# Cache des résultats par page (cache_pages, --cache), None = désactivé. Une
+# page en cache ne produit pas d'images de debug
+CACHE_DOSSIER = None
+# Pages rastérisées gardées en .npy projetés en mémoire (cache_rasters, --rasters),
+# None = désactivé. Utile aux relances sur le même PDF: ~35 Mo par page à 600 DPI
+RASTERS_DOSSIER = None
+VERSION_ANALYSE = 2       # À incrémenter si l'analyse change à paramètres égaux (invalide le cache)
+# Constantes sans effet sur le résultat d'une page, hors de la clé de cache
+PARAMETRES_HORS_CACHE = {
+    'DPI_REFERENCE', 'PAGES_PAR_LOT', 'WORKERS', 'BACKEND', 'IMAGES_DEBUG', 'ECHELLE_MINIATURE',
+    'FILE_IMAGES_MAX', 'FILE_OCTETS_MAX', 'PROGRESSION', 'CACHE_DOSSIER', 'PARAMETRES_HORS_CACHE', 'SUFFIXE_REPRISE',
+    'EXTRACTION_SCANS', 'RASTERS_DOSSIER'
+}
+
+# Reprise: chaque page terminée est ajoutée à output_json + SUFFIXE_REPRISE
+SUFFIXE_REPRISE = '.reprise.jsonl'
+
 
 # ============================================================
 # ÉCHELLE
 # ============================================================
 
-def detecter_echelle_seule(image):
-    """Détecte l'échelle"""
-    clean = nettoyer_lignes_verticales_agressif(image)
+@mesures.mesurer('echelle')
+def detecter_echelle_seule(image, echelle_attendue=None, tolerance=None):
+    """
+    Détecte l'échelle
+    
+    Avec echelle_attendue (l'échelle du template), le nettoyage, Hough et la
+    recherche du plus long segment sont limités à la bande y ± tolérance.
+    La page entière n'est analysée que si rien de plausible n'y est trouvé
+    (longueur < LONGUEUR_ECHELLE_MIN × longueur du template).
+    
+    Args:
+        image: Page (BGR ou grayscale)
+        echelle_attendue: dict {'gauche': {x, y}, 'droite': {x, y}} ou None
+        tolerance: Demi-hauteur de la bande (pixels, défaut TOLERANCE_ECHELLE), 0 = page entière
+    """
+    if tolerance is None:
+        tolerance = TOLERANCE_ECHELLE
+    if echelle_attendue and tolerance:
+        echelle = detecter_echelle_bande(image, echelle_attendue, tolerance)
+        if echelle:
+            return echelle
+        print(f"    ⚠ Échelle absente de la bande ±{tolerance}px, recherche sur la page")
+    
+    # Nettoyage agressif seul, en niveaux de gris (pas de conversion BGR)
+    _, clean = nettoyer_images(image, base=False, sortie='gris')
     ligne = trouver_ligne_echelle(clean)
     if not ligne:
         return None
@@ -51,12 +159,148 @@ def detecter_echelle_seule(image):
     }
 
 
+def detecter_echelle_bande(image, echelle_attendue, tolerance):
+    """Cherche l'échelle dans la bande y ± tolérance autour du template"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+    
+    # Binarisation décidée sur la page (sous-échantillon), pas sur la bande
+    seuil, inverser = seuil_otsu_global(gray, 4)
+    
+    y_attendu = echelle_attendue['gauche']['y']
+    trouve = localiser_echelle_bande(gray, y_attendu - tolerance, y_attendu + tolerance,
+                                     seuil, inverser)
+    if not trouve:
+        return None
+    
+    x_gauche, y_echelle, x_droite = trouve
+    longueur_attendue = echelle_attendue['droite']['x'] - echelle_attendue['gauche']['x']
+    if x_droite - x_gauche < LONGUEUR_ECHELLE_MIN * longueur_attendue:
+        return None
+    
+    return {
+        'gauche': {'x': x_gauche, 'y': y_echelle},
+        'droite': {'x': x_droite, 'y': y_echelle}
+    }
+
+
+def bandes_questions(template_page, marge, dy=0):
+    """Bandes (y_min, y_max) couvrant les cases de chaque question, décalées de dy"""
+    bandes = []
+    for question in template_page['contenu'].values():
+        cases = question['cases']
+        if not cases:
+            continue
+        y_min = min(c['y'] for c in cases) + dy - marge
+        y_max = max(c['y'] + c['h'] for c in cases) + dy + marge
+        bandes.append((y_min, y_max))
+    return bandes
+
+
 def calculer_dx(echelle_template, echelle_reponse):
     """Calcule décalage horizontal"""
     if not echelle_template or not echelle_reponse:
         return 0
     return echelle_reponse['gauche']['x'] - echelle_template['gauche']['x']
 
+
+# ============================================================
+# RECALAGE
+# ============================================================
+
+def reperes_template(reperes):
+    """Convertit la sortie de detecter_reperes au format du template ({x, y} par point)"""
+    return {nom: {'x': int(reperes[nom][0]), 'y': int(reperes[nom][1])} for nom in POINTS_REPERES}
+
+
+@mesures.mesurer('transformation')
+def calculer_transformation(template_page, echelle_reponse, reperes_reponse=None):
+    """
+    Calcule la transformation template → page scannée
+    
+    Avec les 6 repères (template_page['reperes'] et reperes_reponse):
+    affine complète (RANSAC). Sinon, à partir des 2 extrémités de l'échelle:
+    similitude (translation, rotation, échelle). Un ajustement qui déforme
+    trop la page (repère mal détecté) est rejeté au profit du suivant, et en
+    dernier recours on applique la seule translation du bord gauche de l'échelle.
+    
+    Returns:
+        tuple (M, methode): matrice 2x3 et 'reperes' / 'echelle' / 'translation',
+        ou (None, None)
+    """
+    reperes_tmpl = template_page.get('reperes')
+    if reperes_tmpl and reperes_reponse:
+        src = np.float32([[reperes_tmpl[nom]['x'], reperes_tmpl[nom]['y']] for nom in POINTS_REPERES])
+        dst = np.float32([reperes_reponse[nom] for nom in POINTS_REPERES])
+        M, _ = cv2.estimateAffine2D(src, dst, method=cv2.RANSAC,
+                                    ransacReprojThreshold=SEUIL_RECALAGE)
+        if transformation_plausible(M):
+            return M, 'reperes'
+    
+    echelle_tmpl = template_page.get('echelle')
+    if not echelle_tmpl or not echelle_reponse:
+        return None, None
+    
+    src = np.float32([[echelle_tmpl[cote]['x'], echelle_tmpl[cote]['y']] for cote in ('gauche', 'droite')])
+    dst = np.float32([[echelle_reponse[cote]['x'], echelle_reponse[cote]['y']] for cote in ('gauche', 'droite')])
+    M, _ = cv2.estimateAffinePartial2D(src, dst)
+    if transformation_plausible(M):
+        return M, 'echelle'
+    
+    tx, ty = dst[0] - src[0]
+    return np.float64([[1, 0, tx], [0, 1, ty]]), 'translation'
+
+
+def transformation_plausible(M):
+    """Vrai si la partie linéaire de M reste proche de l'identité"""
+    if M is None:
+        return False
+    return np.abs(M[:, :2] - np.eye(2)).max() <= DEFORMATION_MAX
+
+
+def projeter_case(M, case):
+    """Rectangle englobant de la case du template projetée sur la page"""
+    coins = np.float32([
+        [case['x'], case['y']],
+        [case['x'] + case['w'], case['y']],
+        [case['x'], case['y'] + case['h']],
+        [case['x'] + case['w'], case['y'] + case['h']]
+    ]).reshape(-1, 1, 2)
+    coins = cv2.transform(coins, M).reshape(-1, 2)
+    x_min, y_min = np.floor(coins.min(axis=0)).astype(int)
+    x_max, y_max = np.ceil(coins.max(axis=0)).astype(int)
+    return {'x': int(x_min), 'y': int(y_min), 'w': int(x_max - x_min), 'h': int(y_max - y_min)}
+
+
+def ajuster_case(gray, case_predite, marge=None):
+    """
+    Cherche le contour de la case autour de sa position prédite
+    
+    Seul un crop de (case + marge) est analysé (marge: défaut MARGE_ROI).
+    Renvoie la case détectée la plus proche du centre prédit, ou None si aucune.
+    """
+    if marge is None:
+        marge = MARGE_ROI
+    x0 = max(0, case_predite['x'] - marge)
+    y0 = max(0, case_predite['y'] - marge)
+    x1 = min(gray.shape[1], case_predite['x'] + case_predite['w'] + marge)
+    y1 = min(gray.shape[0], case_predite['y'] + case_predite['h'] + marge)
+    if x1 <= x0 or y1 <= y0:
+        return None
+    
+    candidates = detecter_cases(gray[y0:y1, x0:x1])
+    if not candidates:
+        return None
+    
+    cx = case_predite['x'] + case_predite['w'] / 2 - x0
+    cy = case_predite['y'] + case_predite['h'] / 2 - y0
+    meilleure = min(candidates, key=lambda c: (c['x'] + c['w'] / 2 - cx)**2 + (c['y'] + c['h'] / 2 - cy)**2)
+    
+    case = meilleure.copy()
+    case['x'] += x0
+    case['y'] += y0
+    return case
+
+
 # === CONSTANTES À AJUSTER ===
 MARGE_CROP = 250
 MARGE_CROP_HAUT = MARGE_CROP // 2
@@ -70,6 +314,75 @@ TOLERANCE_REGULARITE = 0.3
 LARGEUR_MAX_CHIFFRE = 45  # Largeur max d'un chiffre imprimé (en pixels)
 
 
+# ============================================================
+# RÉSOLUTION
+# ============================================================
+# Valeurs à DPI_REFERENCE des constantes en pixels:
+# - longueurs servant de tailles ou d'indices (arrondies)
+# - seuils de comparaison, longueurs et aires (pixels²) (non arrondis:
+#   45 px à 300 DPI donne 22.5, pas 22)
+LONGUEURS_REFERENCE = {
+    nom: globals()[nom] for nom in (
+        'TOLERANCE_ECHELLE', 'MARGE_BANDES_QUESTIONS', 'MARGE_ROI',
+        'MARGE_CROP', 'MARGE_CROP_HAUT', 'MARGE_CROP_BAS', 'EPAISSEUR_SUPPRESSION',
+        'HAUTEUR_BANDE', 'OFFSET_BANDE'
+    )
+}
+SEUILS_REFERENCE = {
+    nom: globals()[nom] for nom in (
+        'TOLERANCE_X', 'TOLERANCE_APPARIEMENT', 'SEUIL_RECALAGE', 'LARGEUR_MAX_CHIFFRE'
+    )
+}
+AIRES_REFERENCE = {'AIRE_MIN_BLOB': AIRE_MIN_BLOB}
+
+
+def configurer_dpi(dpi):
+    """
+    Règle la résolution de rendu et met à l'échelle toutes les constantes en
+    pixels (detect0, reperage, detection_cases) depuis leurs valeurs à DPI_REFERENCE
+    """
+    global DPI
+    DPI = dpi
+    facteur = dpi / DPI_REFERENCE
+    for nom, valeur in LONGUEURS_REFERENCE.items():
+        globals()[nom] = None if valeur is None else max(1, round(valeur * facteur))
+    for nom, valeur in SEUILS_REFERENCE.items():
+        globals()[nom] = valeur * facteur
+    for nom, valeur in AIRES_REFERENCE.items():
+        globals()[nom] = valeur * facteur * facteur
+    reperage.configurer_dpi(dpi)
+    detection_cases.configurer_dpi(dpi)
+
+
+def dpi_template(template):
+    """Résolution des coordonnées du template (clé 'dpi', sinon DPI_REFERENCE)"""
+    return template.get('dpi', DPI_REFERENCE)
+
+
+def mettre_template_a_l_echelle(template_page, facteur):
+    """
+    Copie d'une page du template avec toutes ses coordonnées multipliées par facteur
+    (échelle, repères, cases)
+    """
+    def point(p):
+        return dict(p, x=round(p['x'] * facteur), y=round(p['y'] * facteur))
+    
+    page = dict(template_page)
+    if page.get('echelle'):
+        page['echelle'] = {cote: point(p) for cote, p in page['echelle'].items()}
+    if page.get('reperes'):
+        page['reperes'] = {nom: point(p) for nom, p in page['reperes'].items()}
+    page['contenu'] = {
+        q_id: dict(question, cases=[
+            dict(point(c), w=round(c['w'] * facteur), h=round(c['h'] * facteur))
+            for c in question['cases']
+        ])
+        for q_id, question in template_page['contenu'].items()
+    }
+    return page
+
+
+@mesures.mesurer('coter_echelle')
 def coter_echelle(image, echelle, output_path):
     """Détecte les crayonnages en excluant les chiffres réguliers"""
     if not echelle:
@@ -88,14 +401,14 @@ def coter_echelle(image, echelle, output_path):
     y_crop_min = max(0, y_echelle - MARGE_CROP_HAUT)
     y_crop_max = min(image.shape[0], y_echelle + MARGE_CROP_BAS)
     
-    image_crop = image[y_crop_min:y_crop_max, x_crop_min:x_crop_max].copy()
+    image_crop = image[y_crop_min:y_crop_max, x_crop_min:x_crop_max]
     
     x_gauche_crop = x_gauche - x_crop_min
     x_droite_crop = x_droite - x_crop_min
     y_echelle_crop = y_echelle - y_crop_min
     
     # === 2. BINARISER ===
-    gray = cv2.cvtColor(image_crop, cv2.COLOR_BGR2GRAY)
+    gray = cv2.cvtColor(image_crop, cv2.COLOR_BGR2GRAY) if len(image_crop.shape) == 3 else image_crop
     _, binaire = cv2.threshold(gray, SEUIL_BINARISATION, 255, cv2.THRESH_BINARY_INV)
     
     # === 3. SUPPRIMER LA LIGNE D'ÉCHELLE ===
@@ -107,7 +420,7 @@ def coter_echelle(image, echelle, output_path):
     y_bande_min = y_suppr_max + OFFSET_BANDE
     y_bande_max = min(binaire.shape[0], y_bande_min + HAUTEUR_BANDE)
     
-    bande = binaire[y_bande_min:y_bande_max, :].copy()
+    bande = binaire[y_bande_min:y_bande_max, :]
     
     # === 5. DÉTECTER BLOBS ===
     nb_composantes, labels, stats, centroids = cv2.connectedComponentsWithStats(bande)
@@ -164,6 +477,9 @@ def coter_echelle(image, echelle, output_path):
             print(f"        ✓ Score {score_proche} (x={cx_absolu}, w={blob['w']})")
     
     # === 8. VISUALISATION ===
+    if IMAGES_DEBUG == 'none':
+        return sorted(scores_detectes)
+    
     vis = cv2.cvtColor(binaire, cv2.COLOR_GRAY2BGR)
     
     # Bande en CYAN
@@ -204,8 +520,7 @@ def coter_echelle(image, echelle, output_path):
     cv2.putText(vis, f"JAUNE=chiffres(w<={LARGEUR_MAX_CHIFFRE})  ROUGE=crayonnages(w>{LARGEUR_MAX_CHIFFRE})", 
                (10, vis.shape[0]-20), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
     
-    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
-    cv2.imwrite(output_path, vis)
+    ecrire_image(output_path, vis)
     
     return sorted(scores_detectes)
 
@@ -297,6 +612,113 @@ def Xanalyser_case(image, case):
     return ('vide', None)
 
 
+@mesures.mesurer('analyse_cases')
+def analyser_cases(gray, rectangles):
+    """
+    Classe toutes les cases d'une page en une fois (même résultat qu'analyser_case)
+    
+    Les cases sont regroupées en bandes horizontales (lignes de cases qui se
+    chevauchent en Y); chaque bande est binarisée une seule fois et le
+    remplissage de toutes ses cases se lit sur son image intégrale. Les
+    composantes connexes ne sont calculées que pour les cases assez remplies
+    pour contenir une composante de plus de 10% de leur surface.
+    
+    Ce qui déborde de la page compte comme blanc; une case dont l'intérieur
+    est vide ou entièrement hors de la page est 'vide'.
+    
+    Args:
+        gray: Page en niveaux de gris
+        rectangles: array (N, 4) de (x, y, w, h)
+    
+    Returns:
+        tuple (types, infos): array (N,) de 'vide' / 'noire' / 'traits' et
+        array (N,) float du ratio de noir ('noire'), du nombre de composantes
+        ('traits'), NaN pour 'vide'
+    """
+    rectangles = np.asarray(rectangles, dtype=np.int64).reshape(-1, 4)
+    n = len(rectangles)
+    types = np.full(n, 'vide', dtype='<U6')
+    infos = np.full(n, np.nan)
+    if n == 0:
+        return types, infos
+    
+    # Intérieurs (marge 25%), bornés à l'image (hors de la page = blanc)
+    x, y, w, h = rectangles.T
+    marge_x = (w * 0.25).astype(np.int64)
+    marge_y = (h * 0.25).astype(np.int64)
+    w_int = w - 2 * marge_x
+    h_int = h - 2 * marge_y
+    x0 = np.clip(x + marge_x, 0, gray.shape[1])
+    y0 = np.clip(y + marge_y, 0, gray.shape[0])
+    x1 = np.clip(x + marge_x + w_int, x0, gray.shape[1])
+    y1 = np.clip(y + marge_y + h_int, y0, gray.shape[0])
+    
+    # Intérieur vide ou hors de la page (case prédite par le template au
+    # bord de la page, case dégénérée): reste 'vide', hors des bandes
+    visibles = np.flatnonzero((w_int > 0) & (h_int > 0) & (x1 > x0) & (y1 > y0))
+    if len(visibles) == 0:
+        return types, infos
+    
+    # Bandes: une nouvelle bande commence quand une case (triée par Y)
+    # débute sous toutes les précédentes
+    ordre = visibles[np.argsort(y0[visibles], kind='stable')]
+    fin_precedentes = np.maximum.accumulate(y1[ordre])
+    nouvelle = np.r_[True, y0[ordre][1:] >= fin_precedentes[:-1]]
+    bandes = np.full(n, -1, dtype=np.int64)
+    bandes[ordre] = np.cumsum(nouvelle) - 1
+    
+    # Binarisation unique de chaque bande, puis image intégrale
+    binaires = []
+    bx0, by0, bx1, by1 = x0.copy(), y0.copy(), x1.copy(), y1.copy()
+    noirs = np.zeros(n, dtype=np.int64)
+    for b in range(bandes.max() + 1):
+        m = np.flatnonzero(bandes == b)
+        zx, zy = x0[m].min(), y0[m].min()
+        zone = gray[zy:y1[m].max(), zx:x1[m].max()]
+        _, binaire = cv2.threshold(zone, 180, 1, cv2.THRESH_BINARY_INV)
+        integrale = cv2.integral(binaire)
+        binaires.append(binaire)
+        
+        bx0[m] -= zx
+        bx1[m] -= zx
+        by0[m] -= zy
+        by1[m] -= zy
+        noirs[m] = (integrale[by1[m], bx1[m]] - integrale[by0[m], bx1[m]]
+                    - integrale[by1[m], bx0[m]] + integrale[by0[m], bx0[m]])
+    
+    surfaces = w_int * h_int
+    valides = bandes >= 0
+    ratios = np.zeros(n)
+    ratios[valides] = noirs[valides] / surfaces[valides]
+    
+    # === CRITÈRE 1: Remplissage ===
+    noires = ratios > SEUIL_REMPLISSAGE
+    types[noires] = 'noire'
+    infos[noires] = ratios[noires]
+    
+    # === CRITÈRE 2: Composantes SIGNIFICATIVES ===
+    # Une composante > 10% de la case exige plus de 10% de pixels noirs
+    tailles_min = surfaces * 0.1
+    ambigues = ~noires & valides
+    if MIN_COMPOSANTES > 0:
+        ambigues &= noirs > tailles_min
+    
+    for i in np.flatnonzero(ambigues):
+        roi = binaires[bandes[i]][by0[i]:by1[i], bx0[i]:bx1[i]]
+        _, _, stats, _ = cv2.connectedComponentsWithStats(roi)
+        nb_grosses_composantes = np.count_nonzero(stats[1:, cv2.CC_STAT_AREA] > tailles_min[i])
+        if nb_grosses_composantes >= MIN_COMPOSANTES:
+            types[i] = 'traits'
+            infos[i] = nb_grosses_composantes
+    
+    return types, infos
+
+
+def rectangles_cases(cases):
+    """Array (N, 4) des (x, y, w, h) d'une liste de cases"""
+    return np.array([[c['x'], c['y'], c['w'], c['h']] for c in cases], dtype=np.int64).reshape(-1, 4)
+
+
 # ============================================================
 # MATCHING
 # ============================================================
@@ -323,10 +745,105 @@ def trouver_cases_template_manquantes(ligne_vides, cases_template, dx):
     return indices_manquants
 
 
+def associer_cases(detectees, attendues, tolerance=None):
+    """
+    Associe les cases détectées aux positions attendues du template
+    
+    Affectation optimale (somme des distances minimale) en une seule passe
+    sur la matrice des distances. Une paire plus éloignée que la tolérance
+    n'est jamais retenue: la case du template reste sans correspondance.
+    
+    Args:
+        detectees: array (D, 2) des coins haut-gauche détectés
+        attendues: array (T, 2) des coins haut-gauche attendus (template + décalage)
+        tolerance: distance max d'une association (pixels, défaut TOLERANCE_APPARIEMENT)
+    
+    Returns:
+        array (T,) d'indices dans detectees, -1 si aucune case associée
+        (correspondance < 0 donne le masque des manquantes)
+    """
+    if tolerance is None:
+        tolerance = TOLERANCE_APPARIEMENT
+    
+    correspondance = np.full(len(attendues), -1, dtype=np.intp)
+    if len(attendues) == 0 or len(detectees) == 0:
+        return correspondance
+    
+    distances = np.hypot(attendues[:, None, 0] - detectees[None, :, 0],
+                         attendues[:, None, 1] - detectees[None, :, 1])
+    
+    # Au-delà de la tolérance, toute association coûte autant que n'en faire aucune
+    lignes, colonnes = affectation_optimale(np.minimum(distances, tolerance))
+    valides = distances[lignes, colonnes] < tolerance
+    correspondance[lignes[valides]] = colonnes[valides]
+    return correspondance
+
+
+def affectation_optimale(couts):
+    """
+    Affectation de coût total minimal (méthode hongroise, O(n²m))
+    
+    Args:
+        couts: matrice (n, m)
+    
+    Returns:
+        tuple (lignes, colonnes) d'indices associés, min(n, m) paires, trié par ligne
+    """
+    couts = np.asarray(couts, dtype=np.float64)
+    transposer = couts.shape[0] > couts.shape[1]
+    if transposer:
+        couts = couts.T
+    n, m = couts.shape
+    
+    # Potentiels et affectation, indices décalés de 1 (colonne 0 = départ)
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    ligne_de = np.zeros(m + 1, dtype=np.intp)
+    precedent = np.zeros(m + 1, dtype=np.intp)
+    
+    for i in range(1, n + 1):
+        ligne_de[0] = i
+        j0 = 0
+        min_v = np.full(m + 1, np.inf)
+        visitee = np.zeros(m + 1, dtype=bool)
+        
+        # Plus court chemin augmentant depuis la ligne i
+        while ligne_de[j0] != 0:
+            visitee[j0] = True
+            i0 = ligne_de[j0]
+            reduits = couts[i0 - 1] - u[i0] - v[1:]
+            maj = ~visitee[1:] & (reduits < min_v[1:])
+            min_v[1:][maj] = reduits[maj]
+            precedent[1:][maj] = j0
+            
+            candidats = np.where(visitee[1:], np.inf, min_v[1:])
+            j1 = int(np.argmin(candidats)) + 1
+            delta = candidats[j1 - 1]
+            
+            u[ligne_de[visitee]] += delta
+            v[visitee] -= delta
+            min_v[~visitee] -= delta
+            j0 = j1
+        
+        # Inverser les affectations le long du chemin
+        while j0 != 0:
+            j1 = precedent[j0]
+            ligne_de[j0] = ligne_de[j1]
+            j0 = j1
+    
+    colonnes = np.flatnonzero(ligne_de[1:])
+    lignes = ligne_de[1:][colonnes] - 1
+    if transposer:
+        lignes, colonnes = colonnes, lignes
+    ordre = np.argsort(lignes)
+    return lignes[ordre], colonnes[ordre]
+
+
 # ============================================================
 # VISUALISATION
 # ============================================================
 
+@mesures.mesurer('visualisation')
 def visualiser_cases(image, cases_vides, cases_manquantes, cases_noires, cases_traits, output_path):
     """
     Dessine avec 4 couleurs:
@@ -334,81 +851,125 @@ def visualiser_cases(image, cases_vides, cases_manquantes, cases_noires, cases_t
     - ROUGE = manquantes
     - ORANGE = cochées par noirceur
     - BLEU = cochées par traits
-    """
-    vis = image.copy()
     
-    # VERT = vides
-    for case in cases_vides:
-        overlay = vis.copy()
-        cv2.rectangle(overlay,
-                     (case['x'], case['y']),
-                     (case['x'] + case['w'], case['y'] + case['h']),
-                     (0, 255, 0), -1)
-        cv2.addWeighted(overlay, 0.3, vis, 0.7, 0, vis)
-        
-        cv2.rectangle(vis,
-                     (case['x'], case['y']),
-                     (case['x'] + case['w'], case['y'] + case['h']),
-                     (0, 255, 0), 3)
-    
-    # ROUGE = manquantes
-    for case in cases_manquantes:
-        overlay = vis.copy()
-        cv2.rectangle(overlay,
-                     (case['x'], case['y']),
-                     (case['x'] + case['w'], case['y'] + case['h']),
-                     (0, 0, 255), -1)
-        cv2.addWeighted(overlay, 0.3, vis, 0.7, 0, vis)
-        
-        cv2.rectangle(vis,
-                     (case['x'], case['y']),
-                     (case['x'] + case['w'], case['y'] + case['h']),
-                     (0, 0, 255), 3)
+    La page est d'abord réduite (IMAGES_DEBUG = 'thumb'), puis tous les
+    remplissages sont tracés sur un seul calque fusionné en une passe;
+    l'encodage PNG se fait sur le thread d'écriture (ecrire_image).
     
-    # ORANGE = noires
-    for case in cases_noires:
-        overlay = vis.copy()
-        cv2.rectangle(overlay,
-                     (case['x'], case['y']),
-                     (case['x'] + case['w'], case['y'] + case['h']),
-                     (0, 165, 255), -1)  # BGR: orange
-        cv2.addWeighted(overlay, 0.3, vis, 0.7, 0, vis)
-        
-        cv2.rectangle(vis,
-                     (case['x'], case['y']),
-                     (case['x'] + case['w'], case['y'] + case['h']),
-                     (0, 165, 255), 3)
-    
-    # BLEU = traits
-    for case in cases_traits:
-        overlay = vis.copy()
-        cv2.rectangle(overlay,
-                     (case['x'], case['y']),
-                     (case['x'] + case['w'], case['y'] + case['h']),
-                     (255, 0, 0), -1)
-        cv2.addWeighted(overlay, 0.3, vis, 0.7, 0, vis)
-        
-        cv2.rectangle(vis,
-                     (case['x'], case['y']),
-                     (case['x'] + case['w'], case['y'] + case['h']),
-                     (255, 0, 0), 3)
+    image: page en niveaux de gris ou BGR (seul endroit converti en couleur)
+    """
+    if IMAGES_DEBUG == 'none':
+        return
+    facteur = ECHELLE_MINIATURE if IMAGES_DEBUG == 'thumb' else 1
+    
+    if facteur != 1:
+        image = cv2.resize(image, None, fx=facteur, fy=facteur, interpolation=cv2.INTER_AREA)
+    vis = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR) if len(image.shape) == 2 else image.copy()
+    
+    groupes = [
+        (cases_vides, (0, 255, 0)),         # VERT
+        (cases_manquantes, (0, 0, 255)),    # ROUGE
+        (cases_noires, (0, 165, 255)),      # ORANGE (BGR)
+        (cases_traits, (255, 0, 0)),        # BLEU
+    ]
+    rectangles = [
+        ((round(case['x'] * facteur), round(case['y'] * facteur)),
+         (round((case['x'] + case['w']) * facteur), round((case['y'] + case['h']) * facteur)),
+         couleur)
+        for cases, couleur in groupes for case in cases
+    ]
+    
+    # Remplissages à 30% en une seule fusion
+    overlay = vis.copy()
+    for coin1, coin2, couleur in rectangles:
+        cv2.rectangle(overlay, coin1, coin2, couleur, -1)
+    cv2.addWeighted(overlay, 0.3, vis, 0.7, 0, vis)
+    
+    # Contours
+    epaisseur = max(1, round(3 * facteur))
+    for coin1, coin2, couleur in rectangles:
+        cv2.rectangle(vis, coin1, coin2, couleur, epaisseur)
+    
+    ecrire_image(output_path, vis)
+    print(f"    ✓ Visualisation → {output_path}")
+
+
+# Thread d'écriture des images de debug (un par processus)
+_ecriture = {'pid': None, 'file': None, 'place': None, 'octets': 0}
+_verrou_ecriture = threading.Lock()
+
+
+def ecrire_image(chemin, image):
+    """
+    Met une image en file d'écriture PNG (thread d'arrière-plan)
     
-    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
-    small = cv2.resize(vis, None, fx=0.2, fy=0.2)
-    cv2.imwrite(output_path, small)
+    L'image ne doit plus être modifiée par l'appelant. La file est bornée à
+    FILE_IMAGES_MAX images et FILE_OCTETS_MAX octets (images en attente et
+    en cours d'encodage): au-delà l'appelant attend l'encodeur. Une image
+    plus grosse que FILE_OCTETS_MAX (page 'full' à 600 DPI) passe seule.
+    """
+    with _verrou_ecriture:
+        # Après un fork, le thread du parent n'existe pas dans l'enfant
+        if _ecriture['pid'] != os.getpid():
+            file = queue.Queue(FILE_IMAGES_MAX)
+            _ecriture.update(pid=os.getpid(), file=file, place=threading.Condition(), octets=0)
+            threading.Thread(target=boucle_ecriture, args=(file,), daemon=True).start()
+        file = _ecriture['file']
+        place = _ecriture['place']
+    
+    with place:
+        while _ecriture['octets'] and _ecriture['octets'] + image.nbytes > FILE_OCTETS_MAX:
+            place.wait()
+        _ecriture['octets'] += image.nbytes
+    file.put((chemin, image, mesures.page_courante()))
+
+
+def boucle_ecriture(file):
+    """Encode et écrit les images de la file, indéfiniment"""
+    place = _ecriture['place']
+    while True:
+        chemin, image, page_num = file.get()
+        try:
+            os.makedirs(os.path.dirname(chemin) or '.', exist_ok=True)
+            with mesures.etape('png', image, page=page_num):
+                cv2.imwrite(chemin, image)
+        except Exception as e:
+            print(f"    ⚠ Image non écrite {chemin}: {e}")
+        finally:
+            with place:
+                _ecriture['octets'] -= image.nbytes
+                place.notify_all()
+            del image
+            file.task_done()
+
+
+def vider_ecriture():
+    """Attend que toutes les images en file soient écrites"""
+    if _ecriture['pid'] == os.getpid():
+        _ecriture['file'].join()
 
 
 # ============================================================
 # ANALYSE
 # ============================================================
 
-def analyser_page(image, page_num, template_page):
-    """Analyse avec détection fine du cochage"""
+def analyser_page(image, page_num, template_page, mode=None):
+    """
+    Analyse avec détection fine du cochage
+    
+    Args:
+        mode: 'detection' ou 'recalage' (défaut: MODE_ANALYSE)
+    """
+    if mode is None:
+        mode = MODE_ANALYSE
+    if mode == 'recalage':
+        return analyser_page_recalage(image, page_num, template_page)
+    
     print(f"  Page {page_num}...")
     
-    # ÉCHELLE
-    echelle_reponse = detecter_echelle_seule(image)
+    # ÉCHELLE (recherche limitée à la bande attendue d'après le template)
     echelle_template = template_page.get('echelle')
+    echelle_reponse = detecter_echelle_seule(image, echelle_template)
     
     if not echelle_reponse:
         print(f"    ⚠ Échelle non détectée")
@@ -417,38 +978,77 @@ def analyser_page(image, page_num, template_page):
     dx = calculer_dx(echelle_template, echelle_reponse)
     print(f"    ✓ Décalage dX={dx}")
     
-
+    
     # === COTER L'ÉCHELLE ===
     scores_echelle = coter_echelle(image, echelle_reponse, f"out/echelle_page{page_num}.png")
     print(f"    ✓ Échelle cotée: {scores_echelle}")
-
+    
     # DÉTECTER CASES
-    cases_detectees = detecter_cases_completes(image)
-    print(f"    ✓ {len(cases_detectees)} cases détectées")
+    bandes = None
+    if MARGE_BANDES_QUESTIONS is not None:
+        dy = echelle_reponse['gauche']['y'] - echelle_template['gauche']['y'] if echelle_template else 0
+        bandes = bandes_questions(template_page, MARGE_BANDES_QUESTIONS, dy)
+    
+    stats_cases = {}
+    cases_detectees = detecter_cases_completes(image, bandes, stats_cases)
+    print(f"    ✓ {len(cases_detectees)} cases détectées "
+          f"(contours {stats_cases['contours']} → points {stats_cases['points']} → "
+          f"rectangle {stats_cases['rectangle']} → aire {stats_cases['aire']} → "
+          f"polygone {stats_cases['polygone']} → uniques {stats_cases['uniques']})")
     
     # ANALYSER CHAQUE CASE
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
     
     cases_vides = []
     cases_noires = []
     cases_traits = []
     
-    for case in cases_detectees:
-        type_case, info = analyser_case(gray, case)
-        
+    types, infos = analyser_cases(gray, rectangles_cases(cases_detectees))
+    
+    for case, type_case, info in zip(cases_detectees, types, infos):
         if type_case == 'vide':
             cases_vides.append(case)
         elif type_case == 'noire':
             case_avec_info = case.copy()
-            case_avec_info['ratio_noir'] = info
+            case_avec_info['ratio_noir'] = float(info)
             cases_noires.append(case_avec_info)
         elif type_case == 'traits':
             case_avec_info = case.copy()
-            case_avec_info['nb_objets'] = info
+            case_avec_info['nb_objets'] = int(info)
             cases_traits.append(case_avec_info)
     
     print(f"    ✓ {len(cases_vides)} vides, {len(cases_noires)} noires, {len(cases_traits)} traits")
     
+    # ASSOCIER AUX CASES DU TEMPLATE
+    if MOTEUR_APPARIEMENT == 'affectation':
+        dy = echelle_reponse['gauche']['y'] - echelle_template['gauche']['y'] if echelle_template else 0
+        questions_json, toutes_cases_manquantes = questions_par_affectation(template_page, cases_vides, dx, dy)
+    else:
+        questions_json, toutes_cases_manquantes = questions_par_lignes(template_page, cases_vides, dx)
+    
+    # VISUALISATION
+    visualiser_cases(
+        image, cases_vides, toutes_cases_manquantes, cases_noires, cases_traits,
+        f"out/reponse_page{page_num}.png"
+    )
+    
+    return {
+        'page': page_num,
+        'decalage_x': dx,        
+        'score_echelle': scores_echelle,  # Ajouter ici
+        'questions': questions_json
+    }
+
+
+@mesures.mesurer('appariement')
+def questions_par_lignes(template_page, cases_vides, dx):
+    """
+    Réponses par question: la N-ième ligne de cases vides est la question N,
+    les cases sont associées au template par leur X (moteur 'lignes')
+    
+    Returns:
+        tuple (questions_json, cases_manquantes)
+    """
     # GROUPER PAR LIGNES (vides seulement)
     lignes_vides = regrouper_par_lignes(cases_vides)
     
@@ -543,69 +1143,979 @@ def analyser_page(image, page_num, template_page):
             'reponses': reponses_ordonnees
         }
     
-    # VISUALISATION
+    return questions_json, toutes_cases_manquantes
+
+
+@mesures.mesurer('appariement')
+def questions_par_affectation(template_page, cases_vides, dx, dy):
+    """
+    Réponses par question: toutes les cases vides de la page sont associées
+    en une fois à toutes les cases du template (moteur 'affectation')
+    
+    Une ligne parasite ne décale plus les questions suivantes.
+    
+    Returns:
+        tuple (questions_json, cases_manquantes)
+    """
+    questions = []
+    cases_template = []
+    for q_id, question in template_page['contenu'].items():
+        questions.append((q_id, len(question['cases'])))
+        cases_template.extend(question['cases'])
+    
+    attendues = np.array([[c['x'] + dx, c['y'] + dy] for c in cases_template], dtype=np.float64).reshape(-1, 2)
+    detectees = np.array([[c['x'], c['y']] for c in cases_vides], dtype=np.float64).reshape(-1, 2)
+    correspondance = associer_cases(detectees, attendues)
+    
+    questions_json = {}
+    toutes_cases_manquantes = []
+    k = 0
+    for q_id, nb_cases in questions:
+        reponses_ordonnees = []
+        for idx in range(nb_cases):
+            case_tmpl = cases_template[k]
+            if correspondance[k] >= 0:
+                case = cases_vides[correspondance[k]]
+                reponse = 'vide'
+            else:
+                case = {
+                    'x': int(attendues[k, 0]),
+                    'y': int(attendues[k, 1]),
+                    'w': case_tmpl['w'],
+                    'h': case_tmpl['h']
+                }
+                reponse = 'cochée'
+                toutes_cases_manquantes.append(case)
+            
+            reponses_ordonnees.append({
+                'index': idx,
+                'reponse': reponse,
+                'x': case['x'],
+                'y': case['y'],
+                'w': case['w'],
+                'h': case['h']
+            })
+            k += 1
+        
+        nb_cochees = int(np.count_nonzero(correspondance[k - nb_cases:k] < 0))
+        print(f"    {q_id}: {nb_cases - nb_cochees} vides, {nb_cochees} cochées")
+        
+        questions_json[q_id] = {
+            'reponses': reponses_ordonnees
+        }
+    
+    return questions_json, toutes_cases_manquantes
+
+
+
+def analyser_page_recalage(image, page_num, template_page):
+    """
+    Analyse par recalage: chaque case du template est lue à sa position
+    prédite, sans détection des cases sur la page entière
+    
+    Le coût ne dépend plus de la taille de la page mais du nombre de cases.
+    Même sortie que analyser_page (mode 'detection').
+    """
+    print(f"  Page {page_num} (recalage)...")
+    
+    echelle_template = template_page.get('echelle')
+    echelle_reponse = detecter_echelle_seule(image, echelle_template)
+    
+    if not echelle_reponse:
+        print(f"    ⚠ Échelle non détectée")
+        return {'page': page_num, 'erreur': 'Échelle non détectée'}
+    
+    dx = calculer_dx(echelle_template, echelle_reponse)
+    print(f"    ✓ Décalage dX={dx}")
+    
+    # Les 6 repères ne sont cherchés que si le template les connaît
+    reperes_reponse = detecter_reperes(image) if template_page.get('reperes') else None
+    M, methode = calculer_transformation(template_page, echelle_reponse, reperes_reponse)
+    if M is None:
+        print(f"    ⚠ Recalage impossible")
+        return {'page': page_num, 'erreur': 'Recalage impossible'}
+    print(f"    ✓ Recalage ({methode})")
+    
+    # === COTER L'ÉCHELLE ===
+    scores_echelle = coter_echelle(image, echelle_reponse, f"out/echelle_page{page_num}.png")
+    print(f"    ✓ Échelle cotée: {scores_echelle}")
+    
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+    
+    # Position de chaque case du template, ajustée sur son contour s'il est trouvé
+    cases = []
+    trouvees = []
+    with mesures.etape('projection_cases', gray) as mesure:
+        for question in template_page['contenu'].values():
+            for case_tmpl in question['cases']:
+                case_predite = projeter_case(M, case_tmpl)
+                case_trouvee = ajuster_case(gray, case_predite)
+                cases.append(case_trouvee or case_predite)
+                trouvees.append(case_trouvee is not None)
+        mesure['cases'] = len(cases)
+    
+    types, infos = analyser_cases(gray, rectangles_cases(cases))
+    
+    cases_vides = []
+    cases_manquantes = []
+    cases_noires = []
+    cases_traits = []
+    questions_json = {}
+    k = 0
+    
+    for q_id, question in template_page['contenu'].items():
+        reponses_ordonnees = []
+        
+        for idx in range(len(question['cases'])):
+            case, type_case, info = cases[k], types[k], infos[k]
+            
+            if type_case == 'vide':
+                cases_vides.append(case)
+            elif not trouvees[k]:
+                cases_manquantes.append(case)
+            elif type_case == 'noire':
+                cases_noires.append(dict(case, ratio_noir=float(info)))
+            else:
+                cases_traits.append(dict(case, nb_objets=int(info)))
+            k += 1
+            
+            reponses_ordonnees.append({
+                'index': idx,
+                'reponse': 'vide' if type_case == 'vide' else 'cochée',
+                'x': case['x'],
+                'y': case['y'],
+                'w': case['w'],
+                'h': case['h']
+            })
+        
+        nb_cochees = len([r for r in reponses_ordonnees if r['reponse'] == 'cochée'])
+        print(f"    {q_id}: {len(reponses_ordonnees) - nb_cochees} vides, {nb_cochees} cochées")
+        
+        questions_json[q_id] = {
+            'reponses': reponses_ordonnees
+        }
+    
     visualiser_cases(
-        image, cases_vides, toutes_cases_manquantes, cases_noires, cases_traits,
+        image, cases_vides, cases_manquantes, cases_noires, cases_traits,
         f"out/reponse_page{page_num}.png"
     )
-    print(f"    ✓ Visualisation → out/reponse_page{page_num}.png")
     
     return {
         'page': page_num,
-        'decalage_x': dx,        
-        'score_echelle': scores_echelle,  # Ajouter ici
+        'decalage_x': dx,
+        'score_echelle': scores_echelle,
         'questions': questions_json
     }
+
+
+# ============================================================
+# PDF
+# ============================================================
+
+def iterer_pages(chemin_pdf, dpi=None, lot=PAGES_PAR_LOT, pages=None, scans=None):
+    """
+    Rastérise le PDF par lots de pages (générateur)
+    
+    Seul le lot courant est en mémoire: le pic ne dépend plus du nombre
+    de pages du PDF. Un lot fait uniquement de scans ou de pages déjà dans
+    RASTERS_DOSSIER est lu page par page (rasteriser_page), sans rendu.
+    
+    Args:
+        chemin_pdf: PDF à rastériser
+        dpi: Résolution (défaut DPI)
+        lot: Nombre de pages rastérisées à la fois (0 = tout le PDF)
+        pages: Numéros des pages à rastériser (None = toutes)
+        scans: scans_pdf(chemin_pdf, ...) si déjà connu (None = lu ici)
+    
+    Yields:
+        tuple (numéro de page à partir de 1, image en niveaux de gris)
+    """
+    dpi = dpi or DPI
+    nb_pages = pdfinfo_from_path(chemin_pdf)['Pages']
+    if pages is None:
+        pages = range(1, nb_pages + 1)
+    if scans is None:
+        scans = scans_pdf(chemin_pdf, nb_pages)
+    empreinte_pdf = cache_pages.empreinte_fichier(chemin_pdf) if RASTERS_DOSSIER else None
+    
+    def deja_rasterisee(page_num):
+        return (empreinte_pdf is not None and os.path.exists(cache_rasters.chemin_entree(
+            RASTERS_DOSSIER, cache_rasters.cle_page(empreinte_pdf, page_num, dpi, False))))
+    
+    for premiere, derniere in lots_pages(pages, lot):
+        if all(page_num in scans or deja_rasterisee(page_num) for page_num in range(premiere, derniere + 1)):
+            for page_num in range(premiere, derniere + 1):
+                yield page_num, rasteriser_page(chemin_pdf, page_num, dpi, scans.get(page_num), empreinte_pdf)
+            continue
+        
+        with mesures.etape('rasterisation', page=premiere, pages=derniere - premiere + 1):
+            images = convert_from_path(chemin_pdf, dpi=dpi, first_page=premiere, last_page=derniere,
+                                       grayscale=True)
+        
+        for page_num in range(premiere, derniere + 1):
+            page = images.pop(0)
+            image = image_page(page)
+            page.close()
+            del page
+            if empreinte_pdf is not None:
+                cache_rasters.ecrire(RASTERS_DOSSIER, cache_rasters.cle_page(empreinte_pdf, page_num, dpi, False),
+                                     image)
+            yield page_num, image
+            del image
+
+
+def scans_pdf(chemin_pdf, nb_pages):
+    """Pages du PDF qui ne sont qu'un scan (extraction_scans.pages_scannees, {} si EXTRACTION_SCANS est faux)"""
+    return extraction_scans.pages_scannees(chemin_pdf, nb_pages) if EXTRACTION_SCANS else {}
+
+
+def dpi_natif(scans, nb_pages):
+    """
+    Résolution native des scans si le PDF n'est fait que de scans de même
+    résolution (au plus DPI_REFERENCE), sinon None
+    
+    Args:
+        scans: scans_pdf(...) du PDF
+    """
+    dpi = extraction_scans.resolution_commune(scans, nb_pages)
+    return min(dpi, DPI_REFERENCE) if dpi else None
+
+
+def rasteriser_page(chemin_pdf, page_num, dpi=None, scan=None, empreinte_pdf=None):
+    """
+    Image en niveaux de gris d'une page
+    
+    Args:
+        dpi: Résolution (défaut DPI)
+        scan: scans_pdf(...)[page_num] si la page n'est qu'un scan: l'image
+            est extraite sans rendu (étape 'extraction'), ramenée à dpi si
+            sa résolution native diffère. Sinon (ou si l'extraction échoue)
+            la page est rendue par poppler (étape 'rasterisation').
+        empreinte_pdf: cache_pages.empreinte_fichier du PDF: la page est
+            d'abord cherchée dans RASTERS_DOSSIER (projetée en mémoire, en
+            lecture seule), et y est ajoutée après décodage
+    """
+    dpi = dpi or DPI
+    cle = None
+    if RASTERS_DOSSIER and empreinte_pdf:
+        cle = cache_rasters.cle_page(empreinte_pdf, page_num, dpi, bool(scan))
+        with mesures.etape('cache_raster', page=page_num) as mesure:
+            image = cache_rasters.lire(RASTERS_DOSSIER, cle)
+            mesure['trouve'] = image is not None
+        if image is not None:
+            return image
+    
+    image = None
+    if scan:
+        try:
+            with mesures.etape('extraction', page=page_num, pages=1, dpi_natif=scan['dpi']):
+                image = extraction_scans.extraire_page(chemin_pdf, page_num, scan, dpi)
+        except (OSError, subprocess.CalledProcessError, ValueError) as e:
+            print(f"  ⚠ Page {page_num}: extraction impossible ({e}), rendu de la page")
+            # Page rendue: rangée sous la clé du rendu
+            if cle:
+                cle = cache_rasters.cle_page(empreinte_pdf, page_num, dpi, False)
+    
+    if image is None:
+        with mesures.etape('rasterisation', page=page_num, pages=1):
+            pages = convert_from_path(chemin_pdf, dpi=dpi, first_page=page_num, last_page=page_num,
+                                      grayscale=True)
+        image = image_page(pages[0])
+        pages[0].close()
+    
+    if cle:
+        cache_rasters.ecrire(RASTERS_DOSSIER, cle, image)
+    return image
+
+
+def lots_pages(pages, lot):
+    """
+    Découpe des numéros de pages en intervalles contigus (première, dernière)
+    d'au plus lot pages (0 = pas de limite)
+    """
+    intervalles = []
+    for page_num in sorted(pages):
+        if (intervalles and page_num == intervalles[-1][1] + 1
+                and (not lot or page_num - intervalles[-1][0] < lot)):
+            intervalles[-1][1] = page_num
+        else:
+            intervalles.append([page_num, page_num])
+    return [tuple(intervalle) for intervalle in intervalles]
+
+
+def image_page(page):
+    """
+    Tableau 8 bits d'une page rendue en niveaux de gris (PIL mode 'L')
+    
+    PIL n'expose pas son tampon interne: np.asarray recopie les pixels une
+    fois (Image.tobytes) et s'appuie sur ces octets, sans seconde copie
+    (tableau en lecture seule, l'image PIL peut être fermée aussitôt).
+    Aucune conversion de couleur: un tiers de la mémoire d'une page RGB/BGR.
+    """
+    return np.asarray(page)
+
+
+def threads_opencv(workers):
+    """Threads OpenCV par worker, pour ne pas dépasser le nombre de cœurs"""
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def initialiser_worker(nb_threads, dpi, images_debug, progression, cache_dossier, rasters_dossier):
+    """Initialisation d'un processus worker"""
+    global IMAGES_DEBUG, PROGRESSION, CACHE_DOSSIER, RASTERS_DOSSIER
+    cv2.setNumThreads(nb_threads)
+    configurer_dpi(dpi)
+    IMAGES_DEBUG = images_debug
+    PROGRESSION = progression
+    CACHE_DOSSIER = cache_dossier
+    RASTERS_DOSSIER = rasters_dossier
+
+
+def traiter_page(reponses_pdf, page_num, template_pages, index, mode=None, dpi=None, scan=None, empreinte_pdf=None):
+    """
+    Rastérise (ou extrait, voir rasteriser_page) et analyse une seule page
+    (tâche d'un worker)
+    
+    Les mesures de la page voyagent avec le résultat (clé 'mesures',
+    retirée par analyser_pdf).
+    """
+    with mesures.page(page_num):
+        image = rasteriser_page(reponses_pdf, page_num, dpi, scan, empreinte_pdf)
+        resultat = analyser_page_mesuree(image, page_num, template_pages, index, mode)
+    # Images de la page écrites avant de rendre le résultat
+    vider_ecriture()
+    resultat['mesures'] = mesures.collecter(page_num)
+    return resultat
+
+
+def analyser_page_mesuree(image, page_num, template_pages, index, mode=None):
+    """
+    analyser_page avec la page de template choisie par choisir_template,
+    mesurée comme étape 'page' et attribuée à page_num
+    
+    Le résultat indique la page de template utilisée ('page_template').
+    Émet les événements de progression 'page_debut' et 'page_fin' (temps de
+    chaque étape de la page, erreur éventuelle). Une page déjà analysée
+    (mêmes pixels, même template, mêmes paramètres) est lue dans le cache.
+    
+    Args:
+        template_pages: Pages du template, à l'échelle de DPI
+        index: routage_templates.construire_index(template_pages), construit
+            une fois pour toutes les pages
+    """
+    emettre_progression('page_debut', page=page_num)
+    with mesures.page(page_num), mesures.etape('page', image) as mesure:
+        indice = choisir_template(image, page_num, template_pages, index)
+        template_page = template_pages[indice]
+        resultat, cle = lire_cache(image, page_num, template_page, mode)
+        if resultat is None:
+            resultat = analyser_page(image, page_num, template_page, mode)
+            resultat['page_template'] = template_page.get('page', indice + 1)
+            if cle:
+                cache_pages.ecrire(CACHE_DOSSIER, cle, resultat)
+    
+    if PROGRESSION:
+        etapes = {nom: round(total['duree'], 4)
+                  for nom, total in mesures.resume(mesures.lire(page_num)).items() if nom != 'page'}
+        emettre_progression('page_fin', page=page_num, duree=round(mesure.get('duree', 0), 4),
+                            etapes=etapes, erreur=resultat.get('erreur'))
+    return resultat
+
+
+def choisir_template(image, page_num, template_pages, index):
+    """
+    Indice de la page de template d'une page scannée: signature la plus
+    proche (routage_templates), 0 si le template n'a pas de signatures
+    (index None, voir calibrer_template)
+    
+    Args:
+        index: routage_templates.construire_index(template_pages)
+    """
+    if index is None:
+        return 0
+    with mesures.etape('routage', image) as mesure:
+        indice, distance = routage_templates.router(index, image)
+        mesure['distance'] = distance
+    
+    page_template = template_pages[indice].get('page', indice + 1)
+    if distance > routage_templates.DISTANCE_MAX:
+        print(f"  ⚠ Page {page_num}: aucun template ressemblant, page {page_template} "
+              f"la plus proche (distance {distance:.2f})")
+    else:
+        print(f"  Page {page_num}: template page {page_template} (distance {distance:.2f})")
+    return indice
+
+
+def pages_template(template, dpi=None):
+    """Toutes les pages du template, à l'échelle de dpi (défaut DPI)"""
+    facteur = (dpi or DPI) / dpi_template(template)
+    return [mettre_template_a_l_echelle(page, facteur) for page in template['pages']]
+
+
+def contexte_cache(template_page, mode=None):
+    """
+    Tout ce dont dépend le résultat d'une page, hors ses pixels: version de
+    l'analyse, mode, page(s) du template, constantes de detect0, reperage et
+    detection_cases (sauf PARAMETRES_HORS_CACHE)
+    
+    Args:
+        template_page: Page du template, ou liste de pages
+    """
+    parametres = {}
+    for nom_module, constantes in (('detect0', globals()), ('reperage', vars(reperage)),
+                                   ('detection_cases', vars(detection_cases))):
+        for nom, valeur in constantes.items():
+            if not nom.isupper() or nom in PARAMETRES_HORS_CACHE:
+                continue
+            # 200 et 200.0 (après configurer_dpi) sont le même paramètre
+            if isinstance(valeur, (int, float)) and not isinstance(valeur, bool):
+                parametres[f"{nom_module}.{nom}"] = float(valeur)
+            elif isinstance(valeur, (bool, str, list, tuple, dict, type(None))):
+                parametres[f"{nom_module}.{nom}"] = valeur
+    return json.dumps({
+        'version': VERSION_ANALYSE,
+        'mode': mode or MODE_ANALYSE,
+        'template': template_page,
+        'parametres': parametres
+    }, sort_keys=True, default=str)
+
+
+def lire_cache(image, page_num, template_page, mode=None):
+    """
+    Cherche le résultat de la page dans le cache (CACHE_DOSSIER)
+    
+    Returns:
+        tuple (résultat renuméroté page_num ou None, clé de cache ou None sans cache)
+    """
+    if not CACHE_DOSSIER:
+        return None, None
+    with mesures.etape('cache', image) as mesure:
+        cle = cache_pages.empreinte_page(image, contexte_cache(template_page, mode))
+        resultat = cache_pages.lire(CACHE_DOSSIER, cle)
+        mesure['trouve'] = resultat is not None
+    if resultat is not None:
+        resultat['page'] = page_num
+        print(f"  Page {page_num}: résultat en cache")
+    return resultat, cle
+
+
+def emettre_progression(evenement, **champs):
+    """
+    Écrit un événement de progression sur stderr, si PROGRESSION
+    
+    Une ligne JSON par événement, écrite d'un bloc: les lignes des workers
+    ne s'entremêlent pas. stdout garde le journal lisible.
+    
+    Événements: 'debut' (pages, workers, dpi), 'page_debut' (page),
+    'page_fin' (page, duree, etapes, erreur), 'fin' (pages, duree, pages_par_seconde)
+    """
+    if not PROGRESSION:
+        return
+    ligne = json.dumps(dict(evenement=evenement, temps=time.time(), **champs), ensure_ascii=False)
+    sys.stderr.write(ligne + '\n')
+    sys.stderr.flush()
+
+
+def analyser_pdf(reponses_pdf, template_pages, mode=None, workers=WORKERS, backend=BACKEND,
+                 lot=PAGES_PAR_LOT, pages=None, a_chaque_page=None, scans=None):
+    """
+    Analyse toutes les pages du PDF
+    
+    Avec un seul worker, les pages sont rastérisées par lots (iterer_pages).
+    Sinon chaque worker rastérise et analyse ses pages: seuls les résultats
+    (petits dicts) reviennent, jamais les images. OpenCV reçoit
+    cœurs / workers threads pour éviter la sur-souscription.
+    
+    Args:
+        template_pages: Pages du template à l'échelle de DPI (pages_template),
+            chaque page scannée est analysée avec la plus ressemblante
+        workers: Nombre de pages analysées en parallèle
+        backend: 'processus' ou 'threads'
+        lot: Pages rastérisées à la fois (un seul worker)
+        pages: Numéros des pages à analyser (None = toutes)
+        a_chaque_page: Fonction appelée avec le résultat de chaque page dès
+            qu'elle est terminée (dans l'ordre d'achèvement), ex. ecrire_reprise
+        scans: scans_pdf(reponses_pdf, ...) si déjà connu (None = lu ici)
+    
+    Returns:
+        Liste des résultats de analyser_page, dans l'ordre des pages
+        (les mesures de toutes les pages sont ramenées dans ce processus,
+        voir mesures.collecter)
+    """
+    index = routage_templates.construire_index(template_pages)
+    if workers <= 1:
+        resultats = []
+        for page_num, image in iterer_pages(reponses_pdf, lot=lot, pages=pages, scans=scans):
+            resultat = analyser_page_mesuree(image, page_num, template_pages, index, mode)
+            if a_chaque_page:
+                a_chaque_page(resultat)
+            resultats.append(resultat)
+        vider_ecriture()
+        return resultats
+    
+    nb_pages = pdfinfo_from_path(reponses_pdf)['Pages']
+    if pages is None:
+        pages = range(1, nb_pages + 1)
+    if scans is None:
+        scans = scans_pdf(reponses_pdf, nb_pages)
+    empreinte_pdf = cache_pages.empreinte_fichier(reponses_pdf) if RASTERS_DOSSIER else None
+    nb_threads = threads_opencv(workers)
+    
+    if backend == 'threads':
+        threads_avant = cv2.getNumThreads()
+        cv2.setNumThreads(nb_threads)
+        executor = ThreadPoolExecutor(workers)
+    else:
+        threads_avant = None
+        executor = ProcessPoolExecutor(workers, initializer=initialiser_worker,
+                                       initargs=(nb_threads, DPI, IMAGES_DEBUG, PROGRESSION, CACHE_DOSSIER,
+                                                 RASTERS_DOSSIER))
+    
+    try:
+        with executor:
+            taches = [executor.submit(traiter_page, reponses_pdf, page_num, template_pages, index, mode,
+                                      None, scans.get(page_num), empreinte_pdf)
+                      for page_num in pages]
+            # Une page en erreur annule les pages en attente, mais les pages en
+            # cours vont au bout (et passent par a_chaque_page) avant l'erreur
+            erreur = None
+            try:
+                for tache in as_completed(taches):
+                    if tache.cancelled():
+                        continue
+                    try:
+                        resultat = tache.result()
+                    except Exception as e:
+                        if erreur is None:
+                            erreur = e
+                            for autre in taches:
+                                autre.cancel()
+                        continue
+                    mesures.ajouter(resultat.pop('mesures'))
+                    if a_chaque_page:
+                        a_chaque_page(resultat)
+            except BaseException:
+                # Interruption: ne pas lancer les pages en attente
+                for tache in taches:
+                    tache.cancel()
+                raise
+            if erreur is not None:
+                raise erreur
+            # Résultats dans l'ordre des pages
+            resultats = [tache.result() for tache in taches]
+    finally:
+        if threads_avant is not None:
+            cv2.setNumThreads(threads_avant)
+    
+    return resultats
+
+
+def mesurer_workers(reponses_pdf, template_pages, mode=None, liste_workers=(1, 2, 4, 8, 16),
+                    backend=BACKEND, scans=None):
+    """
+    Benchmark de montée en charge: temps d'analyse du PDF selon le nombre de workers
+    
+    Les caches (résultats, pages rastérisées) sont désactivés pendant les mesures.
+    
+    Args:
+        scans: voir analyser_pdf
+    
+    Returns:
+        Liste de dicts {workers, secondes, pages_par_seconde, identique}
+        (identique: mêmes résultats qu'avec le premier nombre de workers)
+    """
+    global CACHE_DOSSIER, RASTERS_DOSSIER
+    releves = []
+    reference = None
+    caches = CACHE_DOSSIER, RASTERS_DOSSIER
+    CACHE_DOSSIER = RASTERS_DOSSIER = None
+    try:
+        for workers in liste_workers:
+            t0 = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                pages = analyser_pdf(reponses_pdf, template_pages, mode, workers, backend, scans=scans)
+            secondes = time.perf_counter() - t0
+            
+            if reference is None:
+                reference = pages
+            releves.append({
+                'workers': workers,
+                'secondes': secondes,
+                'pages_par_seconde': len(pages) / secondes,
+                'identique': pages == reference
+            })
+    finally:
+        CACHE_DOSSIER, RASTERS_DOSSIER = caches
+    return releves
+
+
+def comparer_resultats(reference, test):
+    """
+    Compare champ par champ deux analyses du même PDF
+    
+    Champs comparés: score_echelle de chaque page et réponse de chaque case.
+    
+    Args:
+        reference, test: listes de résultats de analyser_page
+    
+    Returns:
+        tuple (nb_champs, differences): differences = liste de
+        (page, champ, valeur de référence, valeur testée)
+    """
+    nb_champs = 0
+    differences = []
+    if len(reference) != len(test):
+        differences.append((None, 'pages', len(reference), len(test)))
+    
+    for page_ref, page_test in zip(reference, test):
+        page_num = page_ref['page']
+        nb_champs += 1
+        if page_ref.get('score_echelle') != page_test.get('score_echelle'):
+            differences.append((page_num, 'score_echelle',
+                                page_ref.get('score_echelle'), page_test.get('score_echelle')))
+        
+        questions_ref = page_ref.get('questions', {})
+        questions_test = page_test.get('questions', {})
+        for q_id in sorted(set(questions_ref) | set(questions_test)):
+            reponses_ref = {r['index']: r['reponse'] for r in questions_ref.get(q_id, {}).get('reponses', [])}
+            reponses_test = {r['index']: r['reponse'] for r in questions_test.get(q_id, {}).get('reponses', [])}
+            for idx in sorted(set(reponses_ref) | set(reponses_test)):
+                nb_champs += 1
+                if reponses_ref.get(idx) != reponses_test.get(idx):
+                    differences.append((page_num, f"{q_id}[{idx}]",
+                                        reponses_ref.get(idx), reponses_test.get(idx)))
+    
+    return nb_champs, differences
+
+
+def valider_dpi(reponses_pdf, template, dpi, mode=None, workers=WORKERS, backend=BACKEND, scans=None):
+    """
+    Analyse le PDF à DPI_REFERENCE puis à dpi et compare les résultats champ par champ
+    
+    Args:
+        scans: voir analyser_pdf
+    
+    Returns:
+        tuple (nb_champs, differences), voir comparer_resultats
+    """
+    dpi_initial = DPI
+    resultats = {}
+    try:
+        for d in (DPI_REFERENCE, dpi):
+            configurer_dpi(d)
+            with contextlib.redirect_stdout(io.StringIO()):
+                resultats[d] = analyser_pdf(reponses_pdf, pages_template(template, d), mode, workers, backend,
+                                            scans=scans)
+    finally:
+        configurer_dpi(dpi_initial)
+    return comparer_resultats(resultats[DPI_REFERENCE], resultats[dpi])
+
+
+def pic_memoire():
+    """
+    Pic de mémoire résidente (Mo) du processus et de ses enfants terminés
+    (pdftoppm)
+    
+    Returns:
+        tuple (processus, enfants)
+    """
+    # ru_maxrss est en Ko sous Linux, en octets sous macOS
+    unite = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    processus = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unite
+    enfants = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / unite
+    return processus, enfants
+
+
+# ============================================================
+# REPRISE
+# ============================================================
+
+def entete_reprise(reponses_pdf, template_pages, mode=None):
+    """
+    En-tête du fichier de reprise: empreintes du PDF et du contexte
+    d'analyse (template, paramètres). Une reprise n'est acceptée que si
+    les deux sont identiques.
+    """
+    return {
+        'pdf': cache_pages.empreinte_fichier(reponses_pdf),
+        'analyse': hashlib.sha256(contexte_cache(template_pages, mode).encode('utf-8')).hexdigest()
+    }
+
+
+def lire_reprise(chemin, entete):
+    """
+    Pages déjà terminées d'après le fichier de reprise
+    
+    Une dernière ligne tronquée (arrêt pendant l'écriture) est ignorée.
+    
+    Returns:
+        dict numéro de page → résultat ({} si pas de fichier ou autre PDF/analyse)
+    """
+    try:
+        with open(chemin, 'r', encoding='utf-8') as f:
+            lignes = f.read().splitlines()
+    except OSError:
+        return {}
+    
+    try:
+        if json.loads(lignes[0]) != entete:
+            print(f"⚠ {chemin}: autre PDF ou autres paramètres, reprise ignorée")
+            return {}
+    except (IndexError, ValueError):
+        return {}
+    
+    pages = {}
+    for ligne in lignes[1:]:
+        try:
+            resultat = json.loads(ligne)
+        except ValueError:
+            continue
+        pages[resultat['page']] = resultat
+    return pages
+
+
+def ouvrir_reprise(chemin, entete, continuer=False):
+    """
+    Ouvre le fichier de reprise en ajout (continuer) ou le recrée avec l'en-tête
+    """
+    if continuer:
+        return open(chemin, 'a', encoding='utf-8')
+    journal = open(chemin, 'w', encoding='utf-8')
+    ecrire_reprise(journal, entete)
+    return journal
+
+
+def ecrire_reprise(journal, resultat):
+    """Ajoute une ligne JSON et la force sur disque (survit à un arrêt brutal)"""
+    journal.write(json.dumps(resultat, ensure_ascii=False) + '\n')
+    journal.flush()
+    os.fsync(journal.fileno())
+
+
+# ============================================================
+# TEMPLATE
+# ============================================================
+
+def calibrer_template(template, pages):
+    """
+    Ajoute à chaque page du template les 6 repères de la page vierge (clé
+    'reperes') et sa signature de mise en page (clé 'signature', voir
+    routage_templates)
+    
+    Args:
+        template: dict du template.json (modifié en place)
+        pages: images des pages vierges (niveaux de gris ou BGR), dans l'ordre de template['pages']
+    
+    Returns:
+        Nombre de pages calibrées
+    """
+    nb = 0
+    for num, (template_page, image) in enumerate(zip(template['pages'], pages), 1):
+        signature = routage_templates.signature_page(image)
+        template_page['signature'] = [round(float(v), 5) for v in signature]
+        
+        reperes = detecter_reperes(image)
+        if not reperes:
+            print(f"  ⚠ Page {num}: repères non détectés")
+            continue
+        template_page['reperes'] = reperes_template(reperes)
+        print(f"  ✓ Page {num}: repères enregistrés")
+        nb += 1
+    return nb
+
+
 # ============================================================
 # MAIN
 # ============================================================
 
 def main():
-    if len(sys.argv) < 4:
-        print("\nUsage: python depouiller_reponses.py template.json reponses.pdf output.json\n")
-        sys.exit(1)
-    
-    template_json = sys.argv[1]
-    reponses_pdf = sys.argv[2]
-    output_json = sys.argv[3]
+    global IMAGES_DEBUG, PROGRESSION, CACHE_DOSSIER, EXTRACTION_SCANS, RASTERS_DOSSIER
+    parser = argparse.ArgumentParser(description="Dépouille les questionnaires remplis")
+    parser.add_argument('template_json', help="Template (template.json)")
+    parser.add_argument('reponses_pdf', help="PDF des réponses (ou PDF vierge avec --reperes-template)")
+    parser.add_argument('output_json', nargs='?', help="Fichier JSON de résultats")
+    parser.add_argument('--recalage', action='store_true',
+                        help="Lit les cases du template après recalage affine, sans détection sur la page entière")
+    parser.add_argument('--reperes-template', action='store_true',
+                        help="Enregistre dans le template les 6 repères et la signature de chaque page du PDF vierge")
+    parser.add_argument('--lot', type=int, default=PAGES_PAR_LOT,
+                        help=f"Pages rastérisées à la fois (0 = tout le PDF, défaut {PAGES_PAR_LOT})")
+    parser.add_argument('--workers', type=int, default=WORKERS,
+                        help=f"Pages analysées en parallèle (défaut {WORKERS})")
+    parser.add_argument('--backend', choices=['processus', 'threads'], default=BACKEND,
+                        help=f"Type de workers (défaut {BACKEND})")
+    parser.add_argument('--benchmark-workers', action='store_true',
+                        help="Mesure le débit avec 1, 2, 4, 8 et 16 workers (pas de sortie JSON)")
+    resolution = parser.add_mutually_exclusive_group()
+    resolution.add_argument('--dpi', type=int,
+                            help=f"Résolution d'analyse, 200-300 pour aller plus vite (défaut {DPI}, "
+                                 f"scans extraits ramenés à cette résolution)")
+    resolution.add_argument('--dpi-natif', action='store_true',
+                            help=f"Analyse un PDF fait uniquement de scans de même résolution à cette "
+                                 f"résolution (au plus {DPI_REFERENCE}), sans rééchantillonnage")
+    parser.add_argument('--sans-extraction', action='store_true',
+                        help="Rend toutes les pages avec poppler, même celles qui ne sont qu'un scan")
+    parser.add_argument('--debug-images', choices=['none', 'thumb', 'full'], default=IMAGES_DEBUG,
+                        help=f"Images de contrôle dans out/: aucune, miniatures ou pleine résolution (défaut {IMAGES_DEBUG})")
+    parser.add_argument('--mesures', metavar='JSONL',
+                        help="Exporte le temps, le CPU et les tailles de chaque étape de chaque page (JSON lines)")
+    parser.add_argument('--trace', metavar='JSON',
+                        help="Exporte les étapes au format Chrome trace-event (chrome://tracing, Perfetto)")
+    parser.add_argument('--progression', action='store_true',
+                        help="Événements de progression JSON (une ligne par événement) sur stderr")
+    parser.add_argument('--cache', metavar='DOSSIER', default=CACHE_DOSSIER,
+                        help="Garde le résultat de chaque page dans DOSSIER (ex. cache/pages): une page "
+                             "inchangée n'est pas réanalysée (défaut: désactivé)")
+    parser.add_argument('--rasters', metavar='DOSSIER', default=RASTERS_DOSSIER,
+                        help="Garde les pages rastérisées dans DOSSIER (ex. cache/rasters) pour les relances "
+                             "sur le même PDF (défaut: désactivé)")
+    parser.add_argument('--reprise', action='store_true',
+                        help=f"Reprend un traitement interrompu: les pages de output_json{SUFFIXE_REPRISE} ne sont pas refaites")
+    parser.add_argument('--valider-dpi', action='store_true',
+                        help=f"Compare case par case les résultats à --dpi et à {DPI_REFERENCE} DPI (pas de sortie JSON)")
+    args = parser.parse_args()
+    
+    IMAGES_DEBUG = args.debug_images
+    PROGRESSION = args.progression
+    CACHE_DOSSIER = args.cache
+    EXTRACTION_SCANS = not args.sans_extraction
+    RASTERS_DOSSIER = args.rasters
+    
+    if args.reperes_template:
+        with open(args.template_json, 'r', encoding='utf-8') as f:
+            template = json.load(f)
+        # Repères relevés dans le repère du template
+        configurer_dpi(dpi_template(template))
+        images = [image for _, image in iterer_pages(args.reponses_pdf)]
+        nb = calibrer_template(template, images)
+        with open(args.template_json, 'w', encoding='utf-8') as f:
+            json.dump(template, f, ensure_ascii=False, indent=2)
+        print(f"\n✓ {nb} page(s) calibrée(s) → {args.template_json}\n")
+        return
+    
+    mode = 'recalage' if args.recalage else MODE_ANALYSE
+    
+    # Pages scannées (pdfimages -list, pdfinfo) lues une fois pour toutes les étapes
+    nb_pages = pdfinfo_from_path(args.reponses_pdf)['Pages']
+    scans = scans_pdf(args.reponses_pdf, nb_pages)
+    
+    if args.valider_dpi:
+        with open(args.template_json, 'r', encoding='utf-8') as f:
+            template = json.load(f)
+        dpi = args.dpi or DPI
+        nb_champs, differences = valider_dpi(args.reponses_pdf, template, dpi, mode,
+                                             args.workers, args.backend, scans)
+        print(f"\n{dpi} DPI / {DPI_REFERENCE} DPI: {nb_champs - len(differences)}/{nb_champs} champs identiques")
+        for page_num, champ, valeur_ref, valeur_test in differences:
+            print(f"  ✗ page {page_num} {champ}: {valeur_ref} → {valeur_test}")
+        print()
+        return
+    
+    # Avec --dpi-natif, un PDF de scans est analysé à leur résolution native
+    # (pas de suréchantillonnage, template mis à l'échelle de cette résolution)
+    natif = dpi_natif(scans, nb_pages) if args.dpi_natif else None
+    if args.dpi_natif and not natif:
+        print(f"⚠ --dpi-natif: pas uniquement des scans de même résolution, analyse à {DPI} DPI")
+    configurer_dpi(args.dpi or natif or DPI)
+    
+    if args.benchmark_workers:
+        with open(args.template_json, 'r', encoding='utf-8') as f:
+            template = json.load(f)
+        print(f"\n{'workers':>8} {'temps':>9} {'pages/s':>8}  identique")
+        for m in mesurer_workers(args.reponses_pdf, pages_template(template), mode, backend=args.backend,
+                                 scans=scans):
+            print(f"{m['workers']:>8} {m['secondes']:>8.1f}s {m['pages_par_seconde']:>8.2f}  "
+                  f"{'✓' if m['identique'] else '✗'}")
+        print()
+        return
+    
+    if not args.output_json:
+        parser.error("output_json requis")
+    
+    template_json = args.template_json
+    reponses_pdf = args.reponses_pdf
+    output_json = args.output_json
     
     print(f"\n{'='*60}")
     print(f"DÉPOUILLEMENT")
     print(f"{'='*60}\n")
     
-    os.makedirs("out", exist_ok=True)
-    
     with open(template_json, 'r', encoding='utf-8') as f:
         template = json.load(f)
     print(f"✓ Template: {len(template['pages'])} page(s)")
     
-    template_page = template['pages'][0]
-    print(f"✓ Utilisation page 1\n")
+    template_pages = pages_template(template)
+    if routage_templates.construire_index(template_pages):
+        print(f"✓ Chaque page va à la page de template la plus ressemblante ({DPI} DPI)\n")
+    else:
+        print(f"✓ Utilisation page 1 ({DPI} DPI)\n")
     
-    pages = convert_from_path(reponses_pdf, dpi=600)
-    print(f"✓ {len(pages)} page(s)\n")
+    extraits = f", {len(scans)} scan(s) extrait(s) sans rendu" if scans else ""
+    if natif:
+        extraits += f" ({natif} DPI natifs)"
+    print(f"✓ {nb_pages} page(s){extraits}\n")
     
     resultats = {
         'fichier_template': template_json,
         'fichier_reponses': reponses_pdf,
+        'dpi': DPI,
         'pages': []
     }
     
-    for page_num, page_img in enumerate(pages, 1):
-        img = cv2.cvtColor(np.array(page_img), cv2.COLOR_RGB2BGR)
-        page_data = analyser_page(img, page_num, template_page)
-        resultats['pages'].append(page_data)
-    
+    # Chaque page terminée est ajoutée au fichier de reprise; --reprise
+    # repart des pages qui y figurent déjà
+    reprise = output_json + SUFFIXE_REPRISE
+    entete = entete_reprise(reponses_pdf, template_pages, mode)
+    deja_faites = lire_reprise(reprise, entete) if args.reprise else {}
+    deja_faites = {page_num: r for page_num, r in deja_faites.items() if page_num <= nb_pages}
+    a_faire = [page_num for page_num in range(1, nb_pages + 1) if page_num not in deja_faites]
+    if deja_faites:
+        print(f"✓ Reprise: {len(deja_faites)} page(s) déjà faite(s), {len(a_faire)} à analyser\n")
+    
+    emettre_progression('debut', pages=nb_pages, deja_faites=len(deja_faites), workers=args.workers, dpi=DPI)
+    t0 = time.perf_counter()
+    with ouvrir_reprise(reprise, entete, continuer=bool(deja_faites)) as journal:
+        nouvelles = analyser_pdf(reponses_pdf, template_pages, mode, args.workers, args.backend, args.lot,
+                                 pages=a_faire, a_chaque_page=lambda r: ecrire_reprise(journal, r), scans=scans)
+    duree = time.perf_counter() - t0
+    emettre_progression('fin', pages=len(a_faire), duree=round(duree, 3),
+                        pages_par_seconde=round(len(a_faire) / duree, 3) if duree else None)
+    
+    resultats['pages'] = sorted(list(deja_faites.values()) + nouvelles, key=lambda r: r['page'])
     with open(output_json, 'w', encoding='utf-8') as f:
         json.dump(resultats, f, ensure_ascii=False, indent=2)
+    os.remove(reprise)
+    
+    evenements = mesures.collecter()
+    if CACHE_DOSSIER:
+        trouvees = sum(1 for e in evenements if e['etape'] == 'cache' and e['trouve'])
+        print(f"\n✓ Cache: {trouvees}/{len(a_faire)} page(s) déjà analysée(s)")
+    if RASTERS_DOSSIER:
+        trouvees = sum(1 for e in evenements if e['etape'] == 'cache_raster' and e['trouve'])
+        print(f"\n✓ Rasters: {trouvees}/{len(a_faire)} page(s) lue(s) sans décodage")
+    if args.mesures:
+        mesures.exporter_jsonl(args.mesures, evenements)
+    if args.trace:
+        mesures.exporter_trace_chrome(args.trace, evenements)
+    if args.mesures or args.trace:
+        print(f"\n{'étape':<20} {'appels':>7} {'temps':>9} {'CPU':>9}")
+        for nom, total in mesures.resume(evenements).items():
+            print(f"{nom:<20} {total['appels']:>7} {total['duree']:>8.2f}s {total['cpu']:>8.2f}s")
     
     print(f"\n{'='*60}")
     print(f"✓ {output_json}")
-    print(f"✓ out/")
-    print(f"  🟢 VERT   = Vides")
-    print(f"  🔴 ROUGE  = Manquantes")
-    print(f"  🟠 ORANGE = Cochées (noires)")
-    print(f"  🔵 BLEU   = Cochées (traits)")
+    if args.mesures:
+        print(f"✓ {args.mesures}")
+    if args.trace:
+        print(f"✓ {args.trace}")
+    if IMAGES_DEBUG != 'none':
+        print(f"✓ out/")
+        print(f"  🟢 VERT   = Vides")
+        print(f"  🔴 ROUGE  = Manquantes")
+        print(f"  🟠 ORANGE = Cochées (noires)")
+        print(f"  🔵 BLEU   = Cochées (traits)")
+    processus, enfants = pic_memoire()
+    print(f"✓ Pic mémoire: {processus:.0f} Mo (rastérisation: {enfants:.0f} Mo)")
     print(f"{'='*60}\n")
 
 
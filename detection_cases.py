@@ -2,107 +2,214 @@
 """
 Module de détection des cases à cocher dans les questionnaires
 """
+import time
+
 import cv2
 import numpy as np
 
+import mesures
+
+# Dimensions des cases (pixels à DPI_REFERENCE, voir configurer_dpi)
+CASE_AIRE_MIN = 1000          # Aire minimale (pixels²)
+CASE_AIRE_MAX = 2500          # Aire maximale (pixels²)
+DEDUP_DISTANCE_MIN = 10       # Distance min entre centres de deux cases distinctes (pixels)
+LIGNES_TOLERANCE_Y = 50       # Tolérance verticale d'une ligne de cases (pixels)
+
+# Tolérance min de l'approximation polygonale (pixels). Non mise à l'échelle:
+# l'arrondi des coins dû à la numérisation fait ~1 pixel quelle que soit la
+# résolution. Sans effet à 600 DPI (2% du périmètre d'une case y dépasse 2 px)
+APPROX_EPSILON_MIN = 2.0
+
+DPI_REFERENCE = 600
+LONGUEURS_REFERENCE = {'DEDUP_DISTANCE_MIN': DEDUP_DISTANCE_MIN, 'LIGNES_TOLERANCE_Y': LIGNES_TOLERANCE_Y}
+AIRES_REFERENCE = {'CASE_AIRE_MIN': CASE_AIRE_MIN, 'CASE_AIRE_MAX': CASE_AIRE_MAX}
+
+
+def configurer_dpi(dpi):
+    """
+    Met les dimensions des cases à l'échelle d'une résolution de rendu
+    
+    Ce ne sont que des seuils de comparaison: ils ne sont pas arrondis.
+    """
+    facteur = dpi / DPI_REFERENCE
+    for nom, valeur in LONGUEURS_REFERENCE.items():
+        globals()[nom] = valeur * facteur
+    for nom, valeur in AIRES_REFERENCE.items():
+        globals()[nom] = valeur * facteur * facteur
 
-def detecter_cases(image, aire_min=1000, aire_max=2500, ratio_min=0.85, ratio_max=1.4):
+
+def detecter_cases(image, aire_min=None, aire_max=None, ratio_min=0.85, ratio_max=1.4,
+                   bandes=None, stats=None):
     """
     Détecte toutes les cases à cocher dans une image
     
+    Les contours sont filtrés du moins cher au plus cher: nombre de points,
+    rectangle englobant (ratio, aire max possible), aire du contour, et
+    seulement alors approximation polygonale. Chaque critère étant aussi
+    appliqué par la version sans pré-filtrage, le résultat est le même.
+    
     Args:
         image: Image OpenCV (BGR ou grayscale)
-        aire_min: Aire minimale en pixels²
-        aire_max: Aire maximale en pixels²
+        aire_min: Aire minimale en pixels² (défaut CASE_AIRE_MIN)
+        aire_max: Aire maximale en pixels² (défaut CASE_AIRE_MAX)
         ratio_min: Ratio largeur/hauteur minimum
         ratio_max: Ratio largeur/hauteur maximum
+        bandes: Liste de (y_min, y_max) où chercher, None = page entière
+        stats: dict optionnel, rempli avec le nombre de candidats restant
+               après chaque étape et le temps de chaque étape (secondes)
     
     Returns:
         Liste de dicts avec clés: x, y, w, h, aire, ratio
     """
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image.copy()
+    if aire_min is None:
+        aire_min = CASE_AIRE_MIN
+    if aire_max is None:
+        aire_max = CASE_AIRE_MAX
+    
+    t0 = time.perf_counter()
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
     _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-    contours, _ = cv2.findContours(binary, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+    t1 = time.perf_counter()
     
+    if bandes is None:
+        contours, _ = cv2.findContours(binary, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+    else:
+        # Seuil d'Otsu décidé sur la page, contours cherchés bande par bande
+        contours = []
+        for y_min, y_max in fusionner_bandes(bandes, binary.shape[0]):
+            contours_bande, _ = cv2.findContours(binary[y_min:y_max], cv2.RETR_TREE,
+                                                 cv2.CHAIN_APPROX_SIMPLE, offset=(0, y_min))
+            contours.extend(contours_bande)
+    t2 = time.perf_counter()
+    
+    comptes = {'contours': len(contours), 'points': 0, 'rectangle': 0, 'aire': 0, 'polygone': 0}
     cases = []
     
     for cnt in contours:
-        epsilon = 0.02 * cv2.arcLength(cnt, True)
+        # Un quadrilatère demande au moins 4 points
+        if len(cnt) < 4:
+            continue
+        comptes['points'] += 1
+        
+        x, y, w, h = cv2.boundingRect(cnt)
+        ratio = w / h if h > 0 else 0
+        # L'aire du contour ne dépasse jamais celle du rectangle englobant
+        if not (ratio_min <= ratio <= ratio_max) or w * h < aire_min:
+            continue
+        comptes['rectangle'] += 1
+        
+        aire = cv2.contourArea(cnt)
+        if not (aire_min <= aire <= aire_max):
+            continue
+        comptes['aire'] += 1
+        
+        epsilon = max(0.02 * cv2.arcLength(cnt, True), APPROX_EPSILON_MIN)
         approx = cv2.approxPolyDP(cnt, epsilon, True)
         
         if len(approx) == 4:
-            x, y, w, h = cv2.boundingRect(cnt)
-            aire = cv2.contourArea(cnt)
-            ratio = w / h if h > 0 else 0
-            
-            if aire_min <= aire <= aire_max and ratio_min <= ratio <= ratio_max:
-                cases.append({
-                    'x': int(x),
-                    'y': int(y),
-                    'w': int(w),
-                    'h': int(h),
-                    'aire': int(aire),
-                    'ratio': round(ratio, 2)
-                })
+            comptes['polygone'] += 1
+            cases.append({
+                'x': int(x),
+                'y': int(y),
+                'w': int(w),
+                'h': int(h),
+                'aire': int(aire),
+                'ratio': round(ratio, 2)
+            })
+    
+    if stats is not None:
+        stats.update(comptes)
+        stats['t_binarisation'] = t1 - t0
+        stats['t_contours'] = t2 - t1
+        stats['t_filtrage'] = time.perf_counter() - t2
     
     return cases
 
 
-def dedupliquer_cases(cases, distance_min=10):
+def fusionner_bandes(bandes, hauteur):
+    """Trie, borne à [0, hauteur] et fusionne les bandes (y_min, y_max) qui se chevauchent"""
+    fusion = []
+    for y_min, y_max in sorted(bandes):
+        y_min, y_max = max(0, int(y_min)), min(hauteur, int(y_max))
+        if y_max <= y_min:
+            continue
+        if fusion and y_min <= fusion[-1][1]:
+            fusion[-1][1] = max(fusion[-1][1], y_max)
+        else:
+            fusion.append([y_min, y_max])
+    return [tuple(b) for b in fusion]
+
+
+@mesures.mesurer('deduplication')
+def dedupliquer_cases(cases, distance_min=None):
     """
     Élimine les doublons (cases à moins de distance_min pixels)
     Garde la case avec la plus grande aire en cas de doublon
     
+    Les cases gardées sont rangées dans une grille de pas distance_min:
+    un doublon éventuel est forcément dans l'une des 9 cellules voisines,
+    chaque case n'est donc comparée qu'à quelques voisines au lieu de toutes.
+    Même résultat que la comparaison à toutes les cases gardées
+    (voir tests/test_detection_cases.py).
+    
     Args:
         cases: Liste de cases détectées
-        distance_min: Distance minimale entre centres (pixels)
+        distance_min: Distance minimale entre centres (pixels, défaut DEDUP_DISTANCE_MIN)
     
     Returns:
         Liste de cases uniques
     """
     if not cases:
         return []
+    if distance_min is None:
+        distance_min = DEDUP_DISTANCE_MIN
     
     # Trier par aire décroissante (garder les plus grandes)
     cases_triees = sorted(cases, key=lambda c: c['aire'], reverse=True)
     
     cases_uniques = []
+    grille = {}
     
     for case in cases_triees:
-        est_doublon = False
+        cx = case['x'] + case['w'] / 2
+        cy = case['y'] + case['h'] / 2
+        gx = int(cx // distance_min)
+        gy = int(cy // distance_min)
         
-        for case_unique in cases_uniques:
-            # Distance entre centres
-            cx1 = case['x'] + case['w'] / 2
-            cy1 = case['y'] + case['h'] / 2
-            cx2 = case_unique['x'] + case_unique['w'] / 2
-            cy2 = case_unique['y'] + case_unique['h'] / 2
-            
-            distance = ((cx1 - cx2)**2 + (cy1 - cy2)**2)**0.5
-            
-            if distance < distance_min:
-                est_doublon = True
+        est_doublon = False
+        for voisin_x in (gx - 1, gx, gx + 1):
+            for voisin_y in (gy - 1, gy, gy + 1):
+                for cx2, cy2 in grille.get((voisin_x, voisin_y), ()):
+                    if ((cx - cx2)**2 + (cy - cy2)**2)**0.5 < distance_min:
+                        est_doublon = True
+                        break
+                if est_doublon:
+                    break
+            if est_doublon:
                 break
         
         if not est_doublon:
             cases_uniques.append(case)
+            grille.setdefault((gx, gy), []).append((cx, cy))
     
     return cases_uniques
 
 
-def regrouper_par_lignes(cases, tolerance_y=50):
+def regrouper_par_lignes(cases, tolerance_y=None):
     """
     Regroupe les cases par ligne horizontale (même Y)
     
     Args:
         cases: Liste de cases
-        tolerance_y: Tolérance verticale en pixels
+        tolerance_y: Tolérance verticale en pixels (défaut LIGNES_TOLERANCE_Y)
     
     Returns:
         Liste de listes (chaque sous-liste = une ligne)
     """
     if not cases:
         return []
+    if tolerance_y is None:
+        tolerance_y = LIGNES_TOLERANCE_Y
     
     # Trier par Y puis X
     cases_triees = sorted(cases, key=lambda c: (c['y'], c['x']))
@@ -129,17 +236,23 @@ def regrouper_par_lignes(cases, tolerance_y=50):
     return lignes
 
 
-def detecter_cases_completes(image):
+@mesures.mesurer('detection_cases')
+def detecter_cases_completes(image, bandes=None, stats=None):
     """
     Pipeline complet: détection + déduplication + tri
     
     Args:
         image: Image OpenCV
+        bandes: Liste de (y_min, y_max) où chercher, None = page entière
+        stats: dict optionnel des comptes par étape (voir detecter_cases),
+               complété par 'uniques'
     
     Returns:
         Liste de cases uniques triées par ordre naturel (haut→bas, gauche→droite)
     """
-    cases_brutes = detecter_cases(image)
+    cases_brutes = detecter_cases(image, bandes=bandes, stats=stats)
     cases_uniques = dedupliquer_cases(cases_brutes)
+    if stats is not None:
+        stats['uniques'] = len(cases_uniques)
     cases_triees = sorted(cases_uniques, key=lambda c: (c['y'], c['x']))
-    return cases_triees
\ No newline at end of file
+    return cases_triees
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Extraction directe des pages scannées d'un PDF
+==============================================
+Un PDF de copieur contient une seule image (JPEG, CCITT, Flate...) par
+page. Plutôt que de rendre la page avec poppler (souvent un scan 300 DPI
+suréchantillonné à 600 DPI), l'image est décodée telle quelle, à sa
+résolution native (pdfimages, fourni avec poppler comme pdftoppm).
+
+Une page n'est extraite que si elle ne contient qu'une image couvrant
+toute la page; les autres (pages vectorielles, plusieurs images, masques,
+JPEG à tableau /Decode inversé) sont rendues comme avant.
+"""
+import mmap
+import os
+import re
+import subprocess
+import tempfile
+
+import cv2
+
+COUVERTURE_TOLERANCE = 0.02       # Écart max entre taille de l'image (à sa résolution) et de la page
+COULEURS = ('gray', 'rgb', 'index')  # Espaces de couleur extraits (CMYK et autres: rendu)
+ROTATIONS = {
+    90: cv2.ROTATE_90_CLOCKWISE,
+    180: cv2.ROTATE_180,
+    270: cv2.ROTATE_90_COUNTERCLOCKWISE,
+}
+OBJET = re.compile(rb'(?<![0-9])([0-9]+)\s+([0-9]+)\s+obj\b')
+FIN_DICTIONNAIRE = re.compile(rb'>>\s*stream\b')
+DECODE = re.compile(rb'/Decode(?![A-Za-z])\s*(\[[^\]]*\])?')
+
+
+def lister_images(chemin_pdf):
+    """
+    Images de chaque page (pdfimages -list)
+
+    Returns:
+        dict numéro de page → liste de dicts {type, largeur, hauteur,
+        couleur, encodage, objet: (numéro, génération), x_ppi, y_ppi}
+    """
+    sortie = subprocess.run(['pdfimages', '-list', chemin_pdf], capture_output=True, text=True,
+                            check=True).stdout
+    images = {}
+    # 2 lignes d'en-tête: "page num type width height color comp bpc enc interp object ID x-ppi y-ppi size ratio"
+    for ligne in sortie.splitlines()[2:]:
+        champs = ligne.split()
+        if len(champs) < 14:
+            continue
+        images.setdefault(int(champs[0]), []).append({
+            'type': champs[2],
+            'largeur': int(champs[3]),
+            'hauteur': int(champs[4]),
+            'couleur': champs[5],
+            'encodage': champs[8],
+            'objet': (int(champs[10]), int(champs[11])),
+            'x_ppi': float(champs[12]),
+            'y_ppi': float(champs[13]),
+        })
+    return images
+
+
+def formats_pages(chemin_pdf, nb_pages):
+    """
+    Taille (points, avant rotation) et rotation de chaque page (pdfinfo -f -l)
+
+    Returns:
+        dict numéro de page → (largeur, hauteur, rotation en degrés)
+    """
+    sortie = subprocess.run(['pdfinfo', '-f', '1', '-l', str(nb_pages), chemin_pdf],
+                            capture_output=True, text=True, check=True).stdout
+    tailles = {}
+    rotations = {}
+    # "Page    1 size: 595.276 x 841.89 pts (A4)" et "Page    1 rot:  0"
+    for ligne in sortie.splitlines():
+        champs = ligne.split()
+        if len(champs) >= 4 and champs[0] == 'Page' and champs[2] == 'size:':
+            tailles[int(champs[1])] = (float(champs[3]), float(champs[5]))
+        elif len(champs) >= 4 and champs[0] == 'Page' and champs[2] == 'rot:':
+            rotations[int(champs[1])] = int(champs[3]) % 360
+    return {page: taille + (rotations.get(page, 0),) for page, taille in tailles.items()}
+
+
+def decodes_par_defaut(chemin_pdf, objets):
+    """
+    Objets image dont le tableau /Decode est absent ou celui par défaut
+    ([0 1] par composante)
+
+    Le dictionnaire d'un flux est toujours en clair dans le PDF (jamais dans
+    un flux d'objets): il est lu entre "N G obj" et "stream", dernière
+    définition de l'objet retenue (mises à jour incrémentales). Un objet
+    introuvable ou un /Decode indirect compte comme non par défaut.
+
+    Args:
+        objets: ensemble de (numéro, génération)
+
+    Returns:
+        ensemble de (numéro, génération)
+    """
+    positions = {}
+    with open(chemin_pdf, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as donnees:
+        for trouve in OBJET.finditer(donnees):
+            objet = (int(trouve.group(1)), int(trouve.group(2)))
+            if objet in objets:
+                positions[objet] = trouve.end()
+
+        par_defaut = set()
+        for objet, debut in positions.items():
+            fin = FIN_DICTIONNAIRE.search(donnees, debut)
+            if fin is None:
+                continue
+            decode = DECODE.search(donnees[debut:fin.start()])
+            if decode is None:
+                par_defaut.add(objet)
+            elif decode.group(1) is not None:
+                valeurs = [float(v) for v in decode.group(1)[1:-1].split()]
+                if valeurs and valeurs == [0.0, 1.0] * (len(valeurs) // 2):
+                    par_defaut.add(objet)
+    return par_defaut
+
+
+def pages_scannees(chemin_pdf, nb_pages):
+    """
+    Pages qui ne sont qu'une image scannée, avec leur résolution native
+
+    Returns:
+        dict numéro de page → {'dpi', 'rotation'} ({} si pdfimages est
+        absent ou échoue: tout sera rendu)
+    """
+    try:
+        images = lister_images(chemin_pdf)
+        formats = formats_pages(chemin_pdf, nb_pages)
+        # pdfimages -j recopie le JPEG sans appliquer /Decode (page inversée)
+        jpeg = {liste[0]['objet'] for liste in images.values()
+                if len(liste) == 1 and liste[0]['encodage'] == 'jpeg'}
+        decodes = decodes_par_defaut(chemin_pdf, jpeg) if jpeg else set()
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        return {}
+
+    scans = {}
+    for page_num, (largeur, hauteur, rotation) in formats.items():
+        if len(images.get(page_num, [])) != 1:
+            continue
+        image = images[page_num][0]
+        if image['type'] != 'image' or image['couleur'] not in COULEURS or rotation not in (0, 90, 180, 270):
+            continue
+        if image['encodage'] == 'jpeg' and image['objet'] not in decodes:
+            continue
+        if not image['x_ppi'] or abs(image['x_ppi'] - image['y_ppi']) > COUVERTURE_TOLERANCE * image['x_ppi']:
+            continue
+        # L'image couvre toute la page (points = pixels / ppi × 72)
+        if (abs(image['largeur'] / image['x_ppi'] * 72 - largeur) > COUVERTURE_TOLERANCE * largeur
+                or abs(image['hauteur'] / image['y_ppi'] * 72 - hauteur) > COUVERTURE_TOLERANCE * hauteur):
+            continue
+        scans[page_num] = {'dpi': round(image['x_ppi']), 'rotation': rotation}
+    return scans
+
+
+def resolution_commune(scans, nb_pages):
+    """Résolution native commune si toutes les pages sont des scans de même DPI, sinon None"""
+    resolutions = {scan['dpi'] for scan in scans.values()}
+    if len(scans) != nb_pages or len(resolutions) != 1:
+        return None
+    return resolutions.pop()
+
+
+def extraire_page(chemin_pdf, page_num, scan, dpi=None):
+    """
+    Image en niveaux de gris d'une page scannée, décodée sans rendu
+
+    JPEG repris tel quel (pdfimages -j), autres encodages décodés par
+    poppler en PNG (tableau Decode et palette appliqués).
+
+    Args:
+        scan: pages_scannees(...)[page_num]
+        dpi: Résolution voulue (défaut: résolution native, sinon l'image
+            est rééchantillonnée)
+
+    Raises:
+        OSError, subprocess.CalledProcessError, ValueError: extraction
+        impossible (la page doit alors être rendue)
+    """
+    with tempfile.TemporaryDirectory() as dossier:
+        subprocess.run(['pdfimages', '-f', str(page_num), '-l', str(page_num), '-j', '-png',
+                        chemin_pdf, os.path.join(dossier, 'page')], capture_output=True, check=True)
+        fichiers = os.listdir(dossier)
+        if len(fichiers) != 1:
+            raise ValueError(f"page {page_num}: {len(fichiers)} fichier(s) extrait(s)")
+        image = cv2.imread(os.path.join(dossier, fichiers[0]), cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        raise ValueError(f"page {page_num}: image extraite illisible")
+
+    if scan['rotation']:
+        image = cv2.rotate(image, ROTATIONS[scan['rotation']])
+    if dpi and dpi != scan['dpi']:
+        facteur = dpi / scan['dpi']
+        taille = (round(image.shape[1] * facteur), round(image.shape[0] * facteur))
+        image = cv2.resize(image, taille, interpolation=cv2.INTER_AREA if facteur < 1 else cv2.INTER_LINEAR)
+    return image
@@ -7,6 +7,14 @@ import json
 import sys
 
 
+def page_template(template, numero):
+    """Page du template de numéro donné (clé 'page', sinon position à partir de 1)"""
+    for i, page in enumerate(template['pages'], 1):
+        if page.get('page', i) == numero:
+            return page
+    return template['pages'][0]
+
+
 def fusionner_resultats(template_json, resultats_json):
     """
     Fusionne template (titres) et résultats (cochée/vide)
@@ -32,8 +40,8 @@ def fusionner_resultats(template_json, resultats_json):
     for page_result in resultats['pages']:
         page_num = page_result['page']
         
-        # Trouver la page correspondante dans le template (toujours page 1)
-        template_page = template['pages'][0]
+        # Page du template utilisée par detect0 (page 1 pour les anciens résultats)
+        template_page = page_template(template, page_result.get('page_template', 1))
         
         # === CALCULER SCORE GLOBALE (moyenne de score_echelle) ===
         score_echelle = page_result.get('score_echelle', [])
@@ -44,6 +52,7 @@ def fusionner_resultats(template_json, resultats_json):
         
         page_output = {
             'page': page_num,
+            'page_template': template_page.get('page'),
             'globale': globale,  # <-- NOUVELLE CLÉ
             'questions': {}
         }
@@ -24,6 +24,15 @@ else
     echo "⚠️  detect0.py non trouvé - à copier manuellement"
 fi
 
+# Modules importés par detect0.py
+for module in reperage.py detection_cases.py mesures.py cache_pages.py routage_templates.py extraction_scans.py cache_rasters.py; do
+    if [ -f "$module" ]; then
+        cp "$module" "$TARGET_DIR/"
+    else
+        echo "⚠️  $module non trouvé - à copier manuellement"
+    fi
+done
+
 if [ -f "template.json" ]; then
     cp template.json "$TARGET_DIR/"
 else
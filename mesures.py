@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Instrumentation du pipeline de dépouillement
+============================================
+Chaque étape mesurée (contexte etape ou décorateur mesurer) enregistre un
+événement: temps réel, temps CPU du thread, forme et taille du tableau
+traité, page en cours. Quelques microsecondes par étape: laissé actif en
+production.
+
+Les événements s'exportent en JSON lines (un par ligne) ou au format
+Chrome trace-event (chrome://tracing, Perfetto).
+"""
+import collections
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+ACTIVES = True            # False = etape/mesurer ne mesurent plus rien
+EVENEMENTS_MAX = 100000   # Événements gardés en attente de collecte (les plus anciens sont perdus)
+
+_evenements = collections.deque(maxlen=EVENEMENTS_MAX)
+_verrou = threading.Lock()
+_contexte = threading.local()  # page en cours, par thread
+
+
+# ============================================================
+# ENREGISTREMENT
+# ============================================================
+
+@contextlib.contextmanager
+def page(page_num):
+    """Attribue à page_num les étapes mesurées dans ce thread pendant le bloc"""
+    precedente = getattr(_contexte, 'page', None)
+    _contexte.page = page_num
+    try:
+        yield
+    finally:
+        _contexte.page = precedente
+
+
+def page_courante():
+    """Page en cours dans ce thread (None hors d'un bloc page)"""
+    return getattr(_contexte, 'page', None)
+
+
+def taille(tableau):
+    """Forme et octets d'un tableau NumPy ({} pour autre chose)"""
+    if not hasattr(tableau, 'shape') or not hasattr(tableau, 'nbytes'):
+        return {}
+    return {'forme': list(tableau.shape), 'octets': int(tableau.nbytes)}
+
+
+@contextlib.contextmanager
+def etape(nom, tableau=None, page=None, **details):
+    """
+    Mesure le bloc comme une étape
+    
+    Args:
+        nom: Nom de l'étape
+        tableau: Tableau traité (forme et taille enregistrées)
+        page: Numéro de page (défaut: page_courante())
+        details: Champs ajoutés tels quels à l'événement
+    
+    Yields:
+        dict de l'événement, complétable dans le bloc (comptes, tailles...)
+    """
+    if not ACTIVES:
+        yield {}
+        return
+    
+    evenement = {'etape': nom, 'page': page_courante() if page is None else page}
+    evenement.update(taille(tableau))
+    evenement.update(details)
+    debut = time.perf_counter()
+    cpu = time.thread_time()
+    try:
+        yield evenement
+    finally:
+        evenement['debut'] = debut
+        evenement['duree'] = time.perf_counter() - debut
+        evenement['cpu'] = time.thread_time() - cpu
+        evenement['pid'] = os.getpid()
+        evenement['thread'] = threading.get_ident()
+        with _verrou:
+            _evenements.append(evenement)
+
+
+def mesurer(nom):
+    """Décorateur: chaque appel est une étape (tableau = premier argument)"""
+    def decorateur(fonction):
+        @functools.wraps(fonction)
+        def mesuree(*args, **kwargs):
+            with etape(nom, args[0] if args else None):
+                return fonction(*args, **kwargs)
+        return mesuree
+    return decorateur
+
+
+def collecter(page=None):
+    """
+    Retire et renvoie les événements enregistrés dans ce processus
+    
+    Args:
+        page: Ne retirer que ceux de cette page (None = tous)
+    
+    Returns:
+        Liste d'événements triés par début
+    """
+    with _verrou:
+        if page is None:
+            pris = list(_evenements)
+            _evenements.clear()
+        else:
+            pris = [e for e in _evenements if e['page'] == page]
+            restants = [e for e in _evenements if e['page'] != page]
+            _evenements.clear()
+            _evenements.extend(restants)
+    return sorted(pris, key=lambda e: e['debut'])
+
+
+def lire(page=None):
+    """Comme collecter, sans retirer les événements"""
+    with _verrou:
+        pris = [e for e in _evenements if page is None or e['page'] == page]
+    return sorted(pris, key=lambda e: e['debut'])
+
+
+def ajouter(evenements):
+    """Enregistre des événements collectés ailleurs (processus worker)"""
+    with _verrou:
+        _evenements.extend(evenements)
+
+
+# ============================================================
+# EXPORT
+# ============================================================
+
+def exporter_jsonl(chemin, evenements):
+    """Un événement JSON par ligne"""
+    with open(chemin, 'w', encoding='utf-8') as f:
+        for evenement in evenements:
+            f.write(json.dumps(evenement, ensure_ascii=False) + '\n')
+
+
+def exporter_trace_chrome(chemin, evenements):
+    """
+    Fichier trace-event (événements complets 'X', temps en microsecondes)
+    
+    Une ligne par processus/thread; la page et les tailles sont dans args.
+    """
+    origine = min((e['debut'] for e in evenements), default=0)
+    trace = []
+    for e in evenements:
+        trace.append({
+            'name': e['etape'],
+            'cat': f"page {e['page']}" if e['page'] is not None else 'pdf',
+            'ph': 'X',
+            'ts': (e['debut'] - origine) * 1e6,
+            'dur': e['duree'] * 1e6,
+            'pid': e['pid'],
+            'tid': e['thread'],
+            'args': {k: v for k, v in e.items()
+                     if k not in ('etape', 'debut', 'duree', 'pid', 'thread')}
+        })
+    with open(chemin, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f)
+
+
+def resume(evenements):
+    """
+    Totaux par étape
+    
+    Returns:
+        dict nom → {'appels', 'duree', 'cpu'} (secondes), par durée décroissante
+    """
+    totaux = {}
+    for e in evenements:
+        total = totaux.setdefault(e['etape'], {'appels': 0, 'duree': 0.0, 'cpu': 0.0})
+        total['appels'] += 1
+        total['duree'] += e['duree']
+        total['cpu'] += e['cpu']
+    return dict(sorted(totaux.items(), key=lambda item: -item[1]['duree']))
@@ -13,12 +13,25 @@ sur les templates vierges pour le dépouillement automatique.
 import cv2
 import numpy as np
 
+import mesures
+
+# Noms des 6 points de repère renvoyés par detecter_reperes
+POINTS_REPERES = [
+    'echelle_gauche', 'echelle_droite',
+    'rect_haut_gauche', 'rect_haut_droite',
+    'rect_bas_gauche', 'rect_bas_droite'
+]
+
 # ============================================================
 # PARAMÈTRES DE NETTOYAGE DES LIGNES VERTICALES
 # ============================================================
 # Ces paramètres permettent de supprimer les lignes verticales
 # de scan/découpe qui perturbent la détection de la ligne d'échelle
 
+# Lignes fines du nettoyage de base (horizontales et verticales)
+FINES_LARGEUR_MAX = 2      # Épaisseur max (pixels)
+FINES_LONGUEUR_MIN = 100   # Longueur min (pixels)
+
 # Morphologie: pour les lignes fines et continues
 MORPH_LARGEUR_MAX = 2      # Largeur max d'une ligne à supprimer (pixels)
 MORPH_HAUTEUR_MIN = 100    # Hauteur min pour être considérée comme ligne (pixels)
@@ -32,6 +45,67 @@ HOUGH_ANGLE_MIN = 85            # Angle min pour considérer comme verticale (de
 HOUGH_ANGLE_MAX = 95            # Angle max pour considérer comme verticale (degrés)
 HOUGH_EPAISSEUR_SUP = 10        # Pixels à supprimer de chaque côté de la ligne
 
+# Moteur de suppression des lignes verticales longues (nettoyage agressif):
+# - 'hough': Canny + HoughLinesP sur toute la page (référence)
+# - 'projection': profils de colonnes sur la bande où l'échelle est attendue,
+#   beaucoup plus rapide; ne voit que les lignes quasi verticales
+#   (inclinaison ≲ atan(2*HOUGH_PROJECTION_BLOC/HOUGH_MIN_LENGTH), ~2°)
+HOUGH_MOTEUR = 'hough'
+HOUGH_BANDE = (0.1, 0.5)        # Bande où l'échelle est attendue (fractions de la hauteur, None = page)
+HOUGH_PROJECTION_BLOC = 8       # Côté des blocs de regroupement du moteur 'projection' (pixels)
+HOUGH_PROJECTION_COUVERTURE = 0.9  # Part min de blocs occupés sur HOUGH_MIN_LENGTH pour une ligne
+
+# ============================================================
+# PARAMÈTRES DE RECHERCHE DE LA LIGNE D'ÉCHELLE
+# ============================================================
+# Dimensions utilisées par les fonctions de recherche (pixels à 600 DPI)
+ECHELLE_DEMI_BANDE = 5          # Bande ±5 px autour de chaque Y (trouver_ligne_echelle)
+ECHELLE_HAUTEUR_BANDE = 40      # Bande analysée pour les bords de l'échelle
+ECHELLE_LARGEUR_MIN = 20        # Fenêtre glissante pour les bords de l'échelle
+RECT_HAUTEUR_MIN = 200          # Hauteur min du rectangle gris
+RECT_LARGEUR_MIN_GRIS = 200     # Largeur min de zone grise continue (bords du rectangle)
+
+# ============================================================
+# PARAMÈTRES DU MODE PYRAMIDE (détection grossière → fine)
+# ============================================================
+# 'complet': recherche des 6 repères sur l'image pleine résolution
+# 'pyramide': recherche sur une image réduite, puis affinage de chaque
+#             repère dans une petite fenêtre pleine résolution
+REPERES_MODE = 'complet'
+PYRAMIDE_REDUCTION = 4          # Facteur de réduction de l'image grossière (4 ou 8, sans unité:
+                                # pas mis à l'échelle par configurer_dpi)
+PYRAMIDE_MARGE = 300            # Demi-taille des fenêtres d'affinage (pixels pleine résolution)
+
+# ============================================================
+# RÉSOLUTION
+# ============================================================
+# Les dimensions en pixels ci-dessus valent pour DPI_REFERENCE;
+# configurer_dpi les recalcule pour une autre résolution de rendu
+DPI_REFERENCE = 600
+VALEURS_REFERENCE = {
+    nom: globals()[nom] for nom in (
+        'FINES_LARGEUR_MAX', 'FINES_LONGUEUR_MIN',
+        'MORPH_LARGEUR_MAX', 'MORPH_HAUTEUR_MIN',
+        'HOUGH_THRESHOLD', 'HOUGH_MIN_LENGTH', 'HOUGH_MAX_GAP', 'HOUGH_EPAISSEUR_SUP',
+        'HOUGH_PROJECTION_BLOC',
+        'ECHELLE_DEMI_BANDE', 'ECHELLE_HAUTEUR_BANDE', 'ECHELLE_LARGEUR_MIN',
+        'RECT_HAUTEUR_MIN', 'RECT_LARGEUR_MIN_GRIS',
+        'PYRAMIDE_MARGE'
+    )
+}
+
+
+def configurer_dpi(dpi):
+    """
+    Met les dimensions en pixels à l'échelle d'une résolution de rendu
+    
+    Les valeurs sont toujours recalculées depuis VALEURS_REFERENCE (DPI_REFERENCE):
+    les appels successifs ne cumulent pas les arrondis.
+    """
+    facteur = dpi / DPI_REFERENCE
+    for nom, valeur in VALEURS_REFERENCE.items():
+        globals()[nom] = max(1, round(valeur * facteur))
+
 
 def nettoyer_image_base(image):
     """
@@ -45,53 +119,16 @@ def nettoyer_image_base(image):
     2. Détection lignes horizontales fines (h≤2px, w≥100px) → suppression
     3. Détection lignes verticales fines (w≤2px, h≥100px) → suppression
     
+    Pour obtenir aussi le nettoyage agressif, appeler directement
+    nettoyer_images (les étapes communes ne sont calculées qu'une fois).
+    
     Args:
         image: Image BGR ou grayscale
     
     Returns:
         Image nettoyée (BGR, 3 canaux)
     """
-    # Conversion en niveaux de gris si nécessaire
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image.copy()
-    
-    # Binarisation automatique (Otsu trouve le meilleur seuil)
-    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    
-    # Inverser si nécessaire (on veut le texte en blanc)
-    if np.mean(binary) > 127:
-        binary = cv2.bitwise_not(binary)
-    
-    result = binary.copy()
-    
-    # === SUPPRESSION LIGNES HORIZONTALES FINES ===
-    # Créer un élément structurant: ligne horizontale de 100x1
-    kernel_h = cv2.getStructuringElement(cv2.MORPH_RECT, (100, 1))
-    # MORPH_OPEN détecte les structures qui "rentrent" dans le kernel
-    detected_h = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel_h)
-    # Trouver les contours de ces lignes
-    contours_h, _ = cv2.findContours(detected_h, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    
-    # Supprimer les lignes horizontales fines
-    for cnt in contours_h:
-        x, y, w, h = cv2.boundingRect(cnt)
-        if h <= 2 and w >= 100:  # Fine (≤2px) et longue (≥100px)
-            cv2.rectangle(result, (x, y), (x+w, y+h), 0, -1)  # Remplir en noir
-    
-    # === SUPPRESSION LIGNES VERTICALES FINES ===
-    # Créer un élément structurant: ligne verticale de 1x100
-    kernel_v = cv2.getStructuringElement(cv2.MORPH_RECT, (1, 100))
-    detected_v = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel_v)
-    contours_v, _ = cv2.findContours(detected_v, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    
-    # Supprimer les lignes verticales fines
-    for cnt in contours_v:
-        x, y, w, h = cv2.boundingRect(cnt)
-        if w <= 2 and h >= 100:  # Fine (≤2px) et longue (≥100px)
-            cv2.rectangle(result, (x, y), (x+w, y+h), 0, -1)
-    
-    # Inverser et convertir en BGR pour uniformité
-    image_nettoyee = cv2.bitwise_not(result)
-    return cv2.cvtColor(image_nettoyee, cv2.COLOR_GRAY2BGR)
+    return nettoyer_images(image, agressif=False)[0]
 
 
 def nettoyer_lignes_verticales_agressif(image):
@@ -113,89 +150,301 @@ def nettoyer_lignes_verticales_agressif(image):
     Returns:
         Image nettoyée (BGR, 3 canaux)
     """
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image.copy()
-    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    if np.mean(binary) > 127:
-        binary = cv2.bitwise_not(binary)
+    return nettoyer_images(image, base=False)[1]
+
+
+@mesures.mesurer('nettoyage')
+def nettoyer_images(image, base=True, agressif=True, sortie='bgr',
+                    reduction=1, seuil=None, inverser=None, bande_echelle=None):
+    """
+    Pipeline de nettoyage partagé (base + agressif en un seul appel)
+    
+    Les étapes communes aux deux nettoyages ne sont calculées qu'une fois:
+    niveaux de gris, binarisation Otsu, inversion, suppression des lignes
+    horizontales fines et des lignes verticales fines. Seul le passage
+    Hough est propre au nettoyage agressif.
+    
+    Args:
+        image: Image BGR ou grayscale
+        base: Produire l'image du nettoyage base (rectangle gris)
+        agressif: Produire l'image du nettoyage agressif (ligne d'échelle)
+        sortie: Format des images produites
+            - 'bgr': 3 canaux, texte noir sur blanc (format historique)
+            - 'gris': 1 canal, texte noir sur blanc (sans GRAY2BGR)
+            - 'masque': 1 canal, texte blanc sur noir (sans inversion finale)
+        reduction: Facteur de réduction de l'image par rapport à la pleine
+            résolution (les longueurs en pixels sont divisées d'autant)
+        seuil: Seuil de binarisation imposé (None = Otsu sur l'image)
+        inverser: Inversion imposée (None = décidée sur l'image)
+            seuil et inverser permettent de nettoyer une fenêtre de page
+            avec les mêmes décisions que la page entière
+        bande_echelle: tuple (y_min, y_max) où l'échelle est attendue, pour le
+            moteur 'projection' (None = HOUGH_BANDE appliqué à l'image)
+    
+    Returns:
+        tuple (image_base, image_agressive), None pour une image non demandée
+    """
+    if not base and not agressif:
+        return None, None
+    
+    # Conversion en niveaux de gris si nécessaire
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+    
+    if seuil is None:
+        # Binarisation automatique (Otsu trouve le meilleur seuil)
+        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    else:
+        _, binary = cv2.threshold(gray, seuil, 255, cv2.THRESH_BINARY)
+    
+    # Inverser si nécessaire (on veut le texte en blanc)
+    if inverser is None:
+        inverser = np.mean(binary) > 127
+    if inverser:
+        cv2.bitwise_not(binary, dst=binary)
     
     result = binary.copy()
     
-    # === MÉTHODE 1: MORPHOLOGIE (même logique que nettoyer_image_base) ===
-    kernel_h = cv2.getStructuringElement(cv2.MORPH_RECT, (100, 1))
-    detected_h = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel_h)
-    contours_h, _ = cv2.findContours(detected_h, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    for cnt in contours_h:
-        x, y, w, h = cv2.boundingRect(cnt)
-        if h <= 2 and w >= 100:
-            cv2.rectangle(result, (x, y), (x+w, y+h), 0, -1)
+    # Longueurs ramenées à la résolution de l'image. Une fois réduites, les
+    # lignes fines font moins d'un pixel (épaisseur 0 = pas de suppression):
+    # garder 1 pixel effacerait aussi les vraies lignes, dont l'échelle
+    epaisseur_fine = FINES_LARGEUR_MAX // reduction
+    longueur_fine = max(1, round(FINES_LONGUEUR_MIN / reduction))
+    epaisseur_morph = MORPH_LARGEUR_MAX // reduction
+    hauteur_morph = max(1, round(MORPH_HAUTEUR_MIN / reduction))
     
-    kernel_v = cv2.getStructuringElement(cv2.MORPH_RECT, (1, MORPH_HAUTEUR_MIN))
-    detected_v = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel_v)
-    contours_v, _ = cv2.findContours(detected_v, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    for cnt in contours_v:
+    # === SUPPRESSION LIGNES HORIZONTALES FINES (commune) ===
+    supprimer_lignes_fines(binary, result, largeur_max=epaisseur_fine, longueur_min=longueur_fine, verticales=False)
+    
+    # === SUPPRESSION LIGNES VERTICALES FINES ===
+    # Base: w≤FINES_LARGEUR_MAX, h≥FINES_LONGUEUR_MIN. Agressif: w≤MORPH_LARGEUR_MAX,
+    # h≥MORPH_HAUTEUR_MIN. Avec les réglages par défaut les deux passes sont
+    # identiques → partagée
+    meme_morpho = (MORPH_LARGEUR_MAX, MORPH_HAUTEUR_MIN) == (FINES_LARGEUR_MAX, FINES_LONGUEUR_MIN)
+    
+    result_base = None
+    result_agressif = None
+    
+    if meme_morpho:
+        supprimer_lignes_fines(binary, result, largeur_max=epaisseur_fine, longueur_min=longueur_fine, verticales=True)
+        if base and agressif:
+            result_base, result_agressif = result, result.copy()
+        elif base:
+            result_base = result
+        else:
+            result_agressif = result
+    else:
+        if base:
+            result_base = result.copy() if agressif else result
+            supprimer_lignes_fines(binary, result_base, largeur_max=epaisseur_fine, longueur_min=longueur_fine,
+                                   verticales=True)
+        if agressif:
+            result_agressif = result
+            supprimer_lignes_fines(binary, result_agressif, largeur_max=epaisseur_morph,
+                                   longueur_min=hauteur_morph, verticales=True)
+    
+    # === HOUGH (agressif seulement: lignes pointillées que morpho rate) ===
+    if agressif and HOUGH_ENABLE:
+        if HOUGH_MOTEUR == 'projection':
+            supprimer_lignes_projection(binary, result_agressif, reduction, bande_echelle)
+        else:
+            supprimer_lignes_hough(binary, result_agressif, reduction)
+    
+    return (
+        formater_nettoyage(result_base, sortie) if base else None,
+        formater_nettoyage(result_agressif, sortie) if agressif else None
+    )
+
+
+def supprimer_lignes_fines(binary, result, largeur_max, longueur_min, verticales):
+    """
+    Supprime (en place dans result) les lignes fines et longues de binary
+    
+    Args:
+        binary: Image binaire (texte en blanc) où chercher les lignes
+        result: Image binaire modifiée en place (lignes remplies en noir)
+        largeur_max: Épaisseur max d'une ligne à supprimer (pixels)
+        longueur_min: Longueur min d'une ligne (pixels), aussi taille du noyau
+        verticales: True pour les lignes verticales, False pour horizontales
+    """
+    if largeur_max < 1:
+        return
+    
+    # Élément structurant: ligne de longueur_min x 1 dans la bonne direction
+    taille = (1, longueur_min) if verticales else (longueur_min, 1)
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, taille)
+    # MORPH_OPEN détecte les structures qui "rentrent" dans le kernel
+    detected = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel)
+    # Trouver les contours de ces lignes
+    contours, _ = cv2.findContours(detected, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    
+    for cnt in contours:
         x, y, w, h = cv2.boundingRect(cnt)
-        if w <= MORPH_LARGEUR_MAX and h >= MORPH_HAUTEUR_MIN:
-            cv2.rectangle(result, (x, y), (x+w, y+h), 0, -1)
+        epaisseur, longueur = (w, h) if verticales else (h, w)
+        if epaisseur <= largeur_max and longueur >= longueur_min:  # Fine et longue
+            cv2.rectangle(result, (x, y), (x+w, y+h), 0, -1)  # Remplir en noir
+
+
+@mesures.mesurer('hough')
+def supprimer_lignes_hough(binary, result, reduction=1):
+    """
+    Supprime (en place dans result) les longues lignes quasi-verticales
+    détectées par Hough, même pointillées
     
-    # === MÉTHODE 2: HOUGH (détecte lignes pointillées que morpho rate) ===
-    if HOUGH_ENABLE:
-        # Canny: détection de contours (préparation pour Hough)
-        edges = cv2.Canny(binary, 50, 150)
+    Args:
+        binary: Image binaire (texte en blanc)
+        result: Image binaire modifiée en place
+        reduction: Facteur de réduction de l'image (voir nettoyer_images)
+    """
+    longueur_min = max(1, round(HOUGH_MIN_LENGTH / reduction))
+    epaisseur = max(1, round(HOUGH_EPAISSEUR_SUP / reduction))
+
+    # Canny: détection de contours (préparation pour Hough)
+    edges = cv2.Canny(binary, 50, 150)
+    
+    # HoughLinesP: détection de segments de lignes
+    # - rho=1: résolution distance (pixels)
+    # - theta=π/180: résolution angle (1 degré)
+    # - threshold: nb min de votes pour accepter une ligne
+    # - minLineLength: longueur min d'un segment
+    # - maxLineGap: distance max pour relier 2 segments
+    lines = cv2.HoughLinesP(edges, 1, np.pi/180, 
+                           threshold=max(1, round(HOUGH_THRESHOLD / reduction)),
+                           minLineLength=longueur_min,
+                           maxLineGap=max(1, round(HOUGH_MAX_GAP / reduction)))
+    
+    if lines is None:
+        return
+    
+    for line in lines:
+        x1, y1, x2, y2 = line[0]
         
-        # HoughLinesP: détection de segments de lignes
-        # - rho=1: résolution distance (pixels)
-        # - theta=π/180: résolution angle (1 degré)
-        # - threshold: nb min de votes pour accepter une ligne
-        # - minLineLength: longueur min d'un segment
-        # - maxLineGap: distance max pour relier 2 segments
-        lines = cv2.HoughLinesP(edges, 1, np.pi/180, 
-                               threshold=HOUGH_THRESHOLD,
-                               minLineLength=HOUGH_MIN_LENGTH,
-                               maxLineGap=HOUGH_MAX_GAP)
+        # Calculer l'angle de la ligne
+        if x2 != x1:
+            angle = abs(np.arctan2(y2-y1, x2-x1) * 180 / np.pi)
+        else:
+            angle = 90  # Ligne parfaitement verticale
         
-        if lines is not None:
-            for line in lines:
-                x1, y1, x2, y2 = line[0]
-                
-                # Calculer l'angle de la ligne
-                if x2 != x1:
-                    angle = abs(np.arctan2(y2-y1, x2-x1) * 180 / np.pi)
-                else:
-                    angle = 90  # Ligne parfaitement verticale
-                
-                # Vérifier si ligne quasi-verticale (85-95°)
-                if HOUGH_ANGLE_MIN <= angle <= HOUGH_ANGLE_MAX:
-                    longueur = abs(y2 - y1)
-                    
-                    # Vérifier si ligne assez longue
-                    if longueur >= HOUGH_MIN_LENGTH:
-                        # Supprimer une bande autour de la ligne
-                        # (±HOUGH_EPAISSEUR_SUP pixels de part et d'autre)
-                        x_moy = (x1 + x2) // 2
-                        cv2.rectangle(result, 
-                                    (x_moy - HOUGH_EPAISSEUR_SUP, min(y1, y2)),
-                                    (x_moy + HOUGH_EPAISSEUR_SUP, max(y1, y2)),
-                                    0, -1)
-    
-    image_nettoyee = cv2.bitwise_not(result)
-    return cv2.cvtColor(image_nettoyee, cv2.COLOR_GRAY2BGR)
-
-
-def trouver_ligne_echelle(image):
+        # Vérifier si ligne quasi-verticale (85-95°)
+        if HOUGH_ANGLE_MIN <= angle <= HOUGH_ANGLE_MAX:
+            longueur = abs(y2 - y1)
+            
+            # Vérifier si ligne assez longue
+            if longueur >= longueur_min:
+                # Supprimer une bande autour de la ligne
+                # (±HOUGH_EPAISSEUR_SUP pixels de part et d'autre)
+                x_moy = (x1 + x2) // 2
+                cv2.rectangle(result, 
+                            (x_moy - epaisseur, min(y1, y2)),
+                            (x_moy + epaisseur, max(y1, y2)),
+                            0, -1)
+
+
+@mesures.mesurer('projection_lignes')
+def supprimer_lignes_projection(binary, result, reduction=1, bande=None):
+    """
+    Supprime (en place dans result) les longues lignes verticales de la bande
+    où l'échelle est attendue, par profils de colonnes (moteur 'projection')
+    
+    Même rôle que supprimer_lignes_hough, sans Canny ni Hough:
+    1. Regrouper la bande en blocs de HOUGH_PROJECTION_BLOC pixels
+       (un bloc est occupé s'il contient au moins un pixel de contenu),
+       ce qui reconnecte les lignes pointillées
+    2. Une paire de colonnes de blocs est une ligne si, sur une hauteur de
+       HOUGH_MIN_LENGTH, au moins HOUGH_PROJECTION_COUVERTURE des blocs sont
+       occupés (la paire tolère une légère inclinaison)
+    3. Effacer ces blocs, élargis de HOUGH_EPAISSEUR_SUP pixels de chaque côté
+    
+    Args:
+        binary: Image binaire (texte en blanc)
+        result: Image binaire modifiée en place
+        reduction: Facteur de réduction de l'image (voir nettoyer_images)
+        bande: tuple (y_min, y_max) analysé (None = HOUGH_BANDE)
+    """
+    h, w = binary.shape
+    if bande is None:
+        bande = (0, h) if HOUGH_BANDE is None else (int(h * HOUGH_BANDE[0]), int(h * HOUGH_BANDE[1]))
+    y_min, y_max = max(0, bande[0]), min(h, bande[1])
+    
+    bloc = max(1, HOUGH_PROJECTION_BLOC // reduction)
+    n = max(1, round(HOUGH_MIN_LENGTH / reduction) // bloc)   # Hauteur min en blocs
+    epaisseur = max(1, round(HOUGH_EPAISSEUR_SUP / reduction))
+    
+    nb_y = (y_max - y_min) // bloc
+    nb_x = w // bloc
+    if nb_y < n or nb_x < 2:
+        return
+    
+    # === 1. BLOCS OCCUPÉS ===
+    # INTER_AREA sur des blocs entiers = moyenne exacte: > 0 si un pixel est allumé
+    zone = binary[y_min:y_min + nb_y * bloc, :nb_x * bloc]
+    occupe = cv2.resize(zone, (nb_x, nb_y), interpolation=cv2.INTER_AREA) > 0
+    
+    # === 2. COUVERTURE SUR n BLOCS, PAR PAIRE DE COLONNES ===
+    paires = occupe[:, :-1] | occupe[:, 1:]
+    cumul = np.zeros((nb_y + 1, nb_x - 1), dtype=np.int32)
+    np.cumsum(paires, axis=0, out=cumul[1:])
+    couverture = cumul[n:] - cumul[:-n]                 # Fenêtre commençant à chaque bloc
+    lignes = couverture >= HOUGH_PROJECTION_COUVERTURE * n
+    if not lignes.any():
+        return
+    
+    # Un bloc est à effacer si une fenêtre "ligne" le contient (étalement sur n blocs)
+    cumul_lignes = np.zeros((nb_y - n + 2, nb_x - 1), dtype=np.int32)
+    np.cumsum(lignes, axis=0, out=cumul_lignes[1:])
+    debut = np.clip(np.arange(nb_y) - n + 1, 0, None)
+    fin = np.minimum(np.arange(nb_y), nb_y - n) + 1
+    a_effacer_paires = (cumul_lignes[fin] - cumul_lignes[debut]) > 0
+    
+    a_effacer = np.zeros((nb_y, nb_x), dtype=np.uint8)
+    a_effacer[:, :-1] |= a_effacer_paires
+    a_effacer[:, 1:] |= a_effacer_paires
+    
+    # === 3. MASQUE PIXELS (élargi de ±epaisseur) ET EFFACEMENT ===
+    masque = cv2.resize(a_effacer, (nb_x * bloc, nb_y * bloc), interpolation=cv2.INTER_NEAREST)
+    masque = cv2.dilate(masque, np.ones((1, 2 * epaisseur + 1), dtype=np.uint8))
+    result[y_min:y_min + nb_y * bloc, :nb_x * bloc][masque > 0] = 0
+
+
+def formater_nettoyage(result, sortie):
+    """
+    Convertit le masque nettoyé (texte en blanc) au format demandé
+    
+    Args:
+        result: Masque binaire nettoyé (modifié en place si sortie != 'masque')
+        sortie: 'bgr', 'gris' ou 'masque' (voir nettoyer_images)
+    
+    Returns:
+        Image au format demandé
+    """
+    if sortie == 'masque':
+        return result
+    
+    # Inverser en place (texte noir sur blanc) sans nouvelle copie
+    cv2.bitwise_not(result, dst=result)
+    if sortie == 'gris':
+        return result
+    return cv2.cvtColor(result, cv2.COLOR_GRAY2BGR)
+
+
+@mesures.mesurer('ligne_echelle')
+def trouver_ligne_echelle(image, demi_bande=None):
     """
     Trouve la ligne d'échelle de notation (la plus longue ligne horizontale)
     
     L'échelle de notation (0 nul ; 5 excellent) est matérialisée par une ligne
     horizontale continue qui est la plus longue de toute la page.
     
-    Méthode:
-    - Balayer ligne par ligne (chaque Y)
-    - Pour chaque ligne: projeter verticalement (somme par colonne)
-    - Trouver le segment horizontal continu le plus long
-    - Retourner la ligne avec le segment le plus long de toute la page
+    Méthode (opérations vectorisées, même résultat que l'ancien balayage
+    ligne par ligne, voir tests/test_reperage.py):
+    - La bande de ±5 pixels autour de chaque Y devient une dilatation
+      verticale (OU glissant sur 10 lignes)
+    - Les segments continus de toutes les lignes sont extraits d'un coup
+    - Le plus long segment (premier en ordre de lecture) est retenu
     
     Args:
-        image: Image nettoyée (BGR, sortie de nettoyer_lignes_verticales_agressif)
+        image: Image nettoyée (niveaux de gris ou BGR, sortie du nettoyage agressif)
+        demi_bande: Demi-hauteur de la bande autour de chaque Y
+            (None = ECHELLE_DEMI_BANDE)
     
     Returns:
         tuple (x1, y, x2, y) ou None si pas trouvé
@@ -203,57 +452,52 @@ def trouver_ligne_echelle(image):
         - y: hauteur de la ligne (pixel Y)
         - x2: fin de la ligne (pixel X)
     """
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image.copy()
-    # Binariser: texte en blanc (255), fond en noir (0)
-    _, binary = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY_INV)
-    h, w = binary.shape
+    d = demi_bande or ECHELLE_DEMI_BANDE
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+    # Binarisation: seuil 127, inversé (contenu = 1)
+    contenu = (gray <= 127).view(np.uint8)
     
-    best = None      # Meilleure ligne trouvée
-    max_len = 0      # Longueur de la meilleure ligne
+    # Bande [y-d, y+d[: noyau de 2d lignes, ancre sur la (d+1)e
+    noyau = np.ones((2 * d, 1), dtype=np.uint8)
+    proj = cv2.dilate(contenu, noyau, anchor=(0, d))
     
-    # Balayer toutes les lignes de l'image
-    for y in range(h):
-        # Extraire bande de ±5 pixels autour de y
-        # (pour être plus robuste aux petites variations)
-        bande = binary[max(0, y-5):min(h, y+5), :]
-        
-        # Projection verticale: True si au moins 1 pixel blanc dans la colonne
-        proj = np.sum(bande, axis=0) > 0
-        
-        # Chercher le segment horizontal continu le plus long sur cette ligne
-        debut = None
-        max_seg = 0      # Longueur max du segment sur cette ligne
-        x1_max = 0       # Position X du début du segment max
-        
-        for x in range(w):
-            if proj[x]:  # Pixel blanc (contenu)
-                if debut is None:
-                    debut = x  # Début d'un nouveau segment
-            else:  # Pixel noir (pas de contenu)
-                if debut is not None:
-                    # Fin d'un segment: calculer sa longueur
-                    longueur = x - debut
-                    if longueur > max_seg:
-                        max_seg = longueur
-                        x1_max = debut
-                debut = None
-        
-        # Si le segment va jusqu'au bord droit
-        if debut is not None:
-            longueur = w - debut
-            if longueur > max_seg:
-                x1_max = debut
-                max_seg = longueur
-        
-        # Comparer avec la meilleure ligne trouvée jusqu'ici
-        if max_seg > max_len:
-            max_len = max_seg
-            best = (x1_max, y, x1_max + max_seg, y)
+    lignes, debuts, fins = segments_continus(proj)
+    if len(debuts) == 0:
+        return None
     
-    return best
+    # argmax renvoie le premier maximum: la ligne la plus haute l'emporte
+    longueurs = fins - debuts
+    i = int(np.argmax(longueurs))
+    x1 = int(debuts[i])
+    y = int(lignes[i])
+    return (x1, y, x1 + int(longueurs[i]), y)
 
 
-def trouver_bords_ligne_echelle(image, y_ligne, hauteur_bande=40):
+def segments_continus(masque):
+    """
+    Localise tous les segments horizontaux continus d'un masque 2D
+    
+    Args:
+        masque: Tableau 2D (booléen ou 0/1), True = contenu
+    
+    Returns:
+        tuple (lignes, debuts, fins) de tableaux 1D, un élément par segment,
+        dans l'ordre de lecture (haut→bas, gauche→droite).
+        fins est exclusif: longueur = fins - debuts
+    """
+    h, w = masque.shape
+    # Encadrer chaque ligne de 0 pour que tout segment ait un début et une fin
+    bords = np.zeros((h, w + 2), dtype=np.int8)
+    bords[:, 1:-1] = masque
+    transitions = np.diff(bords, axis=1)
+    
+    # +1 = début de segment, -1 = fin de segment (même ordre de parcours)
+    lignes, debuts = np.nonzero(transitions == 1)
+    _, fins = np.nonzero(transitions == -1)
+    return lignes, debuts, fins
+
+
+def trouver_bords_ligne_echelle(image, y_ligne, hauteur_bande=None, largeur_min=None):
     """
     Trouve les bords gauche et droite de la ligne d'échelle
     
@@ -268,12 +512,17 @@ def trouver_bords_ligne_echelle(image, y_ligne, hauteur_bande=40):
     Args:
         image: Image nettoyée
         y_ligne: Position Y de la ligne d'échelle
-        hauteur_bande: Hauteur de la bande à analyser (pixels)
+        hauteur_bande: Hauteur de la bande à analyser (pixels,
+            None = ECHELLE_HAUTEUR_BANDE)
+        largeur_min: Taille de la fenêtre glissante (pixels,
+            None = ECHELLE_LARGEUR_MIN)
     
     Returns:
         tuple (x_gauche, x_droite) ou None si échec
     """
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image.copy()
+    hauteur_bande = hauteur_bande or ECHELLE_HAUTEUR_BANDE
+    largeur_min = largeur_min or ECHELLE_LARGEUR_MIN      # Taille fenêtre glissante (robustesse)
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
     
     # Extraire bande horizontale autour de y_ligne
     y_min = max(0, y_ligne - hauteur_bande//2)
@@ -285,55 +534,57 @@ def trouver_bords_ligne_echelle(image, y_ligne, hauteur_bande=40):
     
     # Projection verticale: somme des pixels blancs par colonne
     projection = np.sum(binary, axis=0)
-    
-    # Normaliser entre 0 et 1
-    if projection.max() > 0:
-        projection = projection / projection.max()
+    n = len(projection)
     
     # Paramètres de détection
     seuil = 0.15          # Seuil de densité pour considérer qu'il y a du contenu
-    largeur_min = 20      # Taille fenêtre glissante (robustesse)
+    
+    # Densité moyenne (normalisée entre 0 et 1) de chaque fenêtre
+    # [x, x+largeur_min[, par différence de sommes cumulées
+    maximum = projection.max() if n else 0
+    if n <= largeur_min or maximum == 0:
+        return None
+    cumul = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(projection, out=cumul[1:])
+    densites = (cumul[largeur_min:] - cumul[:-largeur_min]) / maximum / largeur_min
+    contenu = densites > seuil
+    
+    # Fenêtres à la limite (densité égale au seuil aux arrondis près): le
+    # balayage historique décidait sur la moyenne flottante des colonnes
+    # normalisées, qui peut arrondir au-dessus du seuil. Même calcul ici
+    limites = np.flatnonzero(np.abs(densites - seuil) < 1e-9)
+    if len(limites):
+        normalisee = projection / maximum
+        for x in limites:
+            contenu[x] = np.mean(normalisee[x:x + largeur_min]) > seuil
     
     # === CHERCHER BORD GAUCHE ===
-    # On teste des fenêtres de largeur_min pixels depuis la gauche
-    x_gauche = None
-    for x in range(len(projection) - largeur_min):
-        # Calculer densité moyenne sur la fenêtre
-        if np.mean(projection[x:x+largeur_min]) > seuil:
-            x_gauche = x
-            break
+    # Première fenêtre [x, x+largeur_min[ dense, x < n - largeur_min
+    gauches = np.flatnonzero(contenu[:n - largeur_min])
+    x_gauche = int(gauches[0]) if len(gauches) else None
     
     # === CHERCHER BORD DROIT ===
-    # On teste des fenêtres de largeur_min pixels depuis la droite
-    x_droite = None
-    for x in range(len(projection)-1, largeur_min, -1):
-        # Calculer densité moyenne sur la fenêtre
-        if np.mean(projection[x-largeur_min:x]) > seuil:
-            x_droite = x
-            break
+    # Dernière fenêtre [x-largeur_min, x[ dense, x > largeur_min
+    droites = np.flatnonzero(contenu[1:n - largeur_min])
+    x_droite = int(droites[-1]) + 1 + largeur_min if len(droites) else None
     
     return (x_gauche, x_droite) if x_gauche and x_droite else None
 
 
-def trouver_rectangle_gris(image):
+def profil_rectangle_gris(image):
     """
-    Trouve le rectangle gris en bas de page (zone de commentaires)
-    
-    Le rectangle gris est un fond grisé qui contient les questions à cocher.
-    On le détecte par analyse d'intensité lumineuse dans le bas de la page.
-    
-    Méthode:
-    - Analyser seulement moitié basse + tiers droit (zone typique du rectangle)
-    - Calculer intensité moyenne par ligne
-    - Trouver la plus longue séquence de lignes "sombres"
+    Calcule le profil d'intensité par ligne utilisé pour le rectangle gris
     
     Args:
-        image: Image nettoyée (nettoyage BASE, pas agressif!)
+        image: Image nettoyée (nettoyage BASE)
     
     Returns:
-        tuple (x, y_haut, largeur, hauteur) ou None si pas trouvé
+        tuple (intensites, seuil, y_zone)
+        - intensites: intensité moyenne par ligne de la zone analysée
+        - seuil: intensité sous laquelle une ligne est "sombre"
+        - y_zone: Y (dans l'image) de la première ligne de la zone
     """
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image.copy()
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
     h, w = gray.shape
     
     # Analyser seulement moitié basse + tiers droit
@@ -342,81 +593,97 @@ def trouver_rectangle_gris(image):
     tiers_droit_x = int(w * 2/3)
     
     zone = gray[moitie_basse_y:, tiers_droit_x:]
+    intensites = intensites_lignes(zone)
+    
+    # Calculer seuil: entre médiane et blanc
+    # (le gris est plus sombre que le fond blanc mais plus clair que le texte)
+    mediane = np.median(intensites)
+    seuil = (mediane + 255) / 2
     
+    return intensites, seuil, moitie_basse_y
+
+
+def intensites_lignes(zone):
+    """
+    Intensité moyenne par ligne d'une zone, après normalisation 0-255
+    
+    Args:
+        zone: Extrait en niveaux de gris
+    
+    Returns:
+        Tableau 1D, une valeur par ligne de la zone
+    """
     # Normaliser les intensités entre 0 et 255
     zone_norm = cv2.normalize(zone, None, 0, 255, cv2.NORM_MINMAX)
     
     # Calculer intensité moyenne par ligne
-    intensites = np.mean(zone_norm, axis=1)
+    return np.mean(zone_norm, axis=1)
+
+
+@mesures.mesurer('rectangle_gris')
+def trouver_rectangle_gris(image, hauteur_min=None):
+    """
+    Trouve le rectangle gris en bas de page (zone de commentaires)
     
-    # Calculer seuil: entre médiane et blanc
-    # (le gris est plus sombre que le fond blanc mais plus clair que le texte)
-    mediane = np.median(intensites)
-    seuil = (mediane + 255) / 2
+    Le rectangle gris est un fond grisé qui contient les questions à cocher.
+    On le détecte par analyse d'intensité lumineuse dans le bas de la page.
+    
+    Méthode:
+    - Analyser seulement moitié basse + tiers droit (zone typique du rectangle)
+    - Calculer intensité moyenne par ligne
+    - Trouver la plus longue séquence de lignes "sombres"
+    
+    Args:
+        image: Image nettoyée (nettoyage BASE, pas agressif!)
+        hauteur_min: Hauteur min du rectangle (pixels, None = RECT_HAUTEUR_MIN)
+    
+    Returns:
+        tuple (x, y_haut, largeur, hauteur) ou None si pas trouvé
+    """
+    hauteur_min = hauteur_min or RECT_HAUTEUR_MIN
+    w = image.shape[1]
+    intensites, seuil, moitie_basse_y = profil_rectangle_gris(image)
     
     # === CHERCHER LA PLUS LONGUE ZONE SOMBRE ===
-    dans_zone = False
-    y_debut = None
-    longueur_max = 0
-    meilleur_debut = None
-    meilleur_fin = None
-    
-    for y, intensite in enumerate(intensites):
-        if intensite < seuil:  # Ligne sombre (dans le rectangle)
-            if not dans_zone:
-                y_debut = y
-                dans_zone = True
-        else:  # Ligne claire (hors rectangle)
-            if dans_zone:
-                longueur = y - y_debut
-                if longueur > longueur_max:
-                    longueur_max = longueur
-                    meilleur_debut = y_debut
-                    meilleur_fin = y
-                dans_zone = False
-    
-    # Si la zone va jusqu'en bas de page
-    if dans_zone:
-        longueur = len(intensites) - y_debut
-        if longueur > longueur_max:
-            meilleur_debut = y_debut
-            meilleur_fin = len(intensites)
+    # Toutes les zones de lignes sombres (dans le rectangle) d'un coup
+    _, debuts, fins = segments_continus((intensites < seuil)[np.newaxis, :])
+    longueurs = fins - debuts
+    
+    # Comme dans l'ancien balayage, seule une zone refermée par une ligne
+    # claire compte pour la hauteur minimale; une zone qui va jusqu'en bas
+    # de page n'est retenue que si elle est strictement plus longue
+    fermees = fins < len(intensites)
+    longueur_max = longueurs[fermees].max() if fermees.any() else 0
     
     # Vérifier qu'on a trouvé quelque chose d'assez grand
-    if meilleur_debut is None or longueur_max < 200:
+    if longueur_max < hauteur_min:
         return None
     
+    # Première zone la plus longue
+    i = int(np.argmax(longueurs))
+    
     # Reconvertir les coordonnées relatives en coordonnées absolues
-    y_haut = meilleur_debut + moitie_basse_y
-    h_rect = meilleur_fin - meilleur_debut
+    y_haut = int(debuts[i]) + moitie_basse_y
+    h_rect = int(longueurs[i])
     
     # Retourner rectangle sur toute la largeur
     return (0, y_haut, w, h_rect)
 
 
-def trouver_bords_verticaux_rectangle(image, rect):
+def profil_bords_rectangle(image, rect):
     """
-    Trouve les bords gauche et droite du rectangle gris
-    
-    Une fois le rectangle localisé verticalement (Y haut/bas), on cherche
-    précisément ses bords latéraux (X gauche/droite).
-    
-    Méthode:
-    - Analyser une bande horizontale au milieu du rectangle
-    - Projeter horizontalement (intensité moyenne par colonne)
-    - Chercher les transitions blanc→gris (bord gauche) et gris→blanc (bord droit)
+    Calcule la projection par colonne utilisée pour les bords du rectangle
     
     Args:
         image: Image nettoyée
         rect: tuple (x, y_haut, w, h_rect) du rectangle
     
     Returns:
-        tuple (x_gauche, x_droite) ou None si échec
+        tuple (projection, seuil)
+        - projection: intensité moyenne par colonne de la bande analysée
+        - seuil: intensité sous laquelle une colonne est "grise"
     """
-    if rect is None:
-        return None
-    
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image.copy()
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
     x, y_haut, w, h_rect = rect
     
     # Analyser une bande au milieu du rectangle (1/4 de sa hauteur)
@@ -434,33 +701,133 @@ def trouver_bords_verticaux_rectangle(image, rect):
     mediane = np.median(projection)
     seuil = (mediane + 255) / 2
     
-    # Largeur minimum de zone grise continue pour être sûr
-    min_gris = 200
+    return projection, seuil
+
+
+def comptes_gris(projection, seuil, min_gris):
+    """
+    Colonnes grises et nombre de colonnes grises par fenêtre glissante
+    
+    Returns:
+        tuple (sombres, comptes)
+        - sombres: booléen par colonne (projection < seuil)
+        - comptes: comptes[x] = nb de colonnes grises dans [x, x+min_gris[
+    """
+    sombres = projection < seuil
+    cumul = np.zeros(len(sombres) + 1, dtype=np.int64)
+    np.cumsum(sombres, out=cumul[1:])
+    return sombres, cumul[min_gris:] - cumul[:-min_gris]
+
+
+def bord_gauche_gris(projection, seuil, min_gris):
+    """
+    Premier X (depuis la gauche) où commence une zone grise continue
+    
+    Args:
+        projection: Intensité moyenne par colonne
+        seuil: Intensité sous laquelle une colonne est grise
+        min_gris: Largeur de la fenêtre de vérification (pixels)
+    
+    Returns:
+        X du bord gauche, ou None
+    """
+    n = len(projection)
+    if n <= min_gris:
+        return None
+    sombres, comptes = comptes_gris(projection, seuil, min_gris)
+    
+    # x < n - min_gris: colonne sombre (début zone) et fenêtre [x, x+min_gris[
+    # grise à plus de 80% (zone continue de gris)
+    candidats = np.flatnonzero(sombres[:n - min_gris] & (comptes[:n - min_gris] / min_gris > 0.8))
+    return int(candidats[0]) if len(candidats) else None
+
+
+def bord_droit_gris(projection, seuil, min_gris):
+    """
+    Premier X (depuis la droite) où finit une zone grise continue
+    
+    Args:
+        projection: Intensité moyenne par colonne
+        seuil: Intensité sous laquelle une colonne est grise
+        min_gris: Largeur de la fenêtre de vérification (pixels)
+    
+    Returns:
+        X du bord droit, ou None
+    """
+    n = len(projection)
+    if n <= min_gris + 1:
+        return None
+    sombres, comptes = comptes_gris(projection, seuil, min_gris)
+    
+    # x > min_gris: colonne sombre (encore dans la zone) et fenêtre
+    # [x-min_gris, x[ grise à plus de 80%
+    candidats = np.flatnonzero(sombres[min_gris + 1:] & (comptes[1:n - min_gris] / min_gris > 0.8))
+    return int(candidats[-1]) + min_gris + 1 if len(candidats) else None
+
+
+def trouver_bords_verticaux_rectangle(image, rect, min_gris=None):
+    """
+    Trouve les bords gauche et droite du rectangle gris
+    
+    Une fois le rectangle localisé verticalement (Y haut/bas), on cherche
+    précisément ses bords latéraux (X gauche/droite).
+    
+    Méthode:
+    - Analyser une bande horizontale au milieu du rectangle
+    - Projeter horizontalement (intensité moyenne par colonne)
+    - Chercher les transitions blanc→gris (bord gauche) et gris→blanc (bord droit)
+    
+    Args:
+        image: Image nettoyée
+        rect: tuple (x, y_haut, w, h_rect) du rectangle
+        min_gris: Largeur minimum de zone grise continue pour être sûr
+            (pixels, None = RECT_LARGEUR_MIN_GRIS)
+    
+    Returns:
+        tuple (x_gauche, x_droite) ou None si échec
+    """
+    if rect is None:
+        return None
+    
+    min_gris = min_gris or RECT_LARGEUR_MIN_GRIS
+    projection, seuil = profil_bords_rectangle(image, rect)
     
     # === CHERCHER BORD GAUCHE ===
-    # On teste des fenêtres de min_gris pixels depuis la gauche
-    x_gauche = None
-    for x in range(len(projection) - min_gris):
-        if projection[x] < seuil:  # Début zone sombre
-            # Vérifier que c'est bien une zone continue de gris
-            if np.sum(projection[x:x+min_gris] < seuil) / min_gris > 0.8:
-                x_gauche = x
-                break
+    x_gauche = bord_gauche_gris(projection, seuil, min_gris)
     
     # === CHERCHER BORD DROIT ===
-    # On teste des fenêtres de min_gris pixels depuis la droite
-    x_droite = None
-    for x in range(len(projection)-1, min_gris, -1):
-        if projection[x] < seuil:  # Encore dans zone sombre
-            # Vérifier que c'est bien une zone continue de gris
-            if np.sum(projection[x-min_gris:x] < seuil) / min_gris > 0.8:
-                x_droite = x
-                break
+    x_droite = bord_droit_gris(projection, seuil, min_gris)
     
     return (x_gauche, x_droite) if x_gauche and x_droite else None
 
 
-def detecter_reperes(image):
+def construire_reperes(x_g_echelle, x_d_echelle, y_echelle,
+                       x_g_rect, x_d_rect, y_rect_haut, y_rect_bas):
+    """
+    Assemble le dict des 6 points de repère (format de detecter_reperes)
+    """
+    return {
+        # LES 6 POINTS DE REPÈRE (pour transformation)
+        'echelle_gauche': (x_g_echelle, y_echelle),      # Point haut gauche
+        'echelle_droite': (x_d_echelle, y_echelle),      # Point haut droit
+        'rect_haut_gauche': (x_g_rect, y_rect_haut),     # Point milieu gauche
+        'rect_haut_droite': (x_d_rect, y_rect_haut),     # Point milieu droit
+        'rect_bas_gauche': (x_g_rect, y_rect_bas),       # Point bas gauche
+        'rect_bas_droite': (x_d_rect, y_rect_bas),       # Point bas droit
+        
+        # INFOS COMPLÉMENTAIRES (pour debug/classification)
+        'ligne_echelle_y': y_echelle,
+        'echelle_x_gauche': x_g_echelle,
+        'echelle_x_droite': x_d_echelle,
+        'rect_y_haut': y_rect_haut,
+        'rect_y_bas': y_rect_bas,
+        'rect_x_gauche': x_g_rect,
+        'rect_x_droite': x_d_rect
+    }
+
+
+@mesures.mesurer('reperes')
+def detecter_reperes(image, mode=None):
     """
     FONCTION PRINCIPALE: Détecte les 6 points de repère sur un questionnaire
     
@@ -474,7 +841,9 @@ def detecter_reperes(image):
     - Utilise nettoyage BASE pour rectangle (garde les bords)
     
     Args:
-        image: Image du questionnaire (BGR, 600 DPI)
+        image: Image du questionnaire (niveaux de gris ou BGR)
+        mode: 'complet' ou 'pyramide' (None = REPERES_MODE),
+            voir detecter_reperes_pyramide
     
     Returns:
         dict avec les 6 points et infos complémentaires, ou None si échec
@@ -488,13 +857,16 @@ def detecter_reperes(image):
             ... infos debug ...
         }
     """
-    # === NETTOYAGE ===
-    # Nettoyage BASE (pour rectangle gris)
-    clean = nettoyer_image_base(image)
+    if (mode or REPERES_MODE) == 'pyramide':
+        return detecter_reperes_pyramide(image)
     
-    # Nettoyage AGRESSIF (pour ligne échelle)
-    # Supprime toutes les lignes verticales y compris sur les bords
-    clean_echelle = nettoyer_lignes_verticales_agressif(image)
+    # === NETTOYAGE ===
+    # Un seul passage pour les 2 nettoyages (étapes communes partagées),
+    # en niveaux de gris: les fonctions de recherche n'ont pas besoin du BGR
+    # - BASE (pour rectangle gris)
+    # - AGRESSIF (pour ligne échelle): supprime toutes les lignes verticales
+    #   y compris sur les bords
+    clean, clean_echelle = nettoyer_images(image, sortie='gris')
     
     # === LIGNE D'ÉCHELLE ===
     # Trouver la ligne d'échelle (avec nettoyage agressif)
@@ -527,21 +899,201 @@ def detecter_reperes(image):
     y_rect_bas = rect_gris[1] + rect_gris[3]  # Y du bas du rectangle
     
     # === RETOURNER LES 6 POINTS ===
-    return {
-        # LES 6 POINTS DE REPÈRE (pour transformation)
-        'echelle_gauche': (x_g_echelle, y_echelle),      # Point haut gauche
-        'echelle_droite': (x_d_echelle, y_echelle),      # Point haut droit
-        'rect_haut_gauche': (x_g_rect, y_rect_haut),     # Point milieu gauche
-        'rect_haut_droite': (x_d_rect, y_rect_haut),     # Point milieu droit
-        'rect_bas_gauche': (x_g_rect, y_rect_bas),       # Point bas gauche
-        'rect_bas_droite': (x_d_rect, y_rect_bas),       # Point bas droit
-        
-        # INFOS COMPLÉMENTAIRES (pour debug/classification)
-        'ligne_echelle_y': y_echelle,
-        'echelle_x_gauche': x_g_echelle,
-        'echelle_x_droite': x_d_echelle,
-        'rect_y_haut': y_rect_haut,
-        'rect_y_bas': y_rect_bas,
-        'rect_x_gauche': x_g_rect,
-        'rect_x_droite': x_d_rect
-    }
\ No newline at end of file
+    return construire_reperes(x_g_echelle, x_d_echelle, y_echelle,
+                              x_g_rect, x_d_rect, y_rect_haut, y_rect_bas)
+
+
+# ============================================================
+# MODE PYRAMIDE (GROSSIER → FIN)
+# ============================================================
+
+def seuil_otsu_global(gray, pas):
+    """
+    Seuil d'Otsu et décision d'inversion de la page, estimés sur un
+    sous-échantillon (1 pixel sur pas dans chaque direction)
+    
+    Sert à nettoyer des fenêtres de la page avec les mêmes décisions
+    que le nettoyage de la page entière.
+    
+    Returns:
+        tuple (seuil, inverser)
+    """
+    echantillon = np.ascontiguousarray(gray[::pas, ::pas])
+    seuil, binary = cv2.threshold(echantillon, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return seuil, bool(np.mean(binary) > 127)
+
+
+def localiser_echelle_bande(gray, y_min, y_max, seuil, inverser):
+    """
+    Cherche la ligne d'échelle dans une bande horizontale pleine résolution
+    
+    La bande est nettoyée (agressif) avec le seuil et l'inversion de la page
+    entière, puis les fonctions habituelles sont appliquées.
+    
+    Args:
+        gray: Page en niveaux de gris (pleine résolution)
+        y_min, y_max: Limites de la bande (pixels)
+        seuil, inverser: Décisions de binarisation de la page (seuil_otsu_global)
+    
+    Returns:
+        tuple (x_gauche, y, x_droite) en coordonnées page, ou None
+    """
+    y_min = max(0, y_min)
+    y_max = min(gray.shape[0], y_max)
+    _, clean = nettoyer_images(gray[y_min:y_max], base=False, sortie='gris',
+                               seuil=seuil, inverser=inverser, bande_echelle=(0, y_max - y_min))
+    
+    ligne = trouver_ligne_echelle(clean)
+    if not ligne:
+        return None
+    
+    bords = trouver_bords_ligne_echelle(clean, ligne[1])
+    if not bords:
+        return None
+    
+    return bords[0], ligne[1] + y_min, bords[1]
+
+
+def affiner_bord_rectangle(gray, y_estime, x_zone, seuil_gris, seuil, inverser, haut):
+    """
+    Affine en pleine résolution le bord haut (ou bas) du rectangle gris
+    
+    Les lignes sombres sont cherchées dans une fenêtre de ±PYRAMIDE_MARGE
+    autour de l'estimation; on garde la zone sombre dont le début (bord haut)
+    ou la fin (bord bas) est le plus proche de l'estimation.
+    
+    Args:
+        gray: Page en niveaux de gris (pleine résolution)
+        y_estime: Estimation du bord (pixels pleine résolution)
+        x_zone: X de début de la zone analysée (tiers droit de la page)
+        seuil_gris: Seuil d'intensité des lignes sombres (passe grossière)
+        seuil, inverser: Décisions de binarisation de la page
+        haut: True pour le bord haut, False pour le bord bas
+    
+    Returns:
+        Y du bord (pixels), ou None
+    """
+    y_min = max(0, y_estime - PYRAMIDE_MARGE)
+    y_max = min(gray.shape[0], y_estime + PYRAMIDE_MARGE)
+    clean, _ = nettoyer_images(gray[y_min:y_max, x_zone:], agressif=False, sortie='gris',
+                               seuil=seuil, inverser=inverser)
+    
+    sombres = intensites_lignes(clean) < seuil_gris
+    _, debuts, fins = segments_continus(sombres[np.newaxis, :])
+    if len(debuts) == 0:
+        return None
+    
+    candidats = debuts if haut else fins
+    i = int(np.argmin(np.abs(candidats + y_min - y_estime)))
+    return int(candidats[i]) + y_min
+
+
+def affiner_bords_rectangle(gray, y_haut, y_bas, seuil, inverser):
+    """
+    Cherche en pleine résolution les bords gauche/droite du rectangle gris
+    
+    La projection par colonne dépend de la texture du gris au pixel près
+    (la réduction la lisse): on nettoie donc seulement la bande analysée par
+    trouver_bords_verticaux_rectangle (1/4 de la hauteur du rectangle), plus
+    une marge pour que la morphologie voie les lignes en entier.
+    
+    Returns:
+        tuple (x_gauche, x_droite) ou None si échec
+    """
+    h_rect = y_bas - y_haut
+    y_mid = y_haut + h_rect // 2
+    band_h = h_rect // 4
+    marge = max(FINES_LONGUEUR_MIN, MORPH_HAUTEUR_MIN)
+    
+    y_min = max(0, y_mid - band_h//2 - marge)
+    y_max = min(gray.shape[0], y_mid + band_h//2 + marge)
+    clean, _ = nettoyer_images(gray[y_min:y_max], agressif=False, sortie='gris',
+                               seuil=seuil, inverser=inverser)
+    
+    return trouver_bords_verticaux_rectangle(clean, (0, y_haut - y_min, gray.shape[1], h_rect))
+
+
+def detecter_reperes_pyramide(image, reduction=None):
+    """
+    Détecte les 6 points de repère en deux passes (grossière puis fine)
+    
+    1. Passe grossière: recherche habituelle sur la page binarisée puis
+       réduite (1/PYRAMIDE_REDUCTION), longueurs en pixels divisées d'autant
+    2. Passe fine: la ligne d'échelle et les bords haut/bas du rectangle sont
+       recalculés en pleine résolution dans une fenêtre de ±PYRAMIDE_MARGE
+       pixels autour de l'estimation; les bords gauche/droite du rectangle
+       sur la seule bande où trouver_bords_verticaux_rectangle les cherche
+    
+    Le seuil de binarisation et l'inversion sont décidés une fois pour la
+    page (sur un sous-échantillon) puis imposés à chaque fenêtre.
+    L'écart avec le mode complet et les repères dessinés est mesuré par
+    python -m benchmark mesurer.
+    
+    Args:
+        image: Image du questionnaire (niveaux de gris ou BGR)
+        reduction: Facteur de réduction (None = PYRAMIDE_REDUCTION)
+    
+    Returns:
+        dict au même format que detecter_reperes, ou None si échec
+    """
+    r = reduction or PYRAMIDE_REDUCTION
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+    h, w = gray.shape
+    
+    # Binarisation décidée une fois pour la page, imposée à chaque fenêtre
+    seuil, inverser = seuil_otsu_global(gray, r)
+    
+    # === PASSE GROSSIÈRE ===
+    # Lignes verticales fines supprimées à pleine résolution, comme par le
+    # nettoyage de base: réduite, une ligne de scan devient une colonne de
+    # blocs à moitié sombres sur toute la page, qui assombrit chaque ligne du
+    # profil du rectangle gris
+    _, binaire = cv2.threshold(gray, seuil, 255, cv2.THRESH_BINARY_INV if inverser else cv2.THRESH_BINARY)
+    supprimer_lignes_fines(binaire, binaire, largeur_max=FINES_LARGEUR_MAX, longueur_min=FINES_LONGUEUR_MIN,
+                           verticales=True)
+    
+    # Image binaire (texte noir sur blanc) réduite par moyenne de blocs:
+    # chaque pixel donne la densité de blanc du bloc, ce qui conserve
+    # exactement les moyennes par ligne/colonne utilisées pour le rectangle
+    fond_blanc = cv2.bitwise_not(binaire, dst=binaire)
+    densite = cv2.resize(fond_blanc, (w // r, h // r), interpolation=cv2.INTER_AREA)
+    
+    # Ligne d'échelle: blocs au moins à moitié noirs, puis nettoyage agressif réduit
+    _, petit = cv2.threshold(densite, 127, 255, cv2.THRESH_BINARY)
+    _, clean_echelle_p = nettoyer_images(petit, base=False, sortie='gris', reduction=r)
+    ligne_p = trouver_ligne_echelle(clean_echelle_p, demi_bande=max(1, ECHELLE_DEMI_BANDE // r))
+    
+    # Rectangle gris: directement sur la carte de densité
+    rect_p = trouver_rectangle_gris(densite, hauteur_min=RECT_HAUTEUR_MIN // r)
+    if not ligne_p or not rect_p:
+        return None
+    
+    # Seuil d'intensité des lignes du rectangle: il dépend de toute la zone,
+    # on garde celui de la passe grossière (moyennes par ligne conservées)
+    _, seuil_lignes_gris, _ = profil_rectangle_gris(densite)
+    
+    # === PASSE FINE ===
+    # Ligne d'échelle: bande pleine largeur autour de l'estimation
+    y_estime = ligne_p[1] * r
+    echelle = localiser_echelle_bande(gray, y_estime - PYRAMIDE_MARGE, y_estime + PYRAMIDE_MARGE,
+                                      seuil, inverser)
+    if not echelle:
+        return None
+    x_g_echelle, y_echelle, x_d_echelle = echelle
+    
+    # Rectangle gris: bords haut/bas (tiers droit), puis bords gauche/droite
+    x_zone = int(w * 2/3)
+    y_rect_haut = affiner_bord_rectangle(gray, rect_p[1] * r, x_zone, seuil_lignes_gris,
+                                         seuil, inverser, haut=True)
+    y_rect_bas = affiner_bord_rectangle(gray, (rect_p[1] + rect_p[3]) * r, x_zone, seuil_lignes_gris,
+                                        seuil, inverser, haut=False)
+    if y_rect_haut is None or y_rect_bas is None or y_rect_bas <= y_rect_haut:
+        return None
+    
+    bords_rect = affiner_bords_rectangle(gray, y_rect_haut, y_rect_bas, seuil, inverser)
+    if not bords_rect:
+        return None
+    x_g_rect, x_d_rect = bords_rect
+    
+    return construire_reperes(x_g_echelle, x_d_echelle, y_echelle,
+                              x_g_rect, x_d_rect, y_rect_haut, y_rect_bas)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Routage des pages scannées vers leur page de template
+=====================================================
+Chaque page de template vierge est résumée par une signature compacte:
+profils d'encre horizontal et vertical de la page, en bandes (BINS_LIGNES +
+BINS_COLONNES valeurs), centrés, lissés et normés. La page scannée va à la
+page de template dont la signature est la plus proche (corrélation).
+
+Les deux projections et le produit matrice × vecteur coûtent quelques
+millisecondes par page, quel que soit le nombre de templates: aucune
+détection n'est tentée avec chaque template.
+
+La signature ne dépend ni du DPI ni du contraste global du scan.
+"""
+import cv2
+import numpy as np
+
+BINS_LIGNES = 128      # Bandes horizontales du profil vertical (~55 px à 600 DPI)
+BINS_COLONNES = 64     # Bandes verticales du profil horizontal (~78 px à 600 DPI)
+LISSAGE = 1.0          # Écart-type du lissage gaussien des profils (bandes), tolère les décalages
+DISTANCE_MAX = 0.5     # Au-delà, la page ne ressemble à aucun template (avertissement)
+
+
+def signature_page(image):
+    """
+    Signature de mise en page d'une page (niveaux de gris ou BGR)
+    
+    Returns:
+        Vecteur float32 de norme 1 (BINS_LIGNES + BINS_COLONNES valeurs)
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+    # Moyenne de chaque ligne / colonne en une passe (cv2.reduce), puis
+    # regroupement en bandes par moyenne exacte (INTER_AREA). Réduire d'abord
+    # l'image entière en BINS_COLONNES × BINS_LIGNES donne le même résultat
+    # ~20 fois plus lentement (facteur non entier)
+    lignes = cv2.reduce(gray, 1, cv2.REDUCE_AVG, dtype=cv2.CV_32F)
+    colonnes = cv2.reduce(gray, 0, cv2.REDUCE_AVG, dtype=cv2.CV_32F)
+    lignes = cv2.resize(lignes, (1, BINS_LIGNES), interpolation=cv2.INTER_AREA)
+    colonnes = cv2.resize(colonnes, (BINS_COLONNES, 1), interpolation=cv2.INTER_AREA)
+    
+    profils = []
+    for profil in (255 - lignes.ravel(), 255 - colonnes.ravel()):
+        profil = cv2.GaussianBlur(profil.reshape(-1, 1), (1, 0), sigmaX=0, sigmaY=LISSAGE).ravel()
+        profil = profil - profil.mean()
+        norme = np.linalg.norm(profil)
+        profils.append(profil / norme if norme else profil)
+    
+    # Les deux profils comptent autant
+    return np.concatenate(profils) / np.sqrt(2)
+
+
+def construire_index(template_pages):
+    """
+    Index des signatures des pages de template (clé 'signature', voir
+    detect0.calibrer_template)
+    
+    Returns:
+        tuple (matrice N × dimension, indices des pages dans template_pages),
+        ou None si moins de 2 pages ont une signature (pas de choix à faire)
+    """
+    indices = [i for i, page in enumerate(template_pages) if page.get('signature')]
+    if len(indices) < 2:
+        return None
+    matrice = np.array([template_pages[i]['signature'] for i in indices], dtype=np.float32)
+    return matrice, indices
+
+
+def router(index, image):
+    """
+    Page de template la plus proche d'une page scannée
+    
+    Args:
+        index: construire_index(...)
+        image: Page scannée
+    
+    Returns:
+        tuple (indice dans template_pages, distance = 1 - corrélation, dans [0, 2])
+    """
+    matrice, indices = index
+    distances = 1 - matrice @ signature_page(image)
+    meilleur = int(np.argmin(distances))
+    return indices[meilleur], float(distances[meilleur])
@@ -0,0 +1,75 @@
+"""
+Tests de detect0.analyser_cases: la classification par bandes donne le
+résultat d'analyser_case case par case, y compris pour les cases qui
+débordent de la page ou en sortent entièrement
+"""
+import numpy as np
+import pytest
+
+import detect0
+
+MARGE = 200   # Bord blanc ajouté autour de la page pour la référence
+
+
+def analyser_case_reference(gray, case):
+    """
+    analyser_case sur la page bordée de blanc: ce qui déborde de la page
+    compte comme blanc, sans le repli des indices négatifs du slicing
+    """
+    marge_x, marge_y = int(case['w'] * 0.25), int(case['h'] * 0.25)
+    if case['w'] - 2 * marge_x <= 0 or case['h'] - 2 * marge_y <= 0:
+        return ('vide', None)
+    bordee = np.pad(gray, MARGE, constant_values=255)
+    return detect0.analyser_case(bordee, dict(case, x=case['x'] + MARGE, y=case['y'] + MARGE))
+
+
+def verifier_analyse(gray, cases):
+    types, infos = detect0.analyser_cases(gray, detect0.rectangles_cases(cases))
+    for case, type_case, info in zip(cases, types, infos):
+        attendu, info_attendue = analyser_case_reference(gray, case)
+        assert type_case == attendu, case
+        if attendu == 'vide':
+            assert np.isnan(info)
+        else:
+            assert info == pytest.approx(info_attendue)
+
+
+def cases_au_bord(largeur, hauteur):
+    """Cases qui débordent de la page, en sortent entièrement ou sont dégénérées"""
+    rectangles = [
+        (largeur - 10, 100, 40, 40), (largeur - 25, 100, 40, 40), (-30, 100, 40, 40), (-15, 300, 40, 40),
+        (largeur + 50, 100, 40, 40), (100, hauteur - 15, 40, 40), (100, hauteur + 5, 40, 40),
+        (100, -25, 40, 40), (-100, -100, 40, 40), (300, 300, 0, 40), (300, 300, 40, 1), (300, 300, 3, 3),
+    ]
+    return [{'x': x, 'y': y, 'w': w, 'h': h} for x, y, w, h in rectangles]
+
+
+def test_analyse_pages_generees(pages_generees):
+    for image, _ in pages_generees:
+        cases = detect0.detecter_cases_completes(image)
+        assert cases
+        verifier_analyse(image, cases)
+
+
+def test_analyse_cases_au_bord(pages_generees):
+    image, _ = pages_generees[0]
+    cases = detect0.detecter_cases_completes(image)
+    h, w = image.shape
+    # Mêlées aux cases de la page: une case hors page ne doit pas perturber les bandes
+    verifier_analyse(image, cases + cases_au_bord(w, h))
+    verifier_analyse(image, cases_au_bord(w, h))
+
+
+def test_analyse_cases_au_bord_noires():
+    # Page noire: les parties visibles des cases au bord sont pleines
+    gray = np.zeros((500, 400), dtype=np.uint8)
+    gray[:, 200:] = 255
+    for i in range(0, 500, 7):
+        gray[i, 200:] = 0
+    verifier_analyse(gray, cases_au_bord(400, 500))
+
+
+def test_analyse_sans_case_visible():
+    gray = np.full((100, 100), 255, dtype=np.uint8)
+    types, infos = detect0.analyser_cases(gray, [(200, 200, 40, 40), (10, 10, 0, 0)])
+    assert list(types) == ['vide', 'vide'] and np.isnan(infos).all()
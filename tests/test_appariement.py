@@ -0,0 +1,89 @@
+"""
+Tests de l'appariement des cases: l'affectation optimale (méthode hongroise)
+atteint le coût minimal trouvé par énumération de toutes les affectations
+"""
+import itertools
+
+import numpy as np
+import pytest
+
+import detect0
+
+
+def cout_minimal_enumere(couts):
+    """Coût total minimal d'une affectation de min(n, m) paires, par énumération (référence, lente)"""
+    n, m = couts.shape
+    if n <= m:
+        return min(sum(couts[i, j] for i, j in enumerate(colonnes))
+                   for colonnes in itertools.permutations(range(m), n))
+    return min(sum(couts[i, j] for j, i in enumerate(lignes))
+               for lignes in itertools.permutations(range(n), m))
+
+
+def verifier_affectation(couts):
+    lignes, colonnes = detect0.affectation_optimale(couts)
+    n, m = couts.shape
+    assert len(lignes) == len(colonnes) == min(n, m)
+    assert list(lignes) == sorted(set(lignes)) and len(set(colonnes)) == len(colonnes)
+    assert couts[lignes, colonnes].sum() == pytest.approx(cout_minimal_enumere(couts))
+
+
+@pytest.mark.parametrize('graine', range(100))
+def test_affectation_aleatoire(graine):
+    rng = np.random.default_rng(graine)
+    n, m = rng.integers(1, 7, 2)
+    verifier_affectation(rng.random((n, m)) * 1000)
+
+
+@pytest.mark.parametrize('graine', range(30))
+def test_affectation_egalites(graine):
+    # Coûts entiers sur une petite plage: beaucoup d'affectations de même coût
+    rng = np.random.default_rng(graine)
+    n, m = rng.integers(1, 7, 2)
+    verifier_affectation(rng.integers(0, 4, (n, m)).astype(float))
+
+
+@pytest.mark.parametrize('forme', [(1, 1), (1, 6), (6, 1), (2, 6), (6, 2), (5, 5)])
+def test_affectation_couts_identiques(forme):
+    # Toutes les paires au-delà de la tolérance (coûts écrêtés, tous égaux)
+    verifier_affectation(np.full(forme, float(detect0.TOLERANCE_APPARIEMENT)))
+
+
+def gain_associations(detectees, attendues, correspondance, tolerance):
+    """Somme des (tolérance - distance) des associations retenues: ce que l'écrêtage maximise"""
+    return sum(tolerance - np.hypot(*(attendues[t] - detectees[d]))
+               for t, d in enumerate(correspondance) if d >= 0)
+
+
+def gain_maximal_enumere(detectees, attendues, tolerance):
+    """Meilleur gain sur toutes les associations partielles à moins de la tolérance (référence, lente)"""
+    meilleur = 0.0
+    for colonnes in itertools.permutations(list(range(len(detectees))) + [-1] * len(attendues), len(attendues)):
+        if any(d >= 0 and np.hypot(*(attendues[t] - detectees[d])) >= tolerance for t, d in enumerate(colonnes)):
+            continue
+        meilleur = max(meilleur, gain_associations(detectees, attendues, colonnes, tolerance))
+    return meilleur
+
+
+@pytest.mark.parametrize('graine', range(40))
+def test_associer_cases_aleatoire(graine):
+    rng = np.random.default_rng(graine)
+    tolerance = 150
+    attendues = rng.integers(0, 400, (rng.integers(1, 5), 2)).astype(float)
+    detectees = rng.integers(0, 400, (rng.integers(1, 5), 2)).astype(float)
+    correspondance = detect0.associer_cases(detectees, attendues, tolerance)
+
+    associees = correspondance[correspondance >= 0]
+    assert len(set(associees)) == len(associees)
+    for t, d in enumerate(correspondance):
+        assert d < 0 or np.hypot(*(attendues[t] - detectees[d])) < tolerance
+    assert (gain_associations(detectees, attendues, correspondance, tolerance)
+            == pytest.approx(gain_maximal_enumere(detectees, attendues, tolerance)))
+
+
+def test_associer_cases_hors_tolerance():
+    attendues = np.array([[0, 0], [100, 0], [200, 0]], dtype=float)
+    detectees = np.array([[1000, 1000], [2000, 0]], dtype=float)
+    assert list(detect0.associer_cases(detectees, attendues, 150)) == [-1, -1, -1]
+    assert list(detect0.associer_cases(detectees[:0], attendues, 150)) == [-1, -1, -1]
+    assert len(detect0.associer_cases(detectees, attendues[:0], 150)) == 0
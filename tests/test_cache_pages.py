@@ -0,0 +1,64 @@
+"""
+Tests de cache_pages: le cache ne dépasse jamais sa taille maximale,
+les entrées les moins récemment utilisées partent les premières, le
+dossier n'est pas parcouru à chaque écriture
+"""
+import os
+
+import cache_pages
+
+
+def cle(i):
+    return f"{i:064x}"
+
+
+def taille(dossier):
+    return sum(os.path.getsize(os.path.join(racine, nom))
+               for racine, _, noms in os.walk(dossier) for nom in noms)
+
+
+def test_ecrire_borne_le_cache(tmp_path):
+    dossier = str(tmp_path)
+    taille_entree = len('{"x": ""}') + 1000
+    for i in range(30):
+        cache_pages.ecrire(dossier, cle(i), {'x': 'a' * 1000}, taille_max=5 * taille_entree)
+        assert taille(dossier) <= 5 * taille_entree
+    # Les dernières écritures sont gardées
+    assert cache_pages.lire(dossier, cle(29)) == {'x': 'a' * 1000}
+    assert cache_pages.lire(dossier, cle(0)) is None
+
+
+def test_ecrire_supprime_les_moins_recemment_utilisees(tmp_path):
+    dossier = str(tmp_path)
+    # Deux entrées, encore sous la cible d'un nettoyage
+    taille_max = int(2 * len('{"x": 0}') / cache_pages.CIBLE_NETTOYAGE) + 1
+    for i in range(2):
+        cache_pages.ecrire(dossier, cle(i), {'x': i}, taille_max)
+        os.utime(cache_pages.chemin_entree(dossier, cle(i)), (1000 + i, 1000 + i))
+    # Lire la plus ancienne la rend la plus récente
+    assert cache_pages.lire(dossier, cle(0)) == {'x': 0}
+    cache_pages.ecrire(dossier, cle(2), {'x': 2}, taille_max)
+    assert cache_pages.lire(dossier, cle(1)) is None
+    assert cache_pages.lire(dossier, cle(0)) == {'x': 0}
+    assert cache_pages.lire(dossier, cle(2)) == {'x': 2}
+
+
+def test_ecrire_sans_parcours_a_chaque_ecriture(tmp_path, monkeypatch):
+    dossier = str(tmp_path)
+    parcours = []
+    nettoyer = cache_pages.nettoyer
+    monkeypatch.setattr(cache_pages, 'nettoyer', lambda *args: parcours.append(args) or nettoyer(*args))
+    monkeypatch.setattr(cache_pages, 'PARCOURS_PERIODE', 10)
+    
+    # Sous la taille max: un parcours au début, puis un toutes les 10 écritures
+    for i in range(25):
+        cache_pages.ecrire(dossier, cle(i), {'x': i}, taille_max=10 ** 6)
+    assert len(parcours) == 3
+    
+    # Cache plein: nettoyé à 90%, les écritures suivantes y rentrent sans parcours
+    parcours.clear()
+    taille_entree = len('{"x": ""}') + 1000
+    for i in range(40):
+        cache_pages.ecrire(dossier, cle(100 + i), {'x': 'a' * 1000}, taille_max=20 * taille_entree)
+        assert taille(dossier) <= 20 * taille_entree
+    assert len(parcours) < 10
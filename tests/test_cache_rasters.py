@@ -0,0 +1,36 @@
+"""
+Tests de cache_rasters: les pages sont relues projetées en mémoire et le
+cache ne dépasse jamais sa taille maximale
+"""
+import os
+
+import numpy as np
+
+import cache_rasters
+
+
+def taille(dossier):
+    return sum(os.path.getsize(os.path.join(racine, nom))
+               for racine, _, noms in os.walk(dossier) for nom in noms)
+
+
+def test_lire_page_ecrite(tmp_path):
+    dossier = str(tmp_path)
+    image = np.arange(200 * 300, dtype=np.uint32).reshape(200, 300).astype(np.uint8)
+    cle = cache_rasters.cle_page('0' * 64, 3, 300, False)
+    cache_rasters.ecrire(dossier, cle, image)
+    lue = cache_rasters.lire(dossier, cle)
+    assert isinstance(lue, np.memmap)
+    assert np.array_equal(lue, image)
+
+
+def test_ecrire_borne_le_cache(tmp_path):
+    dossier = str(tmp_path)
+    image = np.zeros((100, 100), dtype=np.uint8)
+    taille_max = 3 * (image.nbytes + 128)  # en-tête .npy: 128 octets
+    cles = [cache_rasters.cle_page('0' * 64, page_num, 300, False) for page_num in range(10)]
+    for cle in cles:
+        cache_rasters.ecrire(dossier, cle, image, taille_max)
+        assert taille(dossier) <= taille_max
+    assert cache_rasters.lire(dossier, cles[-1]) is not None
+    assert cache_rasters.lire(dossier, cles[0]) is None
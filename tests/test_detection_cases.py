@@ -0,0 +1,95 @@
+"""
+Tests de detection_cases: la déduplication par grille de centres garde
+exactement les cases de la version quadratique, le pré-filtrage des
+contours garde exactement les cases de la version sans pré-filtrage
+"""
+import glob
+import os
+
+import cv2
+import pytest
+
+import detection_cases
+from benchmark.deduplication import dedupliquer_cases_quadratique, generer_candidats
+
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = sorted(glob.glob(os.path.join(RACINE, 'out', '*.png')))
+
+
+def cases_sans_prefiltre(image, aire_min=None, aire_max=None, ratio_min=0.85, ratio_max=1.4):
+    """Version de référence de detection_cases.detecter_cases: approximation polygonale de chaque contour"""
+    aire_min = detection_cases.CASE_AIRE_MIN if aire_min is None else aire_min
+    aire_max = detection_cases.CASE_AIRE_MAX if aire_max is None else aire_max
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    contours, _ = cv2.findContours(binary, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+    
+    cases = []
+    for cnt in contours:
+        epsilon = max(0.02 * cv2.arcLength(cnt, True), detection_cases.APPROX_EPSILON_MIN)
+        approx = cv2.approxPolyDP(cnt, epsilon, True)
+        if len(approx) == 4:
+            x, y, w, h = cv2.boundingRect(cnt)
+            aire = cv2.contourArea(cnt)
+            ratio = w / h if h > 0 else 0
+            if aire_min <= aire <= aire_max and ratio_min <= ratio <= ratio_max:
+                cases.append({'x': int(x), 'y': int(y), 'w': int(w), 'h': int(h),
+                              'aire': int(aire), 'ratio': round(ratio, 2)})
+    return cases
+
+
+def case(x, y, w=40, h=40, aire=None):
+    return {'x': x, 'y': y, 'w': w, 'h': h, 'aire': w * h if aire is None else aire, 'ratio': round(w / h, 2)}
+
+
+@pytest.mark.parametrize('n', [0, 1, 10, 100, 1000, 3000])
+@pytest.mark.parametrize('graine', range(3))
+def test_deduplication_aleatoire(n, graine):
+    cases = generer_candidats(n, graine=graine)
+    assert detection_cases.dedupliquer_cases(cases) == dedupliquer_cases_quadratique(cases)
+
+
+@pytest.mark.parametrize('distance_min', [1, 3, 10, 25])
+def test_deduplication_distances(distance_min):
+    cases = generer_candidats(500, graine=distance_min)
+    assert (detection_cases.dedupliquer_cases(cases, distance_min)
+            == dedupliquer_cases_quadratique(cases, distance_min))
+
+
+def test_deduplication_cas_limites():
+    distance = detection_cases.DEDUP_DISTANCE_MIN
+    cas = [
+        # Centres à exactement distance_min (distincts) et juste en dessous (doublons)
+        [case(0, 0), case(distance, 0), case(0, distance - 1)],
+        # Voisins de part et d'autre d'une limite de cellule de la grille
+        [case(distance - 21, 5), case(distance - 19, 5), case(2 * distance - 20, 2 * distance - 20)],
+        # Coordonnées négatives (cellules négatives)
+        [case(-30, -30), case(-25, -28), case(-30 + distance, -30)],
+        # Même centre, même aire: l'ordre d'entrée départage (tri stable)
+        [case(100, 100, aire=1500), case(100, 100, aire=1500)],
+        # Chaîne: a-b et b-c proches, a-c éloignés
+        [case(0, 0, aire=1600), case(distance - 2, 0, aire=1500), case(2 * distance - 4, 0, aire=1400)],
+        # Tailles différentes, centres confondus
+        [case(10, 10, 40, 40), case(5, 5, 50, 50), case(12, 12, 36, 36)],
+    ]
+    for cases in cas:
+        assert detection_cases.dedupliquer_cases(cases) == dedupliquer_cases_quadratique(cases)
+
+
+@pytest.mark.parametrize('chemin', PAGES, ids=os.path.basename)
+def test_prefiltre_pages(chemin):
+    image = cv2.imread(chemin, cv2.IMREAD_GRAYSCALE)
+    # Extraits réduits: aires aussi à leur échelle
+    for aire_min, aire_max in ((None, None), (100, 2500), (20, 400)):
+        assert (detection_cases.detecter_cases(image, aire_min, aire_max)
+                == cases_sans_prefiltre(image, aire_min, aire_max))
+
+
+def test_prefiltre_pages_generees(pages_generees):
+    for image, _ in pages_generees:
+        cases = detection_cases.detecter_cases(image)
+        assert cases and cases == cases_sans_prefiltre(image)
+        # Ratios élargis: le filtre du rectangle englobant ne doit rien écarter de plus
+        assert (detection_cases.detecter_cases(image, ratio_min=0.2, ratio_max=5)
+                == cases_sans_prefiltre(image, ratio_min=0.2, ratio_max=5))
@@ -0,0 +1,188 @@
+"""
+Tests de la lecture des sorties de pdfimages -list et pdfinfo (sorties
+enregistrées, sans poppler) et du choix des pages extraites sans rendu
+"""
+import subprocess
+
+import pytest
+
+import detect0
+import extraction_scans
+
+LISTE = """\
+page   num  type   width height color comp bpc  enc interp  object ID x-ppi y-ppi size ratio
+--------------------------------------------------------------------------------------------
+   1     0 image    2480  3508  gray    1   8  jpeg   no         9  0   300   300  612K 7.2%
+   2     1 image    2480  3508  gray    1   8  jpeg   no        14  0   300   300  598K 7.0%
+   3     2 image    2480  3508  gray    1   1  ccitt  no        19  0   300   300 71.2K 6.7%
+   4     3 image    1240  1754  rgb     3   8  image  no        24  0   150   150  1.2M  19%
+   5     4 image     600   400  gray    1   8  jpeg   no        29  0   300   300 20.1K 8.4%
+   6     5 image    2480  3508  gray    1   8  jpeg   no        34  0   300   300  601K 7.1%
+   6     6 smask    2480  3508  gray    1   8  image  no        35  0   300   300 12.0K 0.1%
+   7     7 image    3508  2480  gray    1   8  jpeg   no        39  0   300   300  605K 7.1%
+   8     8 image    2480  3508  cmyk    4   8  jpeg   no        44  0   300   300  2.1M  25%
+"""
+
+INFO = """\
+Producer:       Scanner
+Pages:          9
+Encrypted:      no
+Page    1 size: 595.276 x 841.89 pts (A4)
+Page    1 rot:  0
+Page    2 size: 595.276 x 841.89 pts (A4)
+Page    2 rot:  0
+Page    3 size: 595.276 x 841.89 pts (A4)
+Page    3 rot:  0
+Page    4 size: 595.276 x 841.89 pts (A4)
+Page    4 rot:  0
+Page    5 size: 595.276 x 841.89 pts (A4)
+Page    5 rot:  0
+Page    6 size: 595.276 x 841.89 pts (A4)
+Page    6 rot:  0
+Page    7 size: 841.89 x 595.276 pts (A4)
+Page    7 rot:  270
+Page    8 size: 595.276 x 841.89 pts (A4)
+Page    8 rot:  0
+Page    9 size: 595.276 x 841.89 pts (A4)
+Page    9 rot:  0
+File size:      5043712 bytes
+PDF version:    1.4
+"""
+
+# Dictionnaires des objets image (le PDF n'est lu que pour /Decode)
+PDF = b"""%PDF-1.4
+9 0 obj
+<< /Type /XObject /Subtype /Image /Width 2480 /Height 3508 /ColorSpace /DeviceGray
+   /BitsPerComponent 8 /Filter /DCTDecode /DecodeParms << /ColorTransform 0 >> /Length 10 >>
+stream
+0123456789
+endstream
+endobj
+14 0 obj
+<< /Type /XObject /Subtype /Image /Width 2480 /Height 3508 /ColorSpace /DeviceGray
+   /BitsPerComponent 8 /Filter /DCTDecode /Decode [1 0] /Length 10 >>
+stream
+0123456789
+endstream
+endobj
+29 0 obj
+<< /Subtype /Image /Filter /DCTDecode /Decode [0 1] /Length 10 >>stream
+0123456789
+endstream
+endobj
+34 0 obj
+<< /Subtype /Image /Filter /DCTDecode /Length 10 >>
+stream
+0123456789
+endstream
+endobj
+39 0 obj
+<< /Subtype /Image /Filter /DCTDecode /Decode [1 0] /Length 10 >>
+stream
+0123456789
+endstream
+endobj
+39 0 obj
+<< /Subtype /Image /Filter /DCTDecode /Decode [0.0 1.0] /Length 10 >>
+stream
+0123456789
+endstream
+endobj
+44 0 obj
+<< /Subtype /Image /Filter /DCTDecode /Decode 50 0 R /Length 10 >>
+stream
+0123456789
+endstream
+endobj
+%%EOF
+"""
+
+
+@pytest.fixture
+def poppler(monkeypatch, tmp_path):
+    """Sorties enregistrées de pdfimages -list et pdfinfo; renvoie le chemin du PDF et les commandes lancées"""
+    commandes = []
+
+    def run(commande, **options):
+        commandes.append(commande)
+        sortie = {'pdfimages': LISTE, 'pdfinfo': INFO}[commande[0]]
+        return subprocess.CompletedProcess(commande, 0, stdout=sortie, stderr='')
+
+    monkeypatch.setattr(extraction_scans.subprocess, 'run', run)
+    chemin = tmp_path / 'scans.pdf'
+    chemin.write_bytes(PDF)
+    return str(chemin), commandes
+
+
+def test_lister_images(poppler):
+    chemin, _ = poppler
+    images = extraction_scans.lister_images(chemin)
+    assert sorted(images) == [1, 2, 3, 4, 5, 6, 7, 8]
+    assert images[1] == [{'type': 'image', 'largeur': 2480, 'hauteur': 3508, 'couleur': 'gray',
+                          'encodage': 'jpeg', 'objet': (9, 0), 'x_ppi': 300.0, 'y_ppi': 300.0}]
+    assert [image['type'] for image in images[6]] == ['image', 'smask']
+    assert images[4][0]['encodage'] == 'image' and images[4][0]['x_ppi'] == 150.0
+
+
+def test_formats_pages(poppler):
+    chemin, commandes = poppler
+    formats = extraction_scans.formats_pages(chemin, 9)
+    assert commandes == [['pdfinfo', '-f', '1', '-l', '9', chemin]]
+    assert formats[1] == (595.276, 841.89, 0)
+    assert formats[7] == (841.89, 595.276, 270)
+    assert sorted(formats) == list(range(1, 10))
+
+
+def test_decodes_par_defaut(poppler):
+    chemin, _ = poppler
+    objets = {(9, 0), (14, 0), (29, 0), (34, 0), (39, 0), (44, 0), (99, 0)}
+    # 14: inversé; 39: redéfini sans inversion (mise à jour incrémentale);
+    # 44: /Decode indirect; 99: introuvable; /DecodeParms n'est pas /Decode
+    assert extraction_scans.decodes_par_defaut(chemin, objets) == {(9, 0), (29, 0), (34, 0), (39, 0)}
+
+
+def test_pages_scannees(poppler):
+    chemin, commandes = poppler
+    scans = extraction_scans.pages_scannees(chemin, 9)
+    # 2: JPEG inversé; 5: image plus petite que la page; 6: masque;
+    # 8: CMYK; 9: page vectorielle (aucune image)
+    assert scans == {
+        1: {'dpi': 300, 'rotation': 0},
+        3: {'dpi': 300, 'rotation': 0},
+        4: {'dpi': 150, 'rotation': 0},
+        7: {'dpi': 300, 'rotation': 270},
+    }
+    # pdfimages -list et pdfinfo une seule fois chacun
+    assert sorted(commande[0] for commande in commandes) == ['pdfimages', 'pdfinfo']
+
+
+def test_pages_scannees_sans_poppler(monkeypatch, tmp_path):
+    def run(commande, **options):
+        raise FileNotFoundError(commande[0])
+
+    monkeypatch.setattr(extraction_scans.subprocess, 'run', run)
+    assert extraction_scans.pages_scannees(str(tmp_path / 'absent.pdf'), 3) == {}
+
+
+def test_resolution_commune():
+    scans = {1: {'dpi': 300, 'rotation': 0}, 2: {'dpi': 300, 'rotation': 90}}
+    assert extraction_scans.resolution_commune(scans, 2) == 300
+    assert extraction_scans.resolution_commune(scans, 3) is None
+    assert extraction_scans.resolution_commune({**scans, 3: {'dpi': 200, 'rotation': 0}}, 3) is None
+    assert detect0.dpi_natif(scans, 2) == 300
+    assert detect0.dpi_natif({1: {'dpi': 1200, 'rotation': 0}}, 1) == detect0.DPI_REFERENCE
+    assert detect0.dpi_natif(scans, 3) is None
+
+
+def test_iterer_pages_scans_fournis(monkeypatch):
+    # Scans déjà lus: ni pdfimages ni pdfinfo relancés, chaque scan extrait
+    def interdit(*args, **kwargs):
+        raise AssertionError("pages scannées relues")
+
+    monkeypatch.setattr(extraction_scans, 'pages_scannees', interdit)
+    monkeypatch.setattr(detect0, 'pdfinfo_from_path', lambda chemin: {'Pages': 2})
+    monkeypatch.setattr(detect0, 'rasteriser_page',
+                        lambda chemin, page_num, dpi, scan, empreinte: (page_num, dpi, scan))
+    scans = {1: {'dpi': 300, 'rotation': 0}, 2: {'dpi': 300, 'rotation': 0}}
+    pages = list(detect0.iterer_pages('scans.pdf', dpi=600, scans=scans))
+    assert pages == [(1, (1, 600, scans[1])), (2, (2, 600, scans[2]))]
@@ -0,0 +1,80 @@
+"""
+Tests du nettoyage: le pipeline partagé de nettoyer_images donne exactement
+les images des nettoyages base et agressif historiques, calculés séparément;
+les moteurs 'hough' et 'projection' trouvent la même ligne d'échelle
+"""
+import glob
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+import reperage
+from benchmark.nettoyage import comparer_moteurs_nettoyage, nettoyer_agressif_reference, nettoyer_image_base_reference
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = sorted(glob.glob(os.path.join(RACINE, 'out', '*.png')))
+
+
+def verifier_nettoyage(image):
+    base, agressif = reperage.nettoyer_images(image)
+    attendu_base = nettoyer_image_base_reference(image)
+    attendu_agressif = nettoyer_agressif_reference(image)
+    assert np.array_equal(base, attendu_base)
+    assert np.array_equal(agressif, attendu_agressif)
+    
+    # Une seule image demandée, autres formats de sortie
+    assert np.array_equal(reperage.nettoyer_image_base(image), attendu_base)
+    assert np.array_equal(reperage.nettoyer_lignes_verticales_agressif(image), attendu_agressif)
+    gris_base, gris_agressif = reperage.nettoyer_images(image, sortie='gris')
+    assert np.array_equal(gris_base, attendu_base[:, :, 0])
+    assert np.array_equal(gris_agressif, attendu_agressif[:, :, 0])
+    _, masque = reperage.nettoyer_images(image, base=False, sortie='masque')
+    assert np.array_equal(masque, 255 - attendu_agressif[:, :, 0])
+
+
+@pytest.mark.parametrize('chemin', PAGES, ids=os.path.basename)
+def test_nettoyage_pages(chemin):
+    verifier_nettoyage(cv2.imread(chemin))
+
+
+def test_nettoyage_pages_generees(pages_generees):
+    # Pleine page à 600 DPI: une par page du template
+    for image, _ in pages_generees[::3]:
+        verifier_nettoyage(image)
+
+
+def test_nettoyage_morphologies_differentes(pages_generees, monkeypatch):
+    # Base et agressif n'ont plus la même suppression des lignes verticales fines
+    monkeypatch.setattr(reperage, 'MORPH_LARGEUR_MAX', 4)
+    monkeypatch.setattr(reperage, 'MORPH_HAUTEUR_MIN', 300)
+    image, _ = pages_generees[0]
+    verifier_nettoyage(image)
+
+
+def test_moteurs_meme_echelle(pages_generees):
+    # Ligne d'échelle à la même hauteur. Les bords ne diffèrent que si une
+    # ligne de scan coupe l'échelle: 'projection' efface par blocs entiers
+    for image, verite in pages_generees:
+        moteurs = comparer_moteurs_nettoyage(image)
+        hough, projection = moteurs['hough'], moteurs['projection']
+        assert hough['ligne'][1] == projection['ligne'][1]
+        ecart = max(abs(a - b) for a, b in zip(hough['bords'], projection['bords']))
+        if not verite['artefacts']['lignes_verticales']:
+            assert ecart == 0
+        assert ecart <= reperage.HOUGH_PROJECTION_BLOC
+
+
+@pytest.mark.parametrize('moteur', ['hough', 'projection'])
+def test_moteurs_ligne_pointillee(moteur, monkeypatch):
+    # Ligne verticale pointillée (ignorée par la morphologie) qui coupe une
+    # ligne horizontale, dans la bande de l'échelle (HOUGH_BANDE: y 300-1500)
+    monkeypatch.setattr(reperage, 'HOUGH_MOTEUR', moteur)
+    image = np.full((3000, 800), 255, dtype=np.uint8)
+    for y in range(300, 2700, 36):
+        image[y:y + 30, 400:402] = 0
+    image[1000:1004, 100:700] = 0
+    _, masque = reperage.nettoyer_images(image, base=False, sortie='masque')
+    assert not masque[300:1500, 390:412].any()
+    assert masque[1000:1004, 100:370].all() and masque[1000:1004, 440:700].all()
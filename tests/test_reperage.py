@@ -0,0 +1,230 @@
+"""
+Tests de reperage: la recherche vectorisée de la ligne d'échelle donne
+exactement le résultat de l'ancien balayage Python ligne par ligne, de même
+que les bords de l'échelle et du rectangle gris; le mode pyramide trouve
+les repères du mode complet
+"""
+import contextlib
+import glob
+import io
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+import reperage
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = sorted(glob.glob(os.path.join(RACINE, 'out', '*.png')))
+
+
+def ligne_echelle_reference(image, demi_bande=None):
+    """Balayage historique de trouver_ligne_echelle (référence, lent)"""
+    d = demi_bande or reperage.ECHELLE_DEMI_BANDE
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+    _, binary = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY_INV)
+    h, w = binary.shape
+    
+    best = None
+    max_len = 0
+    for y in range(h):
+        bande = binary[max(0, y-d):min(h, y+d), :]
+        proj = np.sum(bande, axis=0) > 0
+        
+        debut = None
+        max_seg = 0
+        x1_max = 0
+        for x in range(w):
+            if proj[x]:
+                if debut is None:
+                    debut = x
+            else:
+                if debut is not None:
+                    longueur = x - debut
+                    if longueur > max_seg:
+                        max_seg = longueur
+                        x1_max = debut
+                debut = None
+        if debut is not None:
+            longueur = w - debut
+            if longueur > max_seg:
+                x1_max = debut
+                max_seg = longueur
+        
+        if max_seg > max_len:
+            max_len = max_seg
+            best = (x1_max, y, x1_max + max_seg, y)
+    
+    return best
+
+
+@pytest.mark.parametrize('chemin', PAGES, ids=os.path.basename)
+@pytest.mark.parametrize('nettoyee', [False, True], ids=['brute', 'nettoyee'])
+def test_ligne_echelle_pages(chemin, nettoyee):
+    image = cv2.imread(chemin)
+    if nettoyee:
+        image = reperage.nettoyer_lignes_verticales_agressif(image)
+    assert reperage.trouver_ligne_echelle(image) == ligne_echelle_reference(image)
+
+
+@pytest.mark.parametrize('graine', range(5))
+def test_ligne_echelle_aleatoire(graine):
+    rng = np.random.default_rng(graine)
+    image = np.where(rng.random((60, 200)) < 0.3, 0, 255).astype(np.uint8)
+    for d in (1, 3, 5):
+        assert reperage.trouver_ligne_echelle(image, d) == ligne_echelle_reference(image, d)
+
+
+def test_ligne_echelle_cas_limites():
+    blanche = np.full((40, 100), 255, dtype=np.uint8)
+    assert reperage.trouver_ligne_echelle(blanche) is None
+    assert ligne_echelle_reference(blanche) is None
+    
+    # Segment jusqu'au bord droit, deux segments de même longueur
+    image = blanche.copy()
+    image[10, 60:] = 0
+    image[30, 0:40] = 0
+    assert reperage.trouver_ligne_echelle(image) == ligne_echelle_reference(image)
+    
+    noire = np.zeros((40, 100), dtype=np.uint8)
+    assert reperage.trouver_ligne_echelle(noire) == ligne_echelle_reference(noire) == (0, 0, 100, 0)
+
+
+def test_configurer_dpi_garde_la_reduction_pyramide():
+    try:
+        reperage.configurer_dpi(300)
+        assert reperage.PYRAMIDE_REDUCTION == 4
+        assert reperage.PYRAMIDE_MARGE == 150
+    finally:
+        reperage.configurer_dpi(reperage.DPI_REFERENCE)
+
+
+def test_pyramide_comme_complet(pages_generees):
+    for image, _ in pages_generees:
+        with contextlib.redirect_stdout(io.StringIO()):
+            complet = reperage.detecter_reperes(image, mode='complet')
+            pyramide = reperage.detecter_reperes(image, mode='pyramide')
+        assert complet and pyramide
+        for nom in reperage.POINTS_REPERES:
+            assert abs(pyramide[nom][0] - complet[nom][0]) <= 5
+            assert abs(pyramide[nom][1] - complet[nom][1]) <= 5
+
+
+def bords_ligne_echelle_reference(image, y_ligne, hauteur_bande=None, largeur_min=None):
+    """Balayage historique de trouver_bords_ligne_echelle (référence, lent)"""
+    hauteur_bande = hauteur_bande or reperage.ECHELLE_HAUTEUR_BANDE
+    largeur_min = largeur_min or reperage.ECHELLE_LARGEUR_MIN
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+    bande = gray[max(0, y_ligne - hauteur_bande//2):min(gray.shape[0], y_ligne + hauteur_bande//2), :]
+    _, binary = cv2.threshold(bande, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    projection = np.sum(binary, axis=0)
+    if projection.max() > 0:
+        projection = projection / projection.max()
+    
+    x_gauche = None
+    for x in range(len(projection) - largeur_min):
+        if np.mean(projection[x:x+largeur_min]) > 0.15:
+            x_gauche = x
+            break
+    x_droite = None
+    for x in range(len(projection)-1, largeur_min, -1):
+        if np.mean(projection[x-largeur_min:x]) > 0.15:
+            x_droite = x
+            break
+    return (x_gauche, x_droite) if x_gauche and x_droite else None
+
+
+def rectangle_gris_reference(image, hauteur_min=None):
+    """Balayage historique de trouver_rectangle_gris (référence, lent)"""
+    hauteur_min = hauteur_min or reperage.RECT_HAUTEUR_MIN
+    intensites, seuil, moitie_basse_y = reperage.profil_rectangle_gris(image)
+    dans_zone = False
+    y_debut = None
+    longueur_max = 0
+    meilleur_debut = None
+    meilleur_fin = None
+    for y, intensite in enumerate(intensites):
+        if intensite < seuil:
+            if not dans_zone:
+                y_debut = y
+                dans_zone = True
+        elif dans_zone:
+            if y - y_debut > longueur_max:
+                longueur_max = y - y_debut
+                meilleur_debut, meilleur_fin = y_debut, y
+            dans_zone = False
+    if dans_zone and len(intensites) - y_debut > longueur_max:
+        meilleur_debut, meilleur_fin = y_debut, len(intensites)
+    if meilleur_debut is None or longueur_max < hauteur_min:
+        return None
+    return (0, meilleur_debut + moitie_basse_y, image.shape[1], meilleur_fin - meilleur_debut)
+
+
+def bord_gauche_gris_reference(projection, seuil, min_gris):
+    for x in range(len(projection) - min_gris):
+        if projection[x] < seuil and np.sum(projection[x:x+min_gris] < seuil) / min_gris > 0.8:
+            return x
+    return None
+
+
+def bord_droit_gris_reference(projection, seuil, min_gris):
+    for x in range(len(projection)-1, min_gris, -1):
+        if projection[x] < seuil and np.sum(projection[x-min_gris:x] < seuil) / min_gris > 0.8:
+            return x
+    return None
+
+
+def verifier_bords(image, hauteur_min=None, min_gris=None):
+    """Bords de l'échelle, rectangle gris et ses bords: versions vectorisées contre balayages"""
+    agressif = reperage.nettoyer_lignes_verticales_agressif(image)
+    ligne = reperage.trouver_ligne_echelle(agressif)
+    if ligne:
+        for largeur_min in (None, 5, 50):
+            assert (reperage.trouver_bords_ligne_echelle(agressif, ligne[1], largeur_min=largeur_min)
+                    == bords_ligne_echelle_reference(agressif, ligne[1], largeur_min=largeur_min))
+    
+    base = reperage.nettoyer_image_base(image)
+    rect = reperage.trouver_rectangle_gris(base, hauteur_min)
+    assert rect == rectangle_gris_reference(base, hauteur_min)
+    if rect:
+        projection, seuil = reperage.profil_bords_rectangle(base, rect)
+        min_gris = min_gris or reperage.RECT_LARGEUR_MIN_GRIS
+        assert reperage.bord_gauche_gris(projection, seuil, min_gris) == bord_gauche_gris_reference(projection, seuil, min_gris)
+        assert reperage.bord_droit_gris(projection, seuil, min_gris) == bord_droit_gris_reference(projection, seuil, min_gris)
+    return rect
+
+
+@pytest.mark.parametrize('chemin', PAGES, ids=os.path.basename)
+def test_bords_pages(chemin):
+    # Extraits réduits: hauteur et largeur minimales à leur échelle
+    verifier_bords(cv2.imread(chemin), hauteur_min=20, min_gris=10)
+
+
+def test_bords_pages_generees(pages_generees):
+    for image, _ in pages_generees[::3]:
+        assert verifier_bords(image)
+
+
+@pytest.mark.parametrize('graine', range(20))
+def test_bords_gris_aleatoires(graine):
+    rng = np.random.default_rng(graine)
+    # Zones grises bruitées, parfois collées aux bords du profil
+    projection = np.where(rng.random(300) < 0.3, 100.0, 250.0)
+    projection[rng.integers(0, 150):rng.integers(150, 301)] = 100.0
+    for min_gris in (1, 5, 20, 299, 300):
+        assert reperage.bord_gauche_gris(projection, 200, min_gris) == bord_gauche_gris_reference(projection, 200, min_gris)
+        assert reperage.bord_droit_gris(projection, 200, min_gris) == bord_droit_gris_reference(projection, 200, min_gris)
+
+
+def test_bords_echelle_densite_limite():
+    # Bande de 3 lignes: colonnes pleines (max = 3 × 255) puis 9 pixels sur
+    # 10 colonnes, soit des fenêtres de 20 colonnes de densité exactement
+    # 0.15. Selon l'ordre des colonnes, la moyenne flottante du balayage
+    # historique arrondit à 0.15000000000000002 et juge la fenêtre dense
+    image = np.full((3, 200), 255, dtype=np.uint8)
+    image[:, 20:26] = 0
+    for dx, pixels in enumerate([2, 0, 3, 0, 1, 0, 1, 0, 1, 1]):
+        image[:pixels, 110 + dx] = 0
+    assert bords_ligne_echelle_reference(image, 1, hauteur_bande=6) == (4, 120)
+    assert reperage.trouver_bords_ligne_echelle(image, 1, hauteur_bande=6) == (4, 120)
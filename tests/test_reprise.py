@@ -0,0 +1,82 @@
+"""
+Tests de --reprise: un traitement repris depuis un fichier de reprise
+partiel donne exactement le JSON d'un traitement sans interruption
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+import detect0
+from benchmark import generateur
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NB_PAGES = 4
+
+pytestmark = pytest.mark.skipif(shutil.which('pdftoppm') is None or shutil.which('pdfinfo') is None,
+                                reason="poppler requis (pdftoppm, pdfinfo)")
+
+
+def depouiller(dossier, sortie, *options):
+    """python detect0.py template.json corpus.pdf sortie [options], lancé dans dossier"""
+    commande = [sys.executable, os.path.join(RACINE, 'detect0.py'), 'template.json', 'corpus.pdf', sortie,
+                '--debug-images', 'none', *options]
+    termine = subprocess.run(commande, cwd=dossier, capture_output=True, text=True, check=True)
+    with open(os.path.join(dossier, sortie), 'r', encoding='utf-8') as f:
+        return json.load(f), termine.stdout
+
+
+@pytest.fixture(scope='module')
+def corpus(tmp_path_factory):
+    """Corpus PDF de NB_PAGES pages et résultat d'un traitement sans interruption"""
+    dossier = str(tmp_path_factory.mktemp('reprise'))
+    shutil.copy(os.path.join(RACINE, 'template.json'), dossier)
+    generateur.generer_corpus(os.path.join(dossier, 'template.json'), dossier, NB_PAGES, pdf=True)
+    complet, _ = depouiller(dossier, 'complet.json')
+    assert len(complet['pages']) == NB_PAGES
+    return dossier, complet
+
+
+def ecrire_reprise_partielle(dossier, sortie, pages, ligne_tronquee=False):
+    """Fichier de reprise d'un traitement arrêté après `pages` (résultats tels qu'écrits par detect0)"""
+    with open(os.path.join(dossier, 'template.json'), 'r', encoding='utf-8') as f:
+        template_pages = detect0.pages_template(json.load(f))
+    entete = detect0.entete_reprise(os.path.join(dossier, 'corpus.pdf'), template_pages)
+    with detect0.ouvrir_reprise(os.path.join(dossier, sortie + detect0.SUFFIXE_REPRISE), entete) as journal:
+        for resultat in pages:
+            detect0.ecrire_reprise(journal, resultat)
+        if ligne_tronquee:
+            journal.write('{"page": 4, "questions": {"quest')
+
+
+@pytest.mark.parametrize('ligne_tronquee', [False, True], ids=['arret', 'arret_pendant_ecriture'])
+def test_reprise_comme_sans_interruption(corpus, ligne_tronquee):
+    dossier, complet = corpus
+    sortie = f"repris_{int(ligne_tronquee)}.json"
+    # Pages 1 et 3 terminées (ordre d'achèvement quelconque avec plusieurs workers)
+    ecrire_reprise_partielle(dossier, sortie, [complet['pages'][2], complet['pages'][0]], ligne_tronquee)
+
+    repris, sortie_console = depouiller(dossier, sortie, '--reprise')
+    assert f"Reprise: 2 page(s) déjà faite(s), {NB_PAGES - 2} à analyser" in sortie_console
+    assert repris == complet
+    assert not os.path.exists(os.path.join(dossier, sortie + detect0.SUFFIXE_REPRISE))
+
+
+def test_reprise_autre_pdf_ignoree(corpus):
+    dossier, complet = corpus
+    sortie = 'autre.json'
+    ecrire_reprise_partielle(dossier, sortie, [dict(complet['pages'][0], questions={})])
+    # Un autre PDF (empreinte différente): la reprise est ignorée, tout est refait
+    chemin = os.path.join(dossier, sortie + detect0.SUFFIXE_REPRISE)
+    with open(chemin, 'r', encoding='utf-8') as f:
+        lignes = f.read().splitlines()
+    lignes[0] = json.dumps(dict(json.loads(lignes[0]), pdf='0' * 64))
+    with open(chemin, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lignes) + '\n')
+
+    repris, sortie_console = depouiller(dossier, sortie, '--reprise')
+    assert 'reprise ignorée' in sortie_console
+    assert repris['pages'] == complet['pages']
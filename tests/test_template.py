@@ -0,0 +1,53 @@
+"""
+Tests du chargement du template: template.json → pages à l'échelle
+(pages_template) → dict identique à l'original au DPI du template
+"""
+import json
+import os
+
+import pytest
+
+import detect0
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='module')
+def template():
+    with open(os.path.join(RACINE, 'template.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def coordonnees(page):
+    """Tous les (x, y) et (w, h) d'une page de template, dans l'ordre"""
+    points = [(p['x'], p['y']) for p in page.get('echelle', {}).values()]
+    points += [(p['x'], p['y']) for p in page.get('reperes', {}).values()]
+    for question in page['contenu'].values():
+        for case in question['cases']:
+            points += [(case['x'], case['y']), (case['w'], case['h'])]
+    return points
+
+
+def test_aller_retour_identique(template):
+    original = json.loads(json.dumps(template))
+    pages = detect0.pages_template(template, detect0.dpi_template(template))
+    assert json.loads(json.dumps(dict(template, pages=pages))) == original
+    # Le template chargé n'est pas modifié
+    assert template == original
+
+
+@pytest.mark.parametrize('dpi', [300, 1200])
+def test_echelle(template, dpi):
+    facteur = dpi / detect0.dpi_template(template)
+    pages = detect0.pages_template(template, dpi)
+    assert len(pages) == len(template['pages'])
+    for page, originale in zip(pages, template['pages']):
+        assert list(page['contenu']) == list(originale['contenu'])
+        assert coordonnees(page) == [(round(a * facteur), round(b * facteur)) for a, b in coordonnees(originale)]
+        assert page['echelle'].keys() == originale['echelle'].keys()
+
+
+def test_reperes_a_l_echelle(template):
+    page = dict(template['pages'][0], reperes={'haut_gauche': {'x': 101, 'y': 33, 'score': 0.9}})
+    page = detect0.pages_template(dict(template, pages=[page]), 2 * detect0.dpi_template(template))[0]
+    assert page['reperes'] == {'haut_gauche': {'x': 202, 'y': 66, 'score': 0.9}}